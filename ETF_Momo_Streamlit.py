@@ -1,106 +1,74 @@
-import streamlit as st
-import pandas as pd
-import numpy as np
-import yfinance as yf
+import os
+import threading
 from datetime import datetime
-from dateutil.relativedelta import relativedelta
-import time
-import openpyxl
-from openpyxl.styles import PatternFill, Font, Alignment
-from openpyxl.styles.borders import Border, Side
-from openpyxl import load_workbook
-
-def getMedianVolume(data):
-	return(round(data.median(),0))
-
-def getDailyReturns(data):
-	return(data.pct_change(fill_method = 'ffill')) #Modified
-
-# change inf value to max and min value of that column
-def getMaskDailyChange(data) :
- m1 = getDailyReturns(data).eq(np.inf) # for inf value
- m2 = getDailyReturns(data).eq(-np.inf) #for -inf value
- return(getDailyReturns(data).mask(m1, df[~m1].max(), axis=1).mask(m2, df[~m2].min(), axis=1).bfill(axis = 1))
-
-
-def getStdev(data):
-	return(np.std(getMaskDailyChange(data)*100))
-
-def getStdRatio(data, data1):
-	return((getStdev(data)/getStdev(data1)*100)) # to judge volatility 1 month against 1 year
-
-def getAbsReturns(data):
-	x = (data.iloc[-1]/data.iloc[0] - 1)*100
-	return(round(x, 2))
-
-def getVolatility(data):
-	return(round(np.std(data) * np.sqrt(252) * 100, 2))
 
-def getMonthlyPrices(data):
-	grps = data.groupby([data.index.year, data.index.month])
-	monthlyPrices = pd.DataFrame()
-	for k in grps:
-		monthlyPrices = pd.concat([monthlyPrices, k[1].tail(1)])
-		# monthlyPrices = monthlyPrices.append(k[1].tail(1))
-	return monthlyPrices
-
-def getMonthlyReturns(data):
-	return(data.pct_change())
-
-def getSharpe(data):
-	return(round(np.sqrt(252) * data.mean()/data.std(), 2))
-
-def getSortino(data):
-	return(np.sqrt(252) * data.mean()/data[data<0].std())
+import streamlit as st
 
-def getMaxDrawdown(data):
-	cummRet = (data+1).cumprod()
-	peak = cummRet.expanding(min_periods = 1).max()
-	drawdown = (cummRet/peak) - 1
-	return drawdown.min()
+# Streamlit Layout; painted before the package and pandas are imported
+st.title("ETF Momentum Ranking App")
 
-def getCalmar(data):
-	return(data.mean()*252/abs(getMaxDrawdown(data)))
+# Only what the landing page needs is imported here; download, metric, export
+# and analytics modules load on the first run that uses them
+from etf_momo import universe as registry
+from etf_momo.cache import LayeredCache, prices_cache_key, ranking_cache_key, stats_cache_key
+from etf_momo.factors import MOMENTUM_FILTERS, RANKING_METHODS, filtered_view
+from etf_momo.history import RankingHistory
+from etf_momo.lookback import lookback_dates
+from etf_momo.panel import process_memory_mb
+from etf_momo.profiling import Profiler, set_current, span
+from etf_momo.risk import BENCHMARK_MODES
 
-def getAbsMomentumVolAdjusted(absReturn, volatility):
-	return(absReturn/volatility)
 
-def getNMonthRoC(data, N):
-	ret = round((data.iloc[-1]/data.iloc[-1-N] - 1) * 100, 2)
-	return(ret)
+@st.cache_resource
+def get_cache():
+    # One result cache per server process, shared by all sessions
+    return LayeredCache()
 
-def getNWeekRoC(data, N):
-	ret = round((data.iloc[-1]/data.iloc[-1-N] - 1) * 100, 2)
-	return(ret)
 
-def getFIP(data):
-	retPos = np.sum(data.pct_change()[1:] > 0)
-	retNeg = np.sum(data.pct_change()[1:] < 0)
-	return(retPos - retNeg)
+@st.cache_resource
+def get_history():
+    # Every ranking computed by any session is kept in one local database
+    return RankingHistory()
 
-def getSharpeRoC(roc, volatility):
-	return(round(roc/volatility, 2))
 
-#Beta should be calculated against relevant Index instead of Nifty50?
-def getBeta(dfNifty, data12M):
+# Seconds after the first page before the background refresh is imported and started
+PREFETCH_DELAY_S = 5
 
-	dailyReturns = getDailyReturns(pd.concat([dfNifty, data12M], axis = 1))[1:]
 
-	var = np.var(dailyReturns['Nifty']) #Modified
+@st.cache_resource
+def start_prefetcher():
+    # Refreshes prices and precomputes today's rankings before the open and after
+    # the close, so the first session of the day is served from the cache.
+    # Importing it pulls in the whole pipeline, so that happens on a timer thread
+    # once the first page is out. ETF_MOMO_PREFETCH=0 turns it off.
+    if os.environ.get('ETF_MOMO_PREFETCH', '1') == '0':
+        return None
+    started = {}
+    cache, history = get_cache(), get_history()
 
-	cov = dailyReturns.cov()
+    def start():
+        from etf_momo.prefetch import Prefetcher
+        started['prefetcher'] = Prefetcher(cache, history=history).start()
 
-	cols = cov.columns[1:]
+    timer = threading.Timer(PREFETCH_DELAY_S, start)
+    timer.name = 'etf_momo-prefetch-start'
+    timer.daemon = True
+    timer.start()
+    return started
 
-	beta = []
 
-	for k in cols:
-		beta.append(round(cov.loc[k, 'Nifty']/var, 2))
+def get_prefetcher():
+    # The running Prefetcher; None while it is off or not started yet
+    return (start_prefetcher() or {}).get('prefetcher')
 
-	return beta
 
-# Streamlit Layout
-st.title("ETF Momentum Ranking App")
+# Optional timing of every pipeline stage of this run, shown at the end of the sidebar section
+with st.sidebar:
+    profiling_box = st.expander("Profiling", expanded=False)
+    record_timings = profiling_box.checkbox("Record stage timings", value=False)
+    track_memory = profiling_box.checkbox("Track peak memory (slower)", value=False, disabled=not record_timings)
+profiler = Profiler(memory=track_memory) if record_timings else None
+set_current(profiler)
 
 
 #To suppress future warnings about using ffill method in pct_change()
@@ -108,10 +76,7 @@ import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 # Dropdown options with display labels and corresponding values
-ranking_options = {
-    "Sharpe3M": "sharpe3M",
-    "AvgSharpe 12M/9M/6M/3M": "avgSharpe"
-}
+ranking_options = RANKING_METHODS
 
 # Display dropdown for ranking method selection
 ranking_method_display = st.selectbox(
@@ -123,97 +88,149 @@ ranking_method_display = st.selectbox(
 # Get the actual value for the selected display label
 ranking_method = ranking_options[ranking_method_display]
 
-# Select Universe with default value as 'NSEETF'
-universe = ['NSEETF']
-U = st.selectbox('Select Universe:', universe, index=0)  # Default value is 'NSEETF' (index 0)
+# Select Universe: bundled NSEETF plus any CSV dropped into the user universe directory
+universe = list(registry.available())
+U = st.selectbox('Select Universe:', universe, index=universe.index(registry.DEFAULT_UNIVERSE))  # Default value is 'NSEETF'
+
+# Benchmark used for beta, correlation and tracking error
+benchmark_display = st.selectbox("Select Beta Benchmark", options=list(BENCHMARK_MODES.keys()), index=0)
+benchmark_mode = BENCHMARK_MODES[benchmark_display]
 
 # Date Picker for Lookback Start Date
 selected_date = st.date_input("Select Lookback Date", datetime.today())
 dt2 = datetime.strptime(str(selected_date), "%Y-%m-%d").strftime('%Y-%m-%d')
 
 # Displaying Date Range Information
-dates = {
-    'startDate': datetime.strptime('2000-01-01', '%Y-%m-%d'),
-    'endDate': datetime.strptime(dt2, '%Y-%m-%d'),
-    'date12M': datetime.strptime(dt2, '%Y-%m-%d') - relativedelta(months=12),
-    'date9M': datetime.strptime(dt2, '%Y-%m-%d') - relativedelta(months=9),
-    'date6M': datetime.strptime(dt2, '%Y-%m-%d') - relativedelta(months=6),
-    'date3M': datetime.strptime(dt2, '%Y-%m-%d') - relativedelta(months=3),
-    'date1M': datetime.strptime(dt2, '%Y-%m-%d') - relativedelta(months=1),
-}
+dates = lookback_dates(dt2)
 
 st.write("##### Date Range:")
 st.write(f"Start Date: **{dates['startDate'].strftime('%d-%m-%Y')}**")
 st.write(f"End Date: **{dates['endDate'].strftime('%d-%m-%Y')}**")
 
 
-# Read index file based on selected universe
-if U == 'NSEETF':
-    file_path = 'https://raw.githubusercontent.com/prayan2702/ETF-Momo-app/refs/heads/main/NSE_ETF.csv'
-
+# Universe table from the local file; parsed once and re-read only when the file changes
+with st.sidebar:
+    if U in registry.BUNDLED and st.button("Refresh Universe from GitHub"):
+        try:
+            registry.refresh(U)
+            st.success(f"{U} universe updated")
+        except Exception as e:
+            st.error(f"Universe refresh failed: {e}")
 
-df = pd.read_csv(file_path)
-df['Yahoo_Symbol'] = df.Symbol + '.NS'
-df = df.set_index('Yahoo_Symbol')
+df = registry.load_universe(U)
 symbol = list(df.index)
 
+# Rank each downloaded chunk as it lands instead of waiting for the whole universe
+show_partial = st.checkbox("Show provisional rankings while downloading", value=True)
+
 # Add a button to start the process
 start_button = st.button("Start Data Download")
 
+# Results are cached per (universe, data date, lookback date, benchmark, ranking method),
+# so once started, changing the method or revisiting a date reruns instantly
 if start_button:
-    # Download data when the button is pressed
-    CHUNK = 50
-    close = []
-    high = []
-    volume = []
-
-    # Create a progress bar
-    progress_bar = st.progress(0)
-    status_text = st.empty()  # Placeholder for progress text
-
-    # Track the number of stocks downloaded
-    total_symbols = len(symbol)
-    chunk_count = (total_symbols // CHUNK) + (1 if total_symbols % CHUNK != 0 else 0)
-
-    # Use a separate list to handle failed downloads
-    failed_symbols = []
-
-    for k in range(0, len(symbol), CHUNK):
-        _symlist = symbol[k:k + CHUNK]
-
-        # Try downloading data for each chunk of symbols
-        try:
-            _x = yf.download(_symlist, start=dates['startDate'], progress=False, auto_adjust = True, threads = True, multi_level_index=False)
-            close.append(_x['Close'])
-            high.append(_x['High'])
-            volume.append(_x['Close'] * _x['Volume'])
-        except Exception as e:
-            failed_symbols.extend(_symlist)  # Add failed symbols to the list
-            st.write(f"Failed to download data for: {', '.join(_symlist)}. Error: {e}")
-
-        # Update progress bar after each chunk
-        progress = (k + CHUNK) / total_symbols
-        progress = min(max(progress, 0.0), 1.0)  #newly added for progress bar error
-        progress_bar.progress(progress)
-
-        # Update status text with progress percentage
-        progress_percentage = int(progress * 100)
-        status_text.text(f"Downloading... {progress_percentage}%")
-
-        time.sleep(0.5)
+    st.session_state['started'] = True
+
+cache = get_cache()
+data_date = datetime.today().strftime('%Y-%m-%d')
+
+if not st.session_state.get('started'):
+    # Landing page: the most recent stored ranking, read from a small local file
+    latest = get_history().latest(U, ranking_method)
+    if latest is None:
+        st.write("No saved ranking yet for this universe and method; start a download to compute one.")
+    else:
+        latest_date, latest_ranked = latest
+        st.info(f"Latest saved ranking ({latest_date.strftime('%d-%m-%Y')}), filtered. "
+                f"Start the download to refresh it.")
+        st.write(filtered_view(latest_ranked, ranking_method))
+        with st.expander("Unfiltered", expanded=False):
+            st.write(latest_ranked)
+
+if st.session_state.get('started'):
+    import pandas as pd
+    from dateutil.relativedelta import relativedelta
+
+    from etf_momo.analytics import portfolio_analytics
+    from etf_momo.backtest import FREQUENCIES, run_backtest
+    from etf_momo.export import XLSX_MIME, build_excel, excel_file_name
+    from etf_momo.incremental import IncrementalStats
+    from etf_momo.pipeline import build_stats, fetch_prices, has_panel, panel_path, rank_stats, snapshot_date
+    from etf_momo.price_store import PriceStore
+    from etf_momo.risk import correlation_clusters
+    from etf_momo.streaming import stream_stats
+
+    prefetcher = get_prefetcher()
+    prices_key = prices_cache_key(U, data_date)
+    prices = cache.prices.get(prices_key)
+    if prices is None and prefetcher is not None and prefetcher.busy:
+        # the background refresh is producing this data right now; wait for it rather than download twice
+        with st.spinner("Waiting for the background refresh to finish..."):
+            prefetcher.wait_idle()
+        prices = cache.prices.get(prices_key)
+    if prices is None:
+        # Bring the local price store up to date; only the missing tail of each
+        # symbol is downloaded, full history is fetched once per symbol.
+        CHUNK = 50
+        MAX_WORKERS = 4
+        store = PriceStore()
+
+        # Create a progress bar
+        progress_bar = st.progress(0)
+        status_text = st.empty()  # Placeholder for progress text
+
+        def on_chunk(result, done, total):
+            progress = min(done / total, 1.0) if total else 1.0
+            progress_bar.progress(progress)
+            # Per-chunk timing for the last finished chunk
+            state = "ok" if result.ok else "failed"
+            status_text.text(f"Downloading... {int(progress * 100)}% "
+                             f"(chunk of {len(result.symbols)} {state} in {result.elapsed:.1f}s, "
+                             f"attempts: {result.attempts})")
+
+        # Chunks run concurrently (MAX_WORKERS at a time) and are retried with
+        # backoff; symbols that still fail are reported below. Benchmark
+        # indices for beta/correlation are kept in the same store.
+        # The day's panel is saved as float32 arrays and memory-mapped, so all
+        # sessions (and batch jobs) share one read-only copy
+        panel_dir = panel_path(U, data_date)
+        if show_partial and not has_panel(panel_dir):
+            # dfStats is computed chunk by chunk; the provisional ranking of the
+            # symbols downloaded so far is redrawn after every chunk
+            preview_caption = st.empty()
+            preview = st.empty()
+
+            def on_partial(partial, result, done, total):
+                if result is not None:
+                    on_chunk(result, done, total)
+                if not partial.empty:
+                    provisional, _ = rank_stats(partial, ranking_method)
+                    preview_caption.info(f"Provisional ranking: {len(partial)} of {len(symbol)} symbols "
+                                         f"downloaded")
+                    preview.dataframe(provisional)
+
+            streamed, failed = stream_stats(df, store, dates['endDate'], benchmark_mode, start=dates['startDate'],
+                                            chunk=CHUNK, max_workers=MAX_WORKERS, on_partial=on_partial)
+            preview_caption.empty()
+            preview.empty()
+            cache.stats.set(stats_cache_key(U, data_date, dt2, benchmark_mode), streamed)
+            # the store is current now; the panel is only assembled for analytics and backtests
+            prices = fetch_prices(df, store, update=False, panel_dir=panel_dir, failed=failed)
+        else:
+            prices = fetch_prices(df, store, start=dates['startDate'], chunk=CHUNK, max_workers=MAX_WORKERS,
+                                  on_chunk=on_chunk, panel_dir=panel_dir)
 
         # After the download is complete, update the progress bar and text
-    progress_bar.progress(1.0)
-    status_text.text("Download complete!")
+        progress_bar.progress(1.0)
+        status_text.text("Download complete!")
+
+        cache.prices.set(prices_key, prices)
+    close, high, volume = prices.close, prices.high, prices.volume
+    failed_symbols = prices.failed
 
 #*******************************************
     # Applied filter descriptions
-    filters = [
-        "Volume greater than 1 crore (volm_cr > 1)",
-        "Closing price above 200-day moving average (Close > dma200d)",
-        "12-month Rate of Change (ROC) greater than 6.5% (roc12M > 6.5)",
-        "Away from All-Time High within 25% (AWAY_ATH > -25)"
-    ]
+    filters = [f.label for f in MOMENTUM_FILTERS]
 
     # Sidebar menu for filters
     with st.sidebar:
@@ -230,305 +247,150 @@ if start_button:
     if failed_symbols:
         st.write(f"Failed to download data for the following symbols: {', '.join(failed_symbols)}")
 
-
-    # Convert close, high, and volume lists to DataFrames
-    close = pd.concat(close, axis=1) if close else pd.DataFrame()
-    high = pd.concat(high, axis=1) if high else pd.DataFrame()
-    volume = pd.concat(volume, axis=1) if volume else pd.DataFrame()
-
-    # Ensure the index is datetime
-    close.index = pd.to_datetime(close.index)
-    high.index = pd.to_datetime(high.index)
-    volume.index = pd.to_datetime(volume.index)
-
-    data20Y = close.loc[:dates['endDate']].copy()
-    volume20Y = volume.loc[:dates['endDate']].copy()
-    high20Y = high.loc[:dates['endDate']].copy()
-    volume12M = volume20Y.loc[dates['date12M']:].copy()
-
-
-    # At least 12 months of trading is required
-    data12M = data20Y.loc[dates['date12M']:].copy()
-    data9M = data20Y.loc[dates['date9M']:].copy()
-    data6M = data20Y.loc[dates['date6M']:].copy()
-    data3M = data20Y.loc[dates['date3M']:].copy()
-    data1M = data20Y.loc[dates['date1M']:].copy()
-
-    #******************
-
-    # Calculate metrics for dfStats (e.g., 1 month momentum, 3-month volatility, etc.)
-    dfStats = pd.DataFrame(index=symbol)
-    dfStats['Close'] = round(data12M.iloc[-1], 2)
-    data12M_Temp = data12M.fillna(0)
-    dfStats['dma200d'] = round(data12M_Temp.rolling(window=200).mean().iloc[-1], 2)  # 200-day DMA
-    # Rate of change
-
-    dfStats['roc12M'] = getAbsReturns(data12M)
-    dfStats['roc9M'] = getAbsReturns(data9M)
-    dfStats['roc6M'] = getAbsReturns(data6M)
-    dfStats['roc3M'] = getAbsReturns(data3M)
-
-
-    # Volatility
-
-    dfStats['vol12M'] = getVolatility(getDailyReturns(data12M))
-    dfStats['vol9M'] = getVolatility(getDailyReturns(data9M))
-    dfStats['vol6M'] = getVolatility(getDailyReturns(data6M))
-    dfStats['vol3M'] = getVolatility(getDailyReturns(data3M))
-
-    dfStats['sharpe12M'] = getSharpeRoC(dfStats['roc12M'], dfStats['vol12M'])
-    dfStats['sharpe9M'] = getSharpeRoC(dfStats['roc9M'], dfStats['vol9M'])
-    dfStats['sharpe6M'] = getSharpeRoC(dfStats['roc6M'], dfStats['vol6M'])
-    dfStats['sharpe3M'] = getSharpeRoC(dfStats['roc3M'], dfStats['vol3M'])
-
-    dfStats['avgSharpe'] = (dfStats[["sharpe12M", "sharpe9M", "sharpe6M", "sharpe3M"]].mean(axis=1)).round(2)  # 1st Factor #1st Factor
-
-    dfStats['volm_cr'] = (getMedianVolume(volume12M) / 1e7).round(2)
-
-    #***************************
-
-    # Calculate ATH and Away from ATH% (Additional added condition)
-    dfStats['ATH'] = round(high20Y.max(), 2)
-    dfStats['AWAY_ATH'] = round((dfStats['Close'] / dfStats['ATH'] - 1) * 100, 2)  # Calculate %away from ALL TIME HIGH
-
-
-    # Add 'Ticker' as a reset index column and rename it
-    dfStats = dfStats.reset_index().rename(columns={'index': 'Ticker'})
-
-    #Convert to String and Remove the .NS Suffix
-    dfStats['Ticker'] = dfStats['Ticker'].astype(str)
-    dfStats['Ticker'] = dfStats['Ticker'].str.replace('.NS', '', case=False, regex=False)
-
-    # Handle Nan and inf values to zero(0) for ranking
-    dfStats['avgSharpe'] = dfStats['avgSharpe'].replace([np.inf, -np.inf], np.nan).fillna(0)
-    dfStats['sharpe3M'] = dfStats['sharpe3M'].replace([np.inf, -np.inf], np.nan).fillna(0)
-
-
-    # Add Rank column based on 'avgSharpe' and sort by Rank
-    dfStats['Rank'] = dfStats[ranking_method].rank(ascending=False,method='first').astype(int)
-    dfStats = dfStats.sort_values('Rank').set_index('Rank')  # Set 'Rank' as index
-
-    # Show both filtered and unfiltered data in Streamlit
-    st.info("Unfiltered Data:")
-    st.write(dfStats)
-
-    # Apply conditions
-    cond1 = dfStats['volm_cr'] > 1  #volume filter greater than 1 crore
-    cond2 = dfStats['Close'] > dfStats['dma200d']  # above 200-day DMA
-    cond3 = dfStats['roc12M'] > 6.5  # 12 month Rate of Change > 6.5%
-    cond4 = dfStats['AWAY_ATH'] > -25 #Away from All Time High within 25%
-
-
-    # Create final momentum filter column
-    dfStats['final_momentum'] = cond1 & cond2 & cond3 & cond4
-
-
-#*************************************
-
-    # Filter stocks meeting all conditions
-    filtered = dfStats[dfStats['final_momentum']].sort_values(ranking_method, ascending=False)
-
-    st.info("Filtered Data:")
-    st.write(filtered)
-
-#***********************************************************
-    import openpyxl
-    from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
-
-
-    def format_excel(file_name):
-        # Open the written file using openpyxl
-        wb = openpyxl.load_workbook(file_name)
-        ws = wb.active
-
-        # Add Borders to All Cells
-        thin_border = Border(left=Side(style="thin"), right=Side(style="thin"), top=Side(style="thin"),
-                             bottom=Side(style="thin"))
-
-        for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
-            for cell in row:
-                cell.border = thin_border
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        # Freeze the top row
-        ws.freeze_panes = 'A2'
-
-        # Format headers
-        header_fill = PatternFill(start_color="00008B", end_color="00008B", fill_type="solid")  # Dark blue
-        header_font = Font(bold=True, color="FFFFFF")
-        for col in range(1, ws.max_column + 1):
-            cell = ws.cell(row=1, column=col)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        # Automatically adjust column widths based on content
-        for col in ws.columns:
-            max_length = 0
-            column = col[0].column
-            for cell in col:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            adjusted_width = max_length + 2
-            ws.column_dimensions[cell.column_letter].width = adjusted_width
-
-        # Define cell color for cells that do not meet filter conditions
-        no_condition_fill = PatternFill(start_color="d6b4fc", end_color="d6b4fc", fill_type="solid")
-        bold_font = Font(bold=True)
-
-        # Get the headers and find column indexes by name
-        headers = [cell.value for cell in ws[1]]
-        col_indices = {
-            'volm_cr': headers.index('volm_cr') + 1,
-            'Close': headers.index('Close') + 1,
-            'dma200d': headers.index('dma200d') + 1,
-            'AWAY_ATH': headers.index('AWAY_ATH') + 1,
-            'roc12M': headers.index('roc12M') + 1,
-            'Ticker': headers.index('Ticker') + 1,
-            'Rank': headers.index('Rank') + 1
-        }
-
-        # Apply conditional formatting
-        for row in range(2, ws.max_row + 1):
-            condition_failed = False
-            if (volume := ws.cell(row=row, column=col_indices['volm_cr']).value) is not None and volume < 1:
-                ws.cell(row=row, column=col_indices['volm_cr']).fill = no_condition_fill
-                condition_failed = True
-            if (close := ws.cell(row=row, column=col_indices['Close']).value) is not None and close <= ws.cell(row=row,
-                                                                                                               column=
-                                                                                                               col_indices[
-                                                                                                                   'dma200d']).value:
-                ws.cell(row=row, column=col_indices['Close']).fill = no_condition_fill
-                condition_failed = True
-            if (away_ath := ws.cell(row=row, column=col_indices['AWAY_ATH']).value) is not None and away_ath <= -25:
-                ws.cell(row=row, column=col_indices['AWAY_ATH']).fill = no_condition_fill
-                condition_failed = True
-            if (roc12M := ws.cell(row=row, column=col_indices['roc12M']).value) is not None and roc12M <= 6.5:
-                ws.cell(row=row, column=col_indices['roc12M']).fill = no_condition_fill
-                condition_failed = True
-            if condition_failed:
-                ws.cell(row=row, column=col_indices['Ticker']).fill = no_condition_fill
-
-                # Round off "ATH" column values
-                ath_idx = None
-                for col in range(1, ws.max_column + 1):
-                    if ws.cell(row=1, column=col).value == "ATH":  # Search for "ATH" header
-                        ath_idx = col
-                        break
-                if ath_idx:
-                    for row in range(2, ws.max_row + 1):
-                        cell = ws.cell(row=row, column=ath_idx)
-                        if isinstance(cell.value, (int, float)):
-                            cell.value = round(cell.value)
-
-        # Save the modified Excel file
-        wb.save(file_name)
-        print(f"\nExcel file '{file_name}' updated with formatting\n")
-
-
-#*********************************************************
-
-
-    def format_filtered_excel(file_name):
-        # Open the written file using openpyxl
-        wb = openpyxl.load_workbook(file_name)
-        ws = wb["Filtered ETF"]  # Specify the "Filtered Stocks" sheet
-
-        # Add Borders to All Cells
-        thin_border = Border(left=Side(style="thin"), right=Side(style="thin"), top=Side(style="thin"),
-                             bottom=Side(style="thin"))
-
-        for row in ws.iter_rows(min_row=1, max_row=ws.max_row, min_col=1, max_col=ws.max_column):
-            for cell in row:
-                cell.border = thin_border
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-
-        # Freeze the top row
-        ws.freeze_panes = 'A2'
-
-        # Format headers
-        header_fill = PatternFill(start_color="00008B", end_color="00008B", fill_type="solid")  # Dark blue
-        header_font = Font(bold=True, color="FFFFFF")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-
-        for col in range(1, ws.max_column + 1):
-            cell = ws.cell(row=1, column=col)
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = header_alignment
-
-        # Automatically adjust column widths based on content
-        for col in ws.columns:
-            max_length = 0
-            for cell in col:
-                if cell.value:
-                    max_length = max(max_length, len(str(cell.value)))
-            adjusted_width = max_length + 2
-            ws.column_dimensions[col[0].column_letter].width = adjusted_width
-
-        # Round off "ATH" column values
-        ath_idx = None
-        for col in range(1, ws.max_column + 1):
-            if ws.cell(row=1, column=col).value == "ATH":  # Search for "ATH" header
-                ath_idx = col
-                break
-        if ath_idx:
-            for row in range(2, ws.max_row + 1):
-                cell = ws.cell(row=row, column=ath_idx)
-                if isinstance(cell.value, (int, float)):
-                    cell.value = round(cell.value)
-
-        # Append '%' to "AWAY_ATH" column values
-        away_ath_idx = None
-        for col in range(1, ws.max_column + 1):
-            if ws.cell(row=1, column=col).value == "AWAY_ATH":
-                away_ath_idx = col
-                break
-
-        if away_ath_idx:
-            for row in range(2, ws.max_row + 1):
-                cell = ws.cell(row=row, column=away_ath_idx)
-                if isinstance(cell.value, (int, float)):
-                    cell.value = f"{cell.value}%"
-
-	 # Add summary
-        total_filtered_stocks = ws.max_row - 1
-        ws.append([])  # Empty row
-        ws.append(["Summary"])  # Summary heading
-        summary_start_row = ws.max_row
-        ws.append([f"Total Filtered ETF:  {total_filtered_stocks}"])
-
-
-        # Apply bold font to the summary
-        for row in ws.iter_rows(min_row=summary_start_row, max_row=ws.max_row, min_col=1, max_col=1):
-            for cell in row:
-                cell.font = Font(bold=True)
-
-        wb.save(file_name)
-        print("\nFiltered Excel file formatted and updated with summary.\n")
-
-
+    # Rolling metric state for this panel: moving the lookback date forward
+    # only folds in the new trading days instead of recomputing every window
+    engine = cache.engines.get_or_compute(prices_key, lambda: IncrementalStats.from_panel(
+        prices.panel, dates['endDate'], symbol))
+    stats_key = stats_cache_key(U, data_date, dt2, benchmark_mode)
+    dfStats = cache.stats.get_or_compute(stats_key, lambda: build_stats(prices, df, dates['endDate'], benchmark_mode,
+                                                                        engine=engine))
 
 #********************************************************
-    # Format the filename with the lookback date, universe, and other parameters
-    excel_file = f"{selected_date.strftime('%Y-%m-%d')}_{U}_{ranking_method}_lookback.xlsx"
+    ranking_key = ranking_cache_key(U, data_date, dt2, benchmark_mode, ranking_method)
+    ranked = cache.rankings.get(ranking_key)
+    if ranked is None:
+        dfRanked, filtered = rank_stats(dfStats, ranking_method)
+
+        # Format the filename with the lookback date, universe, and other parameters
+        excel_file = excel_file_name(selected_date, U, ranking_method)
+
+        # Formatted workbook (both sheets) built in memory, nothing is written to disk
+        excel_bytes = build_excel(dfRanked, filtered)
+        ranked = (dfRanked, filtered, excel_file, excel_bytes)
+        cache.rankings.set(ranking_key, ranked)
+        # keyed by the last trading day in the data, so a weekend run replaces Friday's snapshot
+        get_history().record(dfRanked, snapshot_date(prices.panel.dates, dates['endDate']), U, ranking_method)
+    dfStats, filtered, excel_file, excel_bytes = ranked
 
-    # Save filtered data to Excel
-    with pd.ExcelWriter(excel_file, engine="openpyxl") as writer:
-        dfStats.to_excel(writer, sheet_name="Unfiltered ETF", index=True)  # Unfiltered data
-        filtered.to_excel(writer, sheet_name="Filtered ETF", index=True)  # Filtered data
+    # Show both filtered and unfiltered data in Streamlit
+    with span('render tables'):
+        st.info("Unfiltered Data:")
+        st.write(dfStats)
 
-    # Format the Unfiltered Excel file
-    format_excel(excel_file)
-    # Format the filtered sheet
-    format_filtered_excel(excel_file)
+        st.info("Filtered Data:")
+        st.write(filtered)
 
     # Download button for the Excel file
     st.download_button(
         label="Download Stock Data as Excel",
-        data=open(excel_file, "rb").read(),
+        data=excel_bytes,
         file_name=excel_file,
-        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        mime=XLSX_MIME
     )
+
+#***************************************************************
+    # Risk analytics for the filtered ETFs and an equal-weight top-N basket
+    with st.expander("Portfolio Analytics", expanded=False):
+        an_years = st.slider("Analytics Period (years)", min_value=1, max_value=20, value=5)
+        an_top_n = st.number_input("Basket Size (Top N)", min_value=1, max_value=len(symbol), value=10,
+                                   key="an_top_n")
+        members = list(filtered['Ticker'] + '.NS')
+        an_key = ranking_key + ('analytics', an_years, int(an_top_n))
+        analytics = cache.rankings.get_or_compute(an_key, lambda: portfolio_analytics(
+            close, members, top_n=int(an_top_n), start=dates['endDate'] - relativedelta(years=an_years),
+            end=dates['endDate']))
+        st.dataframe(analytics)
+
+#***************************************************************
+    # Clustered 12-month return correlations to spot ETFs tracking the same index
+    with st.expander("Correlation Clusters", expanded=False):
+        corr_threshold = st.slider("Duplicate Correlation Threshold", min_value=0.80, max_value=1.0, value=0.98,
+                                   step=0.01)
+        corr_key = stats_key + ('correlation', corr_threshold)
+        corr, dupes = cache.rankings.get_or_compute(corr_key, lambda: correlation_clusters(
+            close, dates['date12M'], dates['endDate'], threshold=corr_threshold))
+        st.write("ETF groups that move together (likely tracking the same index):")
+        st.dataframe(dupes, hide_index=True)
+        corr = corr.rename(index=lambda c: c.replace('.NS', ''), columns=lambda c: c.replace('.NS', ''))
+        st.dataframe(corr.style.background_gradient(cmap="RdYlGn", vmin=-1, vmax=1).format("{:.2f}"))
+
+#***************************************************************
+    # Rank trajectories, basket entries/exits and rank changes across every stored ranking run
+    with st.expander("Ranking History", expanded=False):
+        history = get_history()
+        hist_dates = history.dates(U, ranking_method)
+        st.write(f"{len(hist_dates)} stored {ranking_method} rankings of {U}")
+        if len(hist_dates) > 1:
+            hist_tickers = st.multiselect("Tickers", list(dfStats['Ticker']), default=list(filtered['Ticker'][:5]))
+            if hist_tickers:
+                st.write("Rank over time (1 = best)")
+                st.line_chart(history.trajectory(hist_tickers, U, ranking_method))
+            hist_top_n = st.number_input("Basket Size for Entries/Exits", min_value=1, max_value=len(symbol),
+                                         value=10, key="hist_top_n")
+            st.dataframe(history.changes(U, ranking_method, top_n=int(hist_top_n)), hide_index=True)
+            st.write("Rank change since the previous run (positive = moved up)")
+            heat = history.heatmap(U, ranking_method, top=20)
+            heat.columns = [d.strftime('%Y-%m-%d') for d in heat.columns]
+            st.dataframe(heat.style.background_gradient(cmap="RdYlGn", axis=None).format("{:.0f}", na_rep=""))
+
+#***************************************************************
+    # Historical backtest on the same cached price panel
+    with st.expander("Backtest", expanded=False):
+        bt_range = st.date_input("Backtest Date Range",
+                                 (dates['endDate'] - relativedelta(years=5), dates['endDate']))
+        bt_freq = st.selectbox("Rebalance Frequency", list(FREQUENCIES), index=0)
+        bt_top_n = st.number_input("Top N", min_value=1, max_value=len(symbol), value=10)
+        if st.button("Run Backtest") and len(bt_range) == 2:
+            bt_key = stats_key + ('backtest', str(bt_range[0]), str(bt_range[1]), bt_freq, int(bt_top_n),
+                                  ranking_method)
+            bt = cache.rankings.get_or_compute(bt_key, lambda: run_backtest(
+                close, high, volume, bt_range[0], bt_range[1], freq=bt_freq, top_n=int(bt_top_n),
+                ranking_method=ranking_method))
+            st.write(bt.summary())
+            st.line_chart(bt.equity, y_label="Equity")
+            st.write("Turnover per rebalance")
+            st.bar_chart(bt.turnover)
+            st.write("Holdings")
+            st.dataframe(pd.DataFrame({d.strftime('%Y-%m-%d'): ', '.join(h).replace('.NS', '')
+                                       for d, h in bt.holdings.items()}.items(),
+                                      columns=['Rebalance Date', 'Holdings']), hide_index=True)
 #***************************************************************
 
+# Cache counters are rendered last so they include this run; the background
+# refresh is scheduled here, after the landing page has been painted
+prefetcher = get_prefetcher()
+with st.sidebar:
+    with st.expander("Cache", expanded=False):
+        for name, layer in cache.layers().items():
+            c = layer.stats()
+            st.write(f"**{name}**: {c['hits']} hits / {c['misses']} misses ({c['size']}/{c['maxsize']} entries)")
+        if prefetcher is not None:
+            for run in prefetcher.runs[-len(prefetcher.universes):]:
+                state = (f"failed ({run['error']})" if 'error' in run else
+                         f"{run['seconds']:.0f}s" + ("" if run['new_bar'] else ", no new bar"))
+                st.write(f"Background refresh of {run['universe']}: {run['started']:%d-%m %H:%M}, {state}")
+        if st.button("Clear cache"):
+            cache.clear()
+
+# Memory used by the price panel of this universe and by the server process
+with st.sidebar:
+    with st.expander("Memory", expanded=False):
+        if st.session_state.get('started') and prices is not None:
+            panel = prices.panel
+            st.write(f"Price panel: **{panel.nbytes / 2**20:.1f} MB** float32 "
+                     f"({'shared memory map' if panel.is_mapped else 'in memory'}), "
+                     f"{len(panel.dates)} dates x {len(panel.symbols)} symbols")
+            st.write(f"Same data as float64 DataFrames: {panel.nbytes * 2 / 2**20:.1f} MB")
+        peak = process_memory_mb()
+        if peak is not None:
+            st.write(f"Server process peak memory: {peak:.0f} MB")
+
+# Stage timings of this run (cached stages do not appear)
+if profiler is not None:
+    profiler.stop()
+    with profiling_box:
+        st.dataframe(profiler.table(), hide_index=True)
+        st.download_button("Download timings (JSON)", profiler.to_json(), file_name="etf_momo_profile.json",
+                           mime="application/json")
+        st.download_button("Download Chrome trace", profiler.to_chrome_trace(), file_name="etf_momo_trace.json",
+                           mime="application/json")
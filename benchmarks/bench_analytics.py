@@ -0,0 +1,45 @@
+"""Risk analytics for the whole universe on a 20-year synthetic panel.
+
+    python -m benchmarks.bench_analytics
+
+Also compares the column-wise getMonthlyPrices against the original
+groupby/concat loop.
+"""
+import time
+import warnings
+
+import pandas as pd
+
+from etf_momo.analytics import portfolio_analytics
+from etf_momo.helpers import getMonthlyPrices
+from etf_momo.synthetic import synthetic_panel
+
+warnings.simplefilter('ignore')
+
+
+def monthly_prices_loop(data):
+    # original implementation, kept for comparison
+    grps = data.groupby([data.index.year, data.index.month])
+    monthlyPrices = pd.DataFrame()
+    for k in grps:
+        monthlyPrices = pd.concat([monthlyPrices, k[1].tail(1)])
+    return monthlyPrices
+
+
+def main(n_symbols=200, n_days=6000):
+    close = synthetic_panel(n_symbols, n_days)['Close']
+    t0 = time.perf_counter()
+    old = monthly_prices_loop(close)
+    t1 = time.perf_counter()
+    new = getMonthlyPrices(close)
+    t2 = time.perf_counter()
+    print(f'getMonthlyPrices: loop {(t1 - t0) * 1000:.1f} ms, vectorized {(t2 - t1) * 1000:.1f} ms, '
+          f'equal: {old.equals(new)}')
+    t0 = time.perf_counter()
+    table = portfolio_analytics(close, list(close.columns), top_n=10)
+    print(f'portfolio_analytics for {n_symbols} symbols + basket: {(time.perf_counter() - t0) * 1000:.1f} ms')
+    print(table.tail(3).to_string())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,27 @@
+"""Twenty years of monthly rebalances over a 200-ETF synthetic panel.
+
+    python -m benchmarks.bench_backtest
+"""
+import time
+import warnings
+
+from etf_momo.backtest import run_backtest
+from etf_momo.synthetic import synthetic_panel
+
+warnings.simplefilter('ignore')
+
+
+def main(n_symbols=200, n_days=6000):
+    panel = synthetic_panel(n_symbols, n_days)
+    close, high = panel['Close'], panel['High']
+    volume = close * panel['Volume']
+    start, end = close.index[260], close.index[-1]
+    for freq in ('monthly', 'weekly'):
+        t0 = time.perf_counter()
+        res = run_backtest(close, high, volume, start, end, freq=freq, top_n=10)
+        wall = time.perf_counter() - t0
+        print(f'{freq:<8} {len(res.turnover)} rebalances in {wall:.2f}s  {res.summary()}')
+
+
+if __name__ == '__main__':
+    main()
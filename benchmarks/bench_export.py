@@ -0,0 +1,38 @@
+"""Excel export time against table size.
+
+    python -m benchmarks.bench_export
+
+build_excel should cost a constant amount per row; the old openpyxl
+formatter re-rounded the whole ATH column once per failing row.
+"""
+import time
+import warnings
+
+from etf_momo.export import build_excel
+from etf_momo.metrics import compute_stats, momentum_filter
+from etf_momo.synthetic import synthetic_panel
+
+warnings.simplefilter('ignore')
+
+
+def ranked_tables(n_symbols, n_days=400):
+    panel = synthetic_panel(n_symbols, n_days)
+    close = panel['Close']
+    stats = compute_stats(close, panel['High'], close * panel['Volume'], close.index[-1])
+    stats['Rank'] = stats['avgSharpe'].rank(ascending=False, method='first').astype(int)
+    stats = stats.sort_values('Rank').set_index('Rank')
+    stats['final_momentum'] = momentum_filter(stats)
+    return stats, stats[stats['final_momentum']]
+
+
+def main(sizes=(200, 1000, 5000, 20000)):
+    for n in sizes:
+        stats, filtered = ranked_tables(n)
+        t0 = time.perf_counter()
+        data = build_excel(stats, filtered)
+        wall = time.perf_counter() - t0
+        print(f'{n:>6} rows: {wall * 1000:8.1f} ms  {wall / n * 1e6:6.1f} us/row  {len(data) / 1024:8.1f} KiB')
+
+
+if __name__ == '__main__':
+    main()
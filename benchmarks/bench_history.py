@@ -0,0 +1,78 @@
+"""Ranking history: write years of daily snapshots, then time the views.
+
+    python -m benchmarks.bench_history
+
+Queries should stay in milliseconds however many snapshots are stored,
+since each one only reads the index range it returns.
+"""
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from etf_momo.history import RankingHistory
+from etf_momo.pipeline import rank_stats
+
+warnings.simplefilter('ignore')
+
+
+def snapshots(n_tickers, n_days, seed=0):
+    """Synthetic dfStats per business day with slowly drifting Sharpe ratios."""
+    rng = np.random.default_rng(seed)
+    tickers = [f'SYM{i:04d}' for i in range(n_tickers)]
+    sharpe = np.cumsum(rng.normal(0, 0.1, (n_days, n_tickers)), axis=0)
+    for day, row in zip(pd.bdate_range('2015-01-01', periods=n_days), sharpe):
+        yield day, pd.DataFrame({'Ticker': tickers, 'Close': 100.0, 'sharpe3M': row.round(2), 'avgSharpe': 0.0,
+                                 'dma200d': 90.0, 'roc12M': 10.0, 'volm_cr': 1.0, 'AWAY_ATH': -5.0})
+
+
+def timed(fn, repeat=20):
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return out, best * 1e3
+
+
+def main(n_tickers=200, years=10):
+    tmp = tempfile.mkdtemp(prefix='etf_momo_history_')
+    try:
+        history = RankingHistory(os.path.join(tmp, 'history.sqlite'))
+        n_days = years * 252
+        t0 = time.perf_counter()
+        for day, stats in snapshots(n_tickers, n_days):
+            ranked, _ = rank_stats(stats, 'sharpe3M')
+            history.record(ranked, day, 'BENCH', 'sharpe3M')
+        wall = time.perf_counter() - t0
+        size = os.path.getsize(history.path) / 2**20
+        print(f'{n_days} snapshots x {n_tickers} tickers recorded in {wall:.1f}s '
+              f'({wall / n_days * 1e3:.1f} ms per run incl. ranking), {size:.0f} MB')
+
+        dates = history.dates('BENCH', 'sharpe3M')
+        last = dates[-1]
+        six_months = last - pd.DateOffset(months=6)
+        views = {
+            'dates': lambda: history.dates('BENCH', 'sharpe3M'),
+            'snapshot (1 day)': lambda: history.snapshot(last, 'BENCH', 'sharpe3M'),
+            'trajectory 5 tickers, all years': lambda: history.trajectory(
+                ['SYM0001', 'SYM0002', 'SYM0003', 'SYM0004', 'SYM0005'], 'BENCH', 'sharpe3M'),
+            'trajectory 1 ticker, 6 months': lambda: history.trajectory(['SYM0001'], 'BENCH', 'sharpe3M',
+                                                                        start=six_months),
+            'entries/exits top 10, 6 months': lambda: history.changes('BENCH', 'sharpe3M', start=six_months,
+                                                                       top_n=10),
+            'heatmap top 20, 6 months': lambda: history.heatmap('BENCH', 'sharpe3M', start=six_months),
+        }
+        for name, fn in views.items():
+            out, ms = timed(fn)
+            print(f'{name:<34} {ms:8.2f} ms  ({len(out)} rows)')
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,63 @@
+"""Rolling-state daily updates of dfStats vs a full recompute per day.
+
+    python -m benchmarks.bench_incremental
+
+The engine is initialised a year back and advanced one trading day at a
+time; every day's dfStats is checked against ``panel_stats``.
+"""
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from etf_momo.incremental import IncrementalStats
+from etf_momo.metrics import panel_stats
+from etf_momo.panel import PricePanel
+from etf_momo.synthetic import synthetic_panel
+
+warnings.simplefilter('ignore')
+
+
+def main(n_symbols=500, n_days=3000, n_updates=250):
+    raw = synthetic_panel(n_symbols, n_days)
+    close = raw['Close']
+    # a few gaps and a missing symbol to exercise the forward fill and the windows
+    rng = np.random.default_rng(1)
+    close = close.mask(rng.random(close.shape) < 0.01)
+    panel = PricePanel.from_frames({'Close': close, 'High': raw['High'], 'Volume': close * raw['Volume']})
+    symbols = list(panel.symbols) + ['MISSING.NS']
+    dates = panel.dates[-n_updates:]
+
+    t0 = time.perf_counter()
+    eng = IncrementalStats.from_panel(panel, dates[0], symbols)
+    init = time.perf_counter() - t0
+
+    step = full = 0.0
+    mismatches = 0
+    for i, d in enumerate(dates):
+        if i:
+            t0 = time.perf_counter()
+            got = eng.stats_at(d)
+            step += time.perf_counter() - t0
+        else:
+            got = eng.stats()
+        t0 = time.perf_counter()
+        ref = panel_stats(panel, d, symbols)
+        full += time.perf_counter() - t0
+        try:
+            pd.testing.assert_frame_equal(got, ref, check_exact=True)
+        except AssertionError as e:
+            mismatches += 1
+            if mismatches == 1:
+                print(f'first mismatch on {d.date()}: {e}')
+
+    n = len(dates) - 1
+    print(f'{n_symbols} symbols, {n} daily updates; init {init * 1e3:.1f} ms')
+    print(f'incremental update: {step / n * 1e3:.2f} ms/day')
+    print(f'full panel_stats:   {full / len(dates) * 1e3:.2f} ms/day ({full / len(dates) / (step / n):.1f}x)')
+    print('equivalent to panel_stats' if not mismatches else f'{mismatches} days differ from panel_stats')
+
+
+if __name__ == '__main__':
+    main()
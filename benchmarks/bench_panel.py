@@ -0,0 +1,46 @@
+"""Peak memory of dfStats: float64 frames with window copies vs a float32 PricePanel.
+
+    python -m benchmarks.bench_panel
+"""
+import tempfile
+import tracemalloc
+import warnings
+
+from benchmarks.bench_metrics import app_dates
+from etf_momo.helpers import getStats
+from etf_momo.metrics import panel_stats
+from etf_momo.panel import PricePanel
+from etf_momo.synthetic import synthetic_panel
+
+warnings.simplefilter('ignore')
+
+
+def peak_mb(fn):
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2**20
+
+
+def main(n_symbols=200, n_days=6000):
+    raw = synthetic_panel(n_symbols, n_days)
+    close, high = raw['Close'], raw['High']
+    volume = close * raw['Volume']
+    end = close.index[-1]
+    frames_mb = sum(f.memory_usage(index=False).sum() for f in (close, high, volume)) / 2**20
+    panel = PricePanel.from_frames({'Close': close, 'High': high, 'Volume': volume})
+    print(f'{n_symbols} x {n_days}: float64 frames {frames_mb:.1f} MB, float32 panel {panel.nbytes / 2**20:.1f} MB')
+    ref = peak_mb(lambda: getStats(close, high, volume, app_dates(end), list(close.columns)))
+    print(f'reference getStats peak extra memory: {ref:.1f} MB')
+    print(f'panel_stats peak extra memory:        {peak_mb(lambda: panel_stats(panel, end)):.1f} MB')
+    with tempfile.TemporaryDirectory() as tmp:
+        panel.save(tmp)
+        mapped = PricePanel.open(tmp)
+        print(f'memory-mapped panel_stats peak extra: {peak_mb(lambda: panel_stats(mapped, end)):.1f} MB '
+              f'(panel pages shared via the OS page cache)')
+        del mapped
+
+
+if __name__ == '__main__':
+    main()
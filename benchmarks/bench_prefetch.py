@@ -0,0 +1,100 @@
+"""First-click latency with and without the background prefetcher.
+
+    python -m benchmarks.bench_prefetch
+
+A fake clock walks one trading day into the next morning: nothing runs at
+05:30, the 06:00 slot precomputes everything from the previous close, the
+16:00 slot picks up the day's bar and rebuilds the day's panel. The next
+morning brings no new bar: that slot still fills the cache for the new date,
+so its first click is a cache read, but records no history snapshot. The
+cold path is what a session pays on a cache miss (download, dfStats,
+ranking, Excel).
+"""
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import pandas as pd
+
+from etf_momo.cache import LayeredCache, ranking_cache_key
+from etf_momo.export import build_excel
+from etf_momo.history import RankingHistory
+from etf_momo.pipeline import build_stats, fetch_prices, load_universe, rank_stats
+from etf_momo.prefetch import Prefetcher
+from etf_momo.price_store import PriceStore
+from etf_momo.risk import NIFTY50
+from etf_momo.synthetic import FakeClock, StubFetcher, synthetic_panel
+
+warnings.simplefilter('ignore')
+
+UNIVERSE = 'BENCH'
+
+
+def main(n_symbols=200, n_days=3000, latency=0.1):
+    day = pd.Timestamp('2024-06-28')
+    data_date = f'{day:%Y-%m-%d}'
+    raw = synthetic_panel(n_symbols + 1, n_days, start=pd.bdate_range(end=day, periods=n_days)[0])
+    symbols = [c.replace('.NS', '') for c in raw['Close'].columns[:-1]]
+    for f in raw:
+        raw[f].columns = [s + '.NS' for s in symbols] + [NIFTY50]
+    cwd = os.getcwd()
+    tmp = tempfile.mkdtemp(prefix='etf_momo_prefetch_')
+    os.chdir(tmp)
+    try:
+        os.makedirs(os.path.join('data', 'universes'))
+        pd.DataFrame({'Symbol': symbols}).to_csv(os.path.join('data', 'universes', f'{UNIVERSE}.csv'), index=False)
+        print(f'{n_symbols} symbols, {n_days} days, stub latency {latency}s per chunk')
+
+        store = PriceStore('cold', fetcher=StubFetcher(raw, latency=latency))
+        universe = load_universe(UNIVERSE)
+        t0 = time.perf_counter()
+        prices = fetch_prices(universe, store)
+        ranked, filtered = rank_stats(build_stats(prices, universe, day), 'sharpe3M')
+        build_excel(ranked, filtered)
+        print(f'cold first click:                {time.perf_counter() - t0:8.3f} s')
+
+        clock = FakeClock(day + pd.Timedelta(hours=5, minutes=30))
+        cache = LayeredCache()
+        # until the close the provider only has the previous day's bar
+        fetcher = StubFetcher({f: p.iloc[:-1] for f, p in raw.items()}, latency=latency)
+        history = RankingHistory(os.path.join('data', 'history.sqlite'))
+        prefetcher = Prefetcher(cache, universes=[UNIVERSE], now=clock.now, store=PriceStore('warm', fetcher=fetcher),
+                                history=history)
+        print(f'05:30 tick ran:                  {prefetcher.tick()}')
+        clock.advance(30 * 60)
+        t0 = time.perf_counter()
+        ran = prefetcher.tick()
+        print(f'06:00 tick ran:                  {ran} in {time.perf_counter() - t0:.3f} s (background)')
+        print(f'06:01 tick ran again:            {prefetcher.tick()}')
+
+        fetcher.panel = raw
+        clock.advance(10 * 3600)
+        t0 = time.perf_counter()
+        print(f'16:00 tick ran:                  {prefetcher.tick()} in {time.perf_counter() - t0:.3f} s '
+              f'(panel rebuilt)')
+
+        hit = cache.rankings.get(ranking_cache_key(UNIVERSE, data_date, data_date, 'nifty50', 'sharpe3M'))
+        pd.testing.assert_frame_equal(hit[0], ranked)
+
+        clock.advance(14 * 3600)
+        t0 = time.perf_counter()
+        print(f'next day 06:00 tick ran:         {prefetcher.tick()} in {time.perf_counter() - t0:.3f} s (background)')
+        next_date = f'{clock.now():%Y-%m-%d}'
+        t0 = time.perf_counter()
+        hit = cache.rankings.get(ranking_cache_key(UNIVERSE, next_date, next_date, 'nifty50', 'sharpe3M'))
+        print(f'prefetched first click:          {(time.perf_counter() - t0) * 1e3:8.3f} ms '
+              f'({"hit" if hit is not None else "miss"})')
+        for run in prefetcher.runs:
+            outcome = run.get('error') or f"{run['seconds']} s" + ('' if run['new_bar'] else ', no new bar')
+            print(f"  {run['started']:%d %H:%M} {run['universe']}: {outcome}")
+        snapshots = history.dates(UNIVERSE, 'sharpe3M')
+        print(f'history snapshots:               {", ".join(f"{d:%Y-%m-%d}" for d in snapshots)}')
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""Overhead of the profiling spans, disabled and enabled.
+
+    python -m benchmarks.bench_profiling
+"""
+import time
+import warnings
+
+from etf_momo.metrics import compute_stats
+from etf_momo.pipeline import rank_stats
+from etf_momo.profiling import Profiler, activate, profiled, span
+from etf_momo.synthetic import synthetic_panel
+
+warnings.simplefilter('ignore')
+
+
+def per_call_ns(fn, n=200000):
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e9
+
+
+def main():
+    def plain():
+        return None
+
+    wrapped = profiled()(plain)
+
+    def with_span():
+        with span('x'):
+            return None
+
+    base = per_call_ns(plain)
+    print(f'plain call:                {base:8.0f} ns')
+    print(f'@profiled, disabled:       {per_call_ns(wrapped) - base:8.0f} ns overhead')
+    print(f'span(), disabled:          {per_call_ns(with_span) - base:8.0f} ns overhead')
+    with activate(Profiler()):
+        print(f'@profiled, enabled:        {per_call_ns(wrapped, 20000) - base:8.0f} ns overhead')
+
+    raw = synthetic_panel(500, 3000)
+    close = raw['Close']
+    stats = compute_stats(close, raw['High'], close * raw['Volume'], close.index[-1])
+    for label, profiler in (('disabled', None), ('timings', Profiler()), ('timings + memory', Profiler(memory=True))):
+        with activate(profiler):
+            t0 = time.perf_counter()
+            for _ in range(50):
+                rank_stats(stats, 'avgSharpe')
+            wall = (time.perf_counter() - t0) / 50
+        print(f'rank_stats, {label:<17} {wall * 1e3:7.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
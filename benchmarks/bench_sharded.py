@@ -0,0 +1,67 @@
+"""Peak memory and wall time of sharded vs full-panel dfStats as the universe grows.
+
+    python -m benchmarks.bench_sharded
+
+Stores of growing size are written from a synthetic panel; the full-panel
+path (``fetch_prices`` + ``build_stats``) should grow in memory with the
+universe while the sharded path stays flat at a fixed shard size, both
+scaling roughly linearly in time. Sharded rows must equal the full path.
+"""
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import pandas as pd
+
+from etf_momo.pipeline import build_stats, fetch_prices
+from etf_momo.price_store import PriceStore
+from etf_momo.risk import NIFTY50
+from etf_momo.sharded import sharded_stats
+from etf_momo.synthetic import synthetic_panel
+
+warnings.simplefilter('ignore')
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = fn()
+    wall = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return out, wall, peak / 2**20
+
+
+def write_store(root, n_symbols, n_days):
+    raw = synthetic_panel(n_symbols, n_days)
+    bench = synthetic_panel(1, n_days, seed=1)
+    fields = {f: pd.concat([raw[f], bench[f].set_axis([NIFTY50], axis=1)], axis=1) for f in raw}
+    store = PriceStore(root)
+    symbols = list(fields['Close'].columns)
+    store.write(fields, symbols)
+    return store, symbols[:-1], raw['Close'].index[-1]
+
+
+def main(sizes=(250, 500, 1000), n_days=2500, shard_size=125):
+    tmp = tempfile.mkdtemp(prefix='etf_momo_shards_')
+    print(f'{n_days} days, shard size {shard_size}')
+    try:
+        for n in sizes:
+            store, symbols, end = write_store(os.path.join(tmp, str(n)), n, n_days)
+            universe = pd.DataFrame({'Symbol': [s[:-3] for s in symbols]},
+                                    index=pd.Index(symbols, name='Yahoo_Symbol'))
+            full, full_wall, full_peak = measure(
+                lambda: build_stats(fetch_prices(universe, store, update=False), universe, end))
+            sharded, wall, peak = measure(lambda: sharded_stats(universe, store, [end], shard_size=shard_size)[end])
+            pd.testing.assert_frame_equal(sharded, full)
+            print(f'{n:>5} symbols: full panel {full_wall:6.2f}s {full_peak:7.1f} MB peak   '
+                  f'sharded {wall:6.2f}s {peak:7.1f} MB peak   (equal)')
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
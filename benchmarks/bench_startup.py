@@ -0,0 +1,145 @@
+"""Cold start of the Streamlit app to its first useful paint, against a budget.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --budget 1.0
+
+Each measurement is a fresh interpreter. A saved ranking is seeded into a
+temporary history, then the app script runs once (as a new session does,
+before "Start Data Download") and must show that ranking. The time from
+process start to the rendered page includes the interpreter, Streamlit,
+pandas, the landing imports and reading the snapshot file; a bare
+Streamlit + pandas process is timed the same way for reference. Modules
+only the download and analysis stages need must not have been imported by
+then; their import cost is measured separately as what the landing page
+defers. The app runs in its default configuration: the background refresh
+must have been scheduled by the end of the run, but it starts only after
+the landing page and so is not part of the measurement. The exit status is
+non-zero when the budget is exceeded, a deferred module was loaded or the
+refresh was not scheduled.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from etf_momo.history import RankingHistory
+from etf_momo.pipeline import rank_stats
+from etf_momo.universe import DEFAULT_UNIVERSE
+
+warnings.simplefilter('ignore')
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, 'ETF_Momo_Streamlit.py')
+
+# seconds from interpreter start to the landing page with the saved ranking
+BUDGET_S = 1.5
+
+# loaded by the started branch only
+DEFERRED = ['xlsxwriter', 'openpyxl', 'yfinance', 'scipy', 'etf_momo.pipeline', 'etf_momo.metrics',
+            'etf_momo.export', 'etf_momo.incremental', 'etf_momo.price_store', 'etf_momo.downloader',
+            'etf_momo.analytics', 'etf_momo.backtest', 'etf_momo.streaming', 'etf_momo.sharded', 'etf_momo.prefetch',
+            'concurrent.futures.process']
+
+LANDING = f"""
+import json, sys, threading, time
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file({APP!r}, default_timeout=60)
+at.run()
+print(json.dumps({{'seconds': time.time() - float(sys.argv[1]), 'errors': [str(e.value) for e in at.exception],
+                  'info': [i.value for i in at.info], 'rows': len(at.dataframe[0].value) if len(at.dataframe) else 0,
+                  'loaded': [m for m in {DEFERRED!r} if m in sys.modules],
+                  'prefetch': any(t.name == 'etf_momo-prefetch-start' for t in threading.enumerate())}}))
+"""
+
+# what any Streamlit page showing a parquet table pays, whatever the app imports
+FLOOR = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+import pandas, pyarrow.parquet
+print(json.dumps({'seconds': time.time() - float(sys.argv[1])}))
+"""
+
+STARTED = """
+import json, time
+import streamlit
+import etf_momo.factors, etf_momo.history, etf_momo.lookback, etf_momo.panel, etf_momo.risk
+t0 = time.perf_counter()
+import etf_momo.pipeline, etf_momo.analytics, etf_momo.backtest, etf_momo.streaming, etf_momo.risk, xlsxwriter
+from etf_momo.risk import correlation_clusters
+import scipy.cluster.hierarchy
+print(json.dumps({'seconds': time.perf_counter() - t0}))
+"""
+
+
+def child(code, env, cwd):
+    """Run ``code`` in a fresh interpreter; returns the JSON of its last stdout line.
+
+    The launch time is passed as ``sys.argv[1]``, so ``seconds`` reported by
+    the child is measured from process start; exit (where Streamlit's pending
+    spinner timers are joined) is not included.
+    """
+    out = subprocess.run([sys.executable, '-c', code, repr(time.time())], env=env, cwd=cwd, capture_output=True,
+                         text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def seed(db, method):
+    rng = np.random.default_rng(0)
+    tickers = [f'SYM{i:03d}' for i in range(100)]
+    stats = pd.DataFrame({'Ticker': tickers, 'Close': 100.0, 'sharpe3M': rng.normal(0, 1, 100).round(2),
+                          'avgSharpe': 0.0, 'dma200d': 90.0, 'roc12M': 10.0, 'volm_cr': 5.0, 'AWAY_ATH': -5.0})
+    ranked, filtered = rank_stats(stats, method)
+    RankingHistory(db).record(ranked, pd.Timestamp.today().normalize(), DEFAULT_UNIVERSE, method)
+    return len(filtered)
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument('--budget', type=float, default=BUDGET_S, help='seconds to first paint')
+    p.add_argument('--repeat', type=int, default=3)
+    args = p.parse_args(argv)
+
+    tmp = tempfile.mkdtemp(prefix='etf_momo_startup_')
+    try:
+        db = os.path.join(tmp, 'data', 'history.sqlite')
+        expected = seed(db, 'sharpe3M')
+        env = dict(os.environ, PYTHONPATH=ROOT, ETF_MOMO_HISTORY_DB=db)
+        env.pop('ETF_MOMO_PREFETCH', None)
+        runs = [child(LANDING, env, tmp) for _ in range(args.repeat)]
+        best = min(r['seconds'] for r in runs)
+        landing = runs[-1]
+        floor = min(child(FLOOR, env, tmp)['seconds'] for _ in range(args.repeat))
+        deferred = min(child(STARTED, env, tmp)['seconds'] for _ in range(args.repeat))
+
+        print(f'first paint (cold process, best of {args.repeat}): {best:6.2f} s   budget {args.budget:.2f} s')
+        print(f'bare Streamlit + pandas process:          {floor:6.2f} s')
+        print(f'imports deferred past the landing page:   {deferred:6.2f} s')
+        print(f'landing shows: {landing["info"][0] if landing["info"] else "-"} ({landing["rows"]} rows)')
+        failures = []
+        if landing['errors']:
+            failures.append(f'app errors: {landing["errors"]}')
+        if landing['rows'] != expected:
+            failures.append(f'expected the saved ranking with {expected} rows, got {landing["rows"]}')
+        if landing['loaded']:
+            failures.append(f'deferred modules imported at startup: {", ".join(landing["loaded"])}')
+        if not landing['prefetch']:
+            failures.append('background refresh not scheduled')
+        if best > args.budget:
+            failures.append(f'first paint {best:.2f} s over the {args.budget:.2f} s budget')
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    for f in failures:
+        print(f'FAIL {f}')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,76 @@
+"""Time to the first provisional ranking vs the full download-then-rank path.
+
+    python -m benchmarks.bench_streaming
+
+Both paths download the universe into a fresh store from a stub provider with
+fixed per-call latency; the streamed dfStats must equal ``build_stats`` on
+the panel of the same store. A few symbols miss random days so the final
+calendar recompute is exercised too.
+"""
+import os
+import shutil
+import tempfile
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from etf_momo.pipeline import build_stats, fetch_prices, rank_stats
+from etf_momo.price_store import PriceStore
+from etf_momo.risk import NIFTY50
+from etf_momo.streaming import stream_stats
+from etf_momo.synthetic import StubFetcher, synthetic_panel
+
+warnings.simplefilter('ignore')
+
+
+def universe_panel(n_symbols, n_days, seed=0):
+    raw = synthetic_panel(n_symbols, n_days, seed=seed)
+    bench = synthetic_panel(1, n_days, seed=seed + 1)
+    rng = np.random.default_rng(seed)
+    gaps = rng.random((n_days, n_symbols)) < 0.02
+    gaps[:, 10:] = False  # only the first few symbols have holes
+    for f in raw:
+        raw[f] = raw[f].mask(gaps)
+    return {f: pd.concat([raw[f], bench[f].set_axis([NIFTY50], axis=1)], axis=1) for f in raw}
+
+
+def main(n_symbols=400, n_days=1500, latency=0.25, chunk=50, workers=2):
+    panel = universe_panel(n_symbols, n_days)
+    symbols = [s for s in panel['Close'].columns if s != NIFTY50]
+    universe = pd.DataFrame({'Symbol': [s[:-3] for s in symbols]}, index=pd.Index(symbols, name='Yahoo_Symbol'))
+    end = panel['Close'].index[-1]
+    tmp = tempfile.mkdtemp(prefix='etf_momo_stream_')
+    print(f'{n_symbols} symbols, {n_days} days, {-(-n_symbols // chunk)} chunks of {chunk}, '
+          f'latency {latency}s, {workers} workers')
+    try:
+        store = PriceStore(os.path.join(tmp, 'batch'), fetcher=StubFetcher(panel, latency=latency))
+        t0 = time.perf_counter()
+        prices = fetch_prices(universe, store, chunk=chunk, max_workers=workers)
+        expected = build_stats(prices, universe, end)
+        rank_stats(expected, 'avgSharpe')
+        batch = time.perf_counter() - t0
+        print(f'download then rank: first ranking {batch:6.2f}s  final {batch:6.2f}s')
+
+        store = PriceStore(os.path.join(tmp, 'stream'), fetcher=StubFetcher(panel, latency=latency))
+        first = []
+        t0 = time.perf_counter()
+
+        def on_partial(table, result, done, total):
+            if not first and not table.empty:
+                rank_stats(table, 'avgSharpe')
+                first.append(time.perf_counter() - t0)
+
+        streamed, _ = stream_stats(universe, store, end, chunk=chunk, max_workers=workers, on_partial=on_partial)
+        rank_stats(streamed, 'avgSharpe')
+        total = time.perf_counter() - t0
+        print(f'streamed:           first ranking {first[0]:6.2f}s  final {total:6.2f}s')
+        pd.testing.assert_frame_equal(streamed, expected)
+        print('streamed dfStats equals build_stats')
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Sweep throughput against the number of worker processes.
+
+    python -m benchmarks.bench_sweep
+
+The synthetic panel is saved once; workers memory-map it, so adding workers
+should scale close to linearly up to the number of cores.
+"""
+import os
+import tempfile
+import time
+import warnings
+
+from etf_momo.panel import PricePanel
+from etf_momo.sweep import param_grid, run_sweep
+from etf_momo.synthetic import synthetic_panel
+
+warnings.simplefilter('ignore')
+
+
+def main(n_symbols=300, n_days=4000):
+    raw = synthetic_panel(n_symbols, n_days)
+    close = raw['Close']
+    panel = PricePanel.from_frames({'Close': close, 'High': raw['High'], 'Volume': close * raw['Volume']})
+    grid = param_grid(ranking_method=['sharpe3M', 'avgSharpe'], top_n=[5, 10, 20], roc12M=[0, 6.5, 10],
+                      AWAY_ATH=[-30, -25], horizons=['12,9,6,3', '12,6,3'])
+    start, end = close.index[-2500], close.index[-1]
+    cores = os.cpu_count() or 1
+    print(f'{len(grid)} combinations, {n_symbols} symbols x {n_days} days, {cores} cores')
+    with tempfile.TemporaryDirectory() as tmp:
+        panel.save(tmp)
+        base = None
+        for workers in sorted({1, 2, 4, cores}):
+            t0 = time.perf_counter()
+            table = run_sweep(tmp, grid, start, end, max_workers=workers)
+            wall = time.perf_counter() - t0
+            base = base or wall
+            errors = int(table['error'].notna().sum()) if 'error' in table else 0
+            print(f'{workers:>3} workers: {wall:6.2f}s  {len(grid) / wall:6.1f} combinations/s  '
+                  f'speedup {base / wall:.2f}x  errors {errors}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""Benchmark suite: per-stage runtime and memory at several panel scales.
+
+    python -m benchmarks.suite                       # default scales, compare to baselines.json
+    python -m benchmarks.suite --scales tiny small --repeat 5
+    python -m benchmarks.suite --scales xl --no-reference
+    python -m benchmarks.suite --save-baseline       # record this machine's numbers
+
+Every scale runs on a deterministic synthetic panel served through an
+offline ``yfinance`` stub, so the whole pipeline runs from download to
+Excel export without the network. Each stage is timed (best of
+``--repeat``) and run once more under tracemalloc for its peak memory.
+Timings are compared with the stored baseline for the scale; a stage slower
+or larger than the baseline by more than ``--threshold`` is a regression.
+
+Optimized paths are also checked against the reference implementations
+(``helpers.getStats`` and plain pandas/numpy formulas). The exit status is
+non-zero on any regression or equivalence failure.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_metrics import app_dates
+from etf_momo.backtest import run_backtest
+from etf_momo.export import FILTERED_SHEET, UNFILTERED_SHEET, build_excel
+from etf_momo.helpers import (getAbsReturns, getBeta, getDailyReturns, getMonthlyPrices, getStats,
+                              getVolatility)
+from etf_momo.incremental import IncrementalStats
+from etf_momo.metrics import compute_stats, panel_stats, stats_panel
+from etf_momo.pipeline import build_stats, fetch_prices, rank_stats, run_batch
+from etf_momo.price_store import PriceStore
+from etf_momo.risk import NIFTY50
+from etf_momo.synthetic import StubFetcher, stub_yfinance, synthetic_panel
+
+warnings.simplefilter('ignore')
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), 'baselines.json')
+
+# name: (symbols, years, run the reference getStats)
+SCALES = {
+    'tiny': (50, 1, True),
+    'small': (200, 5, True),
+    'medium': (1000, 10, True),
+    'large': (2500, 20, False),
+    'xl': (5000, 25, False),
+}
+DEFAULT_SCALES = ['tiny', 'small', 'medium']
+TRADING_DAYS_PER_YEAR = 252
+
+# regressions smaller than these are noise, whatever the ratio
+MIN_SECONDS = 0.005
+MIN_MB = 1.0
+
+
+def measure(fn, repeat):
+    """(best wall seconds over ``repeat`` runs, peak traced MB of one more run)."""
+    best = float('inf')
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    tracemalloc.start()
+    fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak / 2**20
+
+
+class Scale:
+    """Synthetic panel, universe and stubbed provider for one scale."""
+
+    def __init__(self, name, n_symbols, years, reference, seed=0):
+        self.name = name
+        self.reference = reference
+        n_days = years * TRADING_DAYS_PER_YEAR + 30
+        raw = synthetic_panel(n_symbols, n_days, seed=seed)
+        bench = synthetic_panel(1, n_days, seed=seed + 1)
+        self.raw = {f: pd.concat([raw[f], bench[f].set_axis([NIFTY50], axis=1)], axis=1) for f in raw}
+        self.symbols = list(raw['Close'].columns)
+        self.universe = pd.DataFrame({'Symbol': [s[:-3] for s in self.symbols]},
+                                     index=pd.Index(self.symbols, name='Yahoo_Symbol'))
+        self.end = raw['Close'].index[-1]
+        self.tmp = tempfile.mkdtemp(prefix=f'etf_momo_bench_{name}_')
+        self.prices = None
+
+    def store(self, fresh=False):
+        root = os.path.join(self.tmp, 'store')
+        if fresh:
+            shutil.rmtree(root, ignore_errors=True)
+        return PriceStore(root)
+
+    def close(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+
+def stages(sc):
+    """Ordered {stage: zero-argument callable}; later stages use earlier results."""
+    out = {}
+
+    def download():
+        with stub_yfinance(StubFetcher(sc.raw)):
+            sc.store(fresh=True).update(sc.symbols + [NIFTY50], chunk=50, max_workers=4)
+    out['download'] = download
+
+    def load():
+        panel_dir = os.path.join(sc.tmp, 'panel')
+        shutil.rmtree(panel_dir, ignore_errors=True)
+        sc.prices = fetch_prices(sc.universe, sc.store(), update=False, panel_dir=panel_dir)
+    out['load_panel'] = load
+
+    def stats():
+        sc.stats = build_stats(sc.prices, sc.universe, sc.end)
+    out['stats'] = stats
+    if sc.reference:
+        out['stats_reference'] = lambda: getStats(sc.raw['Close'][sc.symbols], sc.raw['High'][sc.symbols],
+                                                  sc.raw['Close'][sc.symbols] * sc.raw['Volume'][sc.symbols],
+                                                  app_dates(sc.end), sc.symbols)
+
+    def rank():
+        sc.ranked = rank_stats(sc.stats, 'avgSharpe')
+    out['rank'] = rank
+    out['export'] = lambda: build_excel(*sc.ranked)
+    out['backtest'] = lambda: run_backtest(sc.prices.close, sc.prices.high, sc.prices.volume,
+                                           sc.end - pd.DateOffset(years=3), sc.end, top_n=10)
+
+    def incremental():
+        dates = sc.prices.panel.dates[-20:]
+        eng = IncrementalStats.from_panel(sc.prices.panel, dates[0], sc.symbols)
+        for d in dates[1:]:
+            eng.stats_at(d)
+    out['incremental_20d'] = incremental
+
+    def end_to_end():
+        with stub_yfinance(StubFetcher(sc.raw)):
+            run_batch([sc.end], ['avgSharpe'], universe_df=sc.universe, universe_name=sc.name,
+                      out_dir=os.path.join(sc.tmp, 'reports'), store=sc.store(fresh=True), log=lambda *a: None)
+    out['end_to_end'] = end_to_end
+    return out
+
+
+def _max_diff(a, b):
+    num = [c for c in a.columns if c != 'Ticker']
+    x, y = a[num].to_numpy(dtype=float), b[num].to_numpy(dtype=float)
+    same_nan = bool((np.isnan(x) == np.isnan(y)).all())
+    both = ~np.isnan(x) & ~np.isnan(y)
+    return (float(np.abs(x[both] - y[both]).max()) if both.any() else 0.0), same_nan
+
+
+def equivalence(sc):
+    """{check: (passed, detail)} for the optimized paths of one scale."""
+    checks = {}
+    close, high = sc.raw['Close'][sc.symbols], sc.raw['High'][sc.symbols]
+    volume = close * sc.raw['Volume'][sc.symbols]
+
+    loaded = sc.store().load(sc.symbols)
+    diff = max(float(np.nanmax(np.abs(loaded[f].reindex_like(sc.raw[f][sc.symbols]).to_numpy()
+                                      - sc.raw[f][sc.symbols].to_numpy()), initial=0)) for f in loaded)
+    checks['store roundtrip'] = (diff == 0, f'max abs diff {diff:g}')
+
+    if sc.reference:
+        d, nan = _max_diff(getStats(close, high, volume, app_dates(sc.end), sc.symbols),
+                           compute_stats(close, high, volume, sc.end, sc.symbols))
+        # both round to 2 decimals; the last digit may differ in rounding ties
+        checks['compute_stats vs getStats'] = (d <= 0.0101 and nan, f'max abs diff {d:g}, NaN pattern equal {nan}')
+
+    p = sc.prices
+    d, nan = _max_diff(panel_stats(p.panel, sc.end, sc.symbols),
+                       compute_stats(p.close, p.high, p.volume, sc.end, sc.symbols))
+    checks['panel_stats vs compute_stats'] = (d == 0 and nan, f'max abs diff {d:g}')
+
+    dates = p.panel.dates[-20:]
+    eng = IncrementalStats.from_panel(p.panel, dates[0], sc.symbols)
+    worst = 0.0
+    ok = True
+    for day in dates:
+        d, nan = _max_diff(eng.stats_at(day), panel_stats(p.panel, day, sc.symbols))
+        worst, ok = max(worst, d), ok and nan
+    checks['incremental vs panel_stats'] = (worst == 0 and ok, f'max abs diff {worst:g} over {len(dates)} days')
+
+    ends = p.panel.dates[-60::20]
+    sp = stats_panel(p.close, p.high, p.volume, ends)
+    worst = 0.0
+    for i, day in enumerate(ends):
+        one = compute_stats(p.close, p.high, p.volume, day, sc.symbols)
+        for col, frame in sp.items():
+            if col in one:
+                a, b = frame.iloc[i].to_numpy(dtype=float), one[col].to_numpy(dtype=float)
+                both = ~np.isnan(a) & ~np.isnan(b)
+                if both.any():
+                    worst = max(worst, float(np.abs(a[both] - b[both]).max()))
+    checks['stats_panel vs compute_stats'] = (worst <= 0.0101, f'max abs diff {worst:g}')
+
+    # metric helpers against plain formulas
+    window = close.iloc[-TRADING_DAYS_PER_YEAR:]
+    filled = window.ffill().to_numpy()
+    rets = filled[1:] / filled[:-1] - 1
+    ours = getDailyReturns(window).to_numpy()[1:]
+    checks['getDailyReturns'] = (np.allclose(ours, rets, equal_nan=True, rtol=0, atol=1e-15), 'ffilled pct change')
+    roc = np.round((window.iloc[-1].to_numpy() / window.iloc[0].to_numpy() - 1) * 100, 2)
+    checks['getAbsReturns'] = (np.array_equal(getAbsReturns(window).to_numpy(), roc, equal_nan=True), 'last/first')
+    vol = np.round(np.nanstd(rets, axis=0) * np.sqrt(252) * 100, 2)
+    ours = getVolatility(getDailyReturns(window)).to_numpy()
+    checks['getVolatility'] = (np.allclose(ours, vol, equal_nan=True, rtol=0, atol=0.0101), 'population std')
+    month_end = close.groupby(close.index.to_period('M')).apply(lambda g: g.iloc[-1:]).droplevel(0)
+    checks['getMonthlyPrices'] = (getMonthlyPrices(close).equals(month_end), 'last row of each month')
+    bench = sc.raw['Close'][NIFTY50].iloc[-TRADING_DAYS_PER_YEAR:]
+    beta = getBeta(bench, window)
+    br = bench.pct_change().iloc[1:]
+    expected = []
+    for sym in window.columns:
+        r = window[sym].pct_change(fill_method=None).iloc[1:]
+        both = r.notna() & br.notna()
+        expected.append(round(r[both].cov(br[both]) / br[both].var(), 2) if both.sum() >= 2 else np.nan)
+    checks['getBeta'] = (np.allclose(beta, expected, equal_nan=True, rtol=0, atol=0.0101), 'cov/var on common days')
+
+    ranked, filtered = sc.ranked
+    sheets = pd.read_excel(pd.io.common.BytesIO(build_excel(ranked, filtered)), sheet_name=None, index_col=0)
+    back = sheets[UNFILTERED_SHEET]
+    # ATH is written rounded to whole units, everything else as is
+    num = [c for c in ranked.columns if ranked[c].dtype.kind == 'f' and c != 'ATH']
+    d = float(np.nanmax(np.abs(back[num].to_numpy(dtype=float) - ranked[num].to_numpy(dtype=float)), initial=0))
+    d_ath = float(np.nanmax(np.abs(back['ATH'].to_numpy(dtype=float) - ranked['ATH'].to_numpy()), initial=0))
+    rows_ok = len(sheets[FILTERED_SHEET].dropna(how='all')) >= len(filtered)
+    checks['excel roundtrip'] = (d == 0 and d_ath <= 0.5 and rows_ok,
+                                 f'max abs diff {d:g}, ATH {d_ath:g}, filtered rows present {rows_ok}')
+    return checks
+
+
+def compare(results, baseline, threshold):
+    """Rows of (scale, stage, metric, now, base, ratio) that regressed."""
+    out = []
+    for scale, stage_rows in results.items():
+        base = baseline.get('scales', {}).get(scale, {})
+        for stage, now in stage_rows.items():
+            ref = base.get(stage)
+            if not ref:
+                continue
+            for metric, floor in (('seconds', MIN_SECONDS), ('peak_mb', MIN_MB)):
+                if ref[metric] and now[metric] > ref[metric] * (1 + threshold) and now[metric] - ref[metric] > floor:
+                    out.append((scale, stage, metric, now[metric], ref[metric], now[metric] / ref[metric]))
+    return out
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog='benchmarks.suite', description=__doc__.split('\n')[0])
+    p.add_argument('--scales', nargs='+', choices=list(SCALES), default=DEFAULT_SCALES)
+    p.add_argument('--repeat', type=int, default=3, help='timed runs per stage (best is kept)')
+    p.add_argument('--threshold', type=float, default=0.25, help='allowed slowdown/growth vs the baseline')
+    p.add_argument('--baseline', default=BASELINE_PATH)
+    p.add_argument('--save-baseline', action='store_true', help='store these results as the baseline')
+    p.add_argument('--no-reference', action='store_true', help='skip the slow reference getStats stage')
+    p.add_argument('--json', help='also write the results to this file')
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results, failures = {}, []
+    for name in args.scales:
+        n_symbols, years, reference = SCALES[name]
+        sc = Scale(name, n_symbols, years, reference and not args.no_reference)
+        print(f'== {name}: {n_symbols} symbols x {years} years')
+        rows = {}
+        try:
+            for stage, fn in stages(sc).items():
+                seconds, peak = measure(fn, 1 if stage in ('download', 'end_to_end') else args.repeat)
+                rows[stage] = {'seconds': round(seconds, 4), 'peak_mb': round(peak, 2)}
+                print(f'   {stage:<18} {seconds * 1e3:10.1f} ms  {peak:9.1f} MB')
+            for check, (ok, detail) in equivalence(sc).items():
+                print(f'   {"ok  " if ok else "FAIL"} {check}: {detail}')
+                if not ok:
+                    failures.append((name, check, detail))
+        finally:
+            sc.close()
+        results[name] = rows
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+    regressions = compare(results, baseline, args.threshold)
+    for scale, stage, metric, now, ref, ratio in regressions:
+        print(f'REGRESSION {scale}/{stage} {metric}: {now:g} vs baseline {ref:g} ({ratio:.2f}x)')
+    if baseline and not regressions:
+        print(f'no regressions beyond {args.threshold:.0%} of {args.baseline}')
+
+    if args.json:
+        with open(args.json, 'w') as fh:
+            json.dump(results, fh, indent=1)
+    if args.save_baseline:
+        baseline.setdefault('scales', {}).update(results)
+        baseline['machine'] = {'python': platform.python_version(), 'platform': platform.platform(),
+                               'processor': platform.processor(), 'cpus': os.cpu_count()}
+        with open(args.baseline, 'w') as fh:
+            json.dump(baseline, fh, indent=1, sort_keys=True)
+            fh.write('\n')
+        print(f'baseline saved to {args.baseline}')
+    return 1 if failures or regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
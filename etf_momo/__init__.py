@@ -0,0 +1 @@
+"""Library code behind the ETF Momentum Ranking app."""
@@ -0,0 +1,3 @@
+from etf_momo.cli import main
+
+main()
@@ -0,0 +1,48 @@
+"""Risk analytics for the filtered ETFs and an equal-weight top-N basket.
+
+Every metric is computed column-wise on the whole daily-returns panel with
+the helpers from ``etf_momo.helpers``.
+"""
+import numpy as np
+import pandas as pd
+
+from etf_momo.helpers import (getCalmar, getDailyReturns, getMaxDrawdown, getMonthlyPrices, getMonthlyReturns,
+                              getSharpe, getSortino)
+from etf_momo.profiling import profiled
+
+BASKET = 'Top-N Basket'
+
+
+def risk_table(returns):
+    """Risk metrics per column of a daily-returns frame."""
+    monthly = getMonthlyReturns(getMonthlyPrices((returns.fillna(0) + 1).cumprod().where(returns.notna())))
+    years = returns.notna().sum() / 252
+    growth = (returns + 1).prod()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cagr = (growth ** (1 / years) - 1) * 100
+    table = pd.DataFrame({
+        'CAGR %': cagr.round(2),
+        'Sharpe': getSharpe(returns),
+        'Sortino': getSortino(returns).round(2),
+        'Calmar': getCalmar(returns).round(2),
+        'Max Drawdown %': (getMaxDrawdown(returns) * 100).round(2),
+        'Positive Months %': ((monthly > 0).sum() / monthly.notna().sum() * 100).round(1),
+    })
+    return table.replace([np.inf, -np.inf], np.nan)
+
+
+def basket_returns(returns, members):
+    """Daily returns of an equal-weight basket rebalanced daily."""
+    return returns[members].mean(axis=1).rename(BASKET)
+
+
+@profiled()
+def portfolio_analytics(close, members, top_n=10, start=None, end=None):
+    """Risk table for ``members`` plus a top-N equal-weight basket row.
+
+    ``members`` are ordered by rank; the basket takes the first ``top_n``.
+    """
+    members = [m for m in members if m in close.columns]
+    returns = getDailyReturns(close.loc[start:end, members]).iloc[1:]
+    basket = basket_returns(returns, members[:top_n]) if members else pd.Series(dtype=float, name=BASKET)
+    return risk_table(pd.concat([returns, basket], axis=1))
@@ -0,0 +1,106 @@
+"""Historical backtest: rank the universe on every rebalance date in one run.
+
+Metrics for all rebalance dates come from ``stats_panel`` on a single loaded
+price panel; ranks and filters are evaluated as 2-D frames (date x symbol).
+"""
+import numpy as np
+import pandas as pd
+
+from etf_momo.factors import MOMENTUM_FILTERS, rank
+from etf_momo.metrics import HORIZONS, stats_panel
+from etf_momo.profiling import profiled
+
+FREQUENCIES = {'monthly': 'M', 'weekly': 'W-FRI'}
+
+
+def rebalance_dates(index, start, end, freq='monthly'):
+    """Last trading day in ``index`` of every period between start and end."""
+    index = pd.DatetimeIndex(index)
+    index = index[(index >= pd.Timestamp(start)) & (index <= pd.Timestamp(end))]
+    if not len(index):
+        return index
+    s = pd.Series(index, index=index)
+    return pd.DatetimeIndex(s.groupby(s.index.to_period(FREQUENCIES[freq])).max().to_numpy())
+
+
+class BacktestResult:
+
+    def __init__(self, holdings, period_returns, turnover, equity, stats):
+        self.holdings = holdings
+        self.period_returns = period_returns
+        self.turnover = turnover
+        self.equity = equity
+        self.stats = stats
+
+    def summary(self):
+        eq = self.equity.dropna()
+        if len(eq) < 2:
+            return {}
+        years = (eq.index[-1] - eq.index[0]).days / 365.25
+        daily = eq.pct_change().dropna()
+        drawdown = eq / eq.cummax() - 1
+        return {
+            'CAGR %': round(float((eq.iloc[-1] / eq.iloc[0]) ** (1 / years) - 1) * 100, 2) if years > 0 else np.nan,
+            'Volatility %': round(float(daily.std() * np.sqrt(252)) * 100, 2),
+            'Sharpe': round(float(np.sqrt(252) * daily.mean() / daily.std()), 2) if daily.std() else np.nan,
+            'Max Drawdown %': round(float(drawdown.min()) * 100, 2),
+            'Avg Turnover %': round(float(self.turnover.mean()) * 100, 2),
+            'Rebalances': len(self.turnover),
+        }
+
+
+@profiled()
+def run_backtest(close, high, volume, start, end, freq='monthly', top_n=10, ranking_method='avgSharpe',
+                 apply_filter=True, filters=MOMENTUM_FILTERS, horizons=HORIZONS, stats=None):
+    """Equal-weight top-N momentum portfolio rebalanced at ``freq``.
+
+    At each rebalance date symbols passing ``filters`` are ranked by the
+    ``ranking_method`` factor (as in the app) and the best ``top_n`` are held,
+    buy-and-hold, until the next rebalance. Returns a ``BacktestResult``.
+
+    ``stats`` may be passed in when it is already computed for the same
+    rebalance dates and ``horizons`` (e.g. by a parameter sweep).
+    """
+    dates = rebalance_dates(close.index, start, end, freq)
+    if stats is None:
+        stats = stats_panel(close, high, volume, dates, horizons)
+    ranks = rank(stats, ranking_method, filters if apply_filter else None)
+    chosen = (ranks <= top_n).to_numpy()
+
+    prices = close.loc[:pd.Timestamp(end)].ffill()
+    weights = pd.DataFrame(0.0, index=dates, columns=close.columns)
+    counts = chosen.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights[:] = np.where(chosen, 1.0 / counts[:, None], 0.0)
+    turnover = weights.diff().abs().sum(axis=1) / 2
+    if len(turnover):
+        turnover.iloc[0] = weights.iloc[0].sum()
+
+    rank_values = ranks.to_numpy()
+    holdings = {d: list(ranks.columns[chosen[i]][np.argsort(rank_values[i][chosen[i]])])
+                for i, d in enumerate(dates)}
+
+    # daily buy-and-hold value inside each holding period; cash when empty
+    idx = prices.index
+    eq_index = idx[idx >= dates[0]] if len(dates) else idx[:0]
+    eq = np.full(len(eq_index), np.nan)
+    period = np.full(len(dates), np.nan)
+    value = 1.0
+    px = prices.to_numpy()
+    w_all = weights.to_numpy()
+    pos = idx.searchsorted(dates)
+    stops = list(pos[1:]) + [len(idx) - 1]
+    for i, (a, b) in enumerate(zip(pos, stops)):
+        held = w_all[i] > 0
+        if held.any():
+            with np.errstate(divide='ignore', invalid='ignore'):
+                rel = px[a:b + 1][:, held] / px[a, held]
+            path = np.nanmean(rel, axis=1)
+        else:
+            path = np.ones(b - a + 1)
+        eq[a - pos[0]:b - pos[0] + 1] = value * path
+        period[i] = path[-1] - 1
+        value *= path[-1]
+    equity = pd.Series(eq, index=eq_index)
+    period_returns = pd.Series(period, index=dates)
+    return BacktestResult(holdings, period_returns, turnover, equity, stats)
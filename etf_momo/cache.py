@@ -0,0 +1,94 @@
+"""Small in-process result caches with TTL and size-bounded LRU eviction."""
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """LRU mapping whose entries also expire ``ttl`` seconds after being set."""
+
+    def __init__(self, maxsize=8, ttl=3600, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            ttl = self.ttl if item is None or item[2] is None else item[2]
+            if item is not None and (ttl is None or self.clock() - item[0] < ttl):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            if item is not None:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """Store ``value``; ``ttl`` overrides the cache's lifetime for this entry."""
+        with self._lock:
+            self._data[key] = (self.clock(), value, ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self._data), 'maxsize': self.maxsize}
+
+
+class LayeredCache:
+    """Raw price panels, their metric engines, computed stats and rankings, each in its own layer.
+
+    prices   -- keyed by (universe, data date)
+    engines  -- ``IncrementalStats`` over a cached panel, keyed like prices
+    stats    -- keyed by (universe, data date, lookback date, benchmark mode)
+    rankings -- keyed by (universe, data date, lookback date, benchmark mode, ranking method)
+
+    Dates are 'YYYY-MM-DD' strings; build keys with the functions below so
+    the app and the background prefetcher agree on them.
+    """
+
+    def __init__(self, ttl=6 * 3600, prices_size=2, engines_size=2, stats_size=16, rankings_size=64,
+                 clock=time.monotonic):
+        self.prices = TTLCache(prices_size, ttl, clock)
+        self.engines = TTLCache(engines_size, ttl, clock)
+        self.stats = TTLCache(stats_size, ttl, clock)
+        self.rankings = TTLCache(rankings_size, ttl, clock)
+
+    def layers(self):
+        return {'prices': self.prices, 'engines': self.engines, 'stats': self.stats, 'rankings': self.rankings}
+
+    def clear(self):
+        for layer in self.layers().values():
+            layer.clear()
+
+
+def prices_cache_key(universe, data_date):
+    return (universe, data_date)
+
+
+def stats_cache_key(universe, data_date, lookback_date, benchmark_mode):
+    return prices_cache_key(universe, data_date) + (lookback_date, benchmark_mode)
+
+
+def ranking_cache_key(universe, data_date, lookback_date, benchmark_mode, ranking_method):
+    return stats_cache_key(universe, data_date, lookback_date, benchmark_mode) + (ranking_method,)
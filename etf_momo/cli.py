@@ -0,0 +1,94 @@
+"""Headless batch ranking runs, e.g. from cron.
+
+    python -m etf_momo --dates 2024-06-28 2024-07-31 --methods sharpe3M avgSharpe --formats xlsx parquet
+
+Prices are refreshed and loaded once per invocation, then every lookback
+date is ranked with every method. ``--shard-size`` computes the metrics in
+symbol shards straight from the store instead, for universes whose full
+panel would not fit in memory.
+"""
+import argparse
+import os
+import warnings
+from datetime import date
+
+import pandas as pd
+
+from etf_momo.backtest import FREQUENCIES, rebalance_dates
+from etf_momo.history import DEFAULT_HISTORY_PATH, RankingHistory
+from etf_momo.pipeline import OUTPUT_FORMATS, RANKING_METHODS, fetch_prices, load_universe, run_batch, update_prices
+from etf_momo.price_store import DEFAULT_STORE_DIR, PriceStore
+from etf_momo.profiling import Profiler, activate
+from etf_momo.risk import BENCHMARK_MODES
+from etf_momo.sharded import sharded_stats
+from etf_momo.universe import DEFAULT_UNIVERSE, available
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog='etf_momo', description='ETF momentum ranking in batch mode.')
+    p.add_argument('--dates', nargs='+', default=[date.today().isoformat()], help='lookback dates (YYYY-MM-DD)')
+    p.add_argument('--range', nargs=2, metavar=('START', 'END'),
+                   help='rank every rebalance date between START and END instead of --dates')
+    p.add_argument('--freq', choices=list(FREQUENCIES), default='monthly', help='rebalance frequency for --range')
+    p.add_argument('--methods', nargs='+', choices=list(RANKING_METHODS.values()), default=['sharpe3M'])
+    p.add_argument('--formats', nargs='+', choices=OUTPUT_FORMATS, default=['xlsx'])
+    p.add_argument('--universe', default=DEFAULT_UNIVERSE,
+                   help=f'registered universe ({", ".join(available())}) or path to a CSV with a Symbol column')
+    p.add_argument('--benchmark', choices=list(BENCHMARK_MODES.values()), default='nifty50')
+    p.add_argument('--store', default=DEFAULT_STORE_DIR, help='price store directory')
+    p.add_argument('--no-update', action='store_true', help='use stored prices without downloading')
+    p.add_argument('--out', default='reports', help='output directory')
+    p.add_argument('--history', default=DEFAULT_HISTORY_PATH,
+                   help='ranking history database (query with python -m etf_momo.history)')
+    p.add_argument('--no-history', action='store_true', help='do not record the rankings in the history database')
+    p.add_argument('--shard-size', type=int, metavar='N',
+                   help='process the universe N symbols at a time from the store (large universes)')
+    p.add_argument('--workers', type=int, default=1, help='processes for --shard-size')
+    p.add_argument('--profile', metavar='TRACE_JSON',
+                   help='write stage timings as a Chrome trace (chrome://tracing, Perfetto) and print a summary')
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    warnings.simplefilter(action='ignore', category=FutureWarning)
+    args = parse_args(argv)
+    profiler = Profiler() if args.profile else None
+    with activate(profiler):
+        run(args)
+    if profiler is not None:
+        with open(args.profile, 'w') as fh:
+            fh.write(profiler.to_chrome_trace())
+        print(profiler.summary().to_string())
+        print(f'-> {args.profile}')
+
+
+def run(args):
+    universe = load_universe(args.universe)
+    universe_name = os.path.splitext(os.path.basename(args.universe))[0]
+    store = PriceStore(args.store)
+    if args.shard_size:
+        # bounded memory: only one shard of prices is in memory at a time
+        failed = [] if args.no_update else update_prices(universe, store)
+        calendar = store.calendar(universe.index) if args.range else None
+    else:
+        prices = fetch_prices(universe, store=store, update=not args.no_update)
+        failed, calendar = prices.failed, prices.close.index
+    if failed:
+        print(f"Failed to download data for: {', '.join(failed)}")
+    if args.range:
+        end_dates = rebalance_dates(calendar, args.range[0], args.range[1], args.freq)
+    else:
+        end_dates = [pd.Timestamp(d) for d in args.dates]
+    history = None if args.no_history else RankingHistory(args.history)
+    if args.shard_size:
+        stats = sharded_stats(universe, store, end_dates, args.benchmark, shard_size=args.shard_size,
+                              max_workers=args.workers, log=print)
+        run_batch(end_dates, args.methods, universe_df=universe, universe_name=universe_name, stats=stats,
+                  store=store, out_dir=args.out, formats=args.formats, benchmark_mode=args.benchmark, history=history)
+    else:
+        run_batch(end_dates, args.methods, universe_df=universe, universe_name=universe_name, prices=prices,
+                  out_dir=args.out, formats=args.formats, benchmark_mode=args.benchmark, history=history)
+
+
+if __name__ == '__main__':
+    main()
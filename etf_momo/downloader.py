@@ -0,0 +1,124 @@
+"""Concurrent chunk downloader with bounded parallelism, retries and backoff.
+
+Chunks run on a thread pool, but results are handed back on the calling
+thread so callers can safely update Streamlit widgets from ``on_result``.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class MissingSymbols(Exception):
+    """Raised by a fetcher that got data for only part of a chunk.
+
+    ``frame`` holds what was fetched, ``symbols`` the ones without data.
+    """
+
+    def __init__(self, frame, symbols):
+        super().__init__(f'no data for {", ".join(symbols)}')
+        self.frame = frame
+        self.symbols = list(symbols)
+
+
+class ChunkResult:
+
+    def __init__(self, symbols, start, frame=None, error=None, elapsed=0.0, attempts=0):
+        self.symbols = symbols
+        self.start = start
+        self.frame = frame
+        self.error = error
+        self.elapsed = elapsed
+        self.attempts = attempts
+        # symbols of the chunk the fetcher returned no data for
+        self.missing = []
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        state = 'ok' if self.ok else f'error={self.error!r}'
+        return f'ChunkResult({len(self.symbols)} symbols, {state}, {self.elapsed:.2f}s, attempts={self.attempts})'
+
+
+class ChunkDownloader:
+    """Run ``fetcher(symbols, start)`` for many chunks concurrently.
+
+    A chunk is retried ``retries`` times with exponential backoff; if it still
+    fails it is split into single-symbol chunks which get the same treatment.
+    Symbols a fetcher reports as ``MissingSymbols`` are fetched again as a
+    chunk of their own, so only they are retried.
+    ``min_interval`` spaces out calls to the provider across all workers.
+    """
+
+    def __init__(self, fetcher, max_workers=4, retries=2, backoff=0.5, min_interval=0.0, sleep=time.sleep):
+        self.fetcher = fetcher
+        self.max_workers = max(1, int(max_workers))
+        self.retries = retries
+        self.backoff = backoff
+        self.min_interval = min_interval
+        self.sleep = sleep
+        self._lock = threading.Lock()
+        self._next_call = 0.0
+
+    def _throttle(self):
+        if not self.min_interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_for = self._next_call - now
+            self._next_call = max(now, self._next_call) + self.min_interval
+        if wait_for > 0:
+            self.sleep(wait_for)
+
+    def _fetch(self, symbols, start):
+        t0 = time.perf_counter()
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.sleep(self.backoff * 2 ** (attempt - 1))
+            self._throttle()
+            try:
+                frame = self.fetcher(symbols, start)
+                return ChunkResult(symbols, start, frame, None, time.perf_counter() - t0, attempt + 1)
+            except MissingSymbols as e:
+                res = ChunkResult([s for s in symbols if s not in e.symbols], start, e.frame, None,
+                                  time.perf_counter() - t0, attempt + 1)
+                res.missing = e.symbols
+                return res
+            except Exception as e:
+                error = e
+        return ChunkResult(symbols, start, None, error, time.perf_counter() - t0, self.retries + 1)
+
+    def run(self, jobs, on_result=None):
+        """Download ``jobs`` (a list of ``(start, symbols)``).
+
+        Returns ``(results, failed_symbols)``; ``results`` only holds chunks
+        that succeeded. ``on_result(result, done, total)`` is called for every
+        finished chunk, including the single-symbol retries of split chunks.
+        """
+        results = []
+        failed = []
+        total = len(jobs)
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {pool.submit(self._fetch, syms, start) for start, syms in jobs}
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    res = fut.result()
+                    done += 1
+                    if res.ok:
+                        results.append(res)
+                        if res.missing:
+                            total += 1
+                            pending.add(pool.submit(self._fetch, res.missing, res.start))
+                    elif len(res.symbols) > 1:
+                        # split the chunk so one bad symbol can't sink the rest
+                        total += len(res.symbols)
+                        pending |= {pool.submit(self._fetch, [s], res.start) for s in res.symbols}
+                    else:
+                        failed.extend(res.symbols)
+                    if on_result is not None:
+                        on_result(res, done, total)
+        return results, failed
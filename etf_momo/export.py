@@ -0,0 +1,139 @@
+"""Single-pass Excel export of the ranked and filtered tables.
+
+The workbook is written once with xlsxwriter straight into memory; the
+filter highlighting is expressed as native conditional formats instead of
+per-cell fills, so export time stays linear in the number of rows.
+"""
+import io
+import math
+
+import numpy as np
+import pandas as pd
+
+from etf_momo.factors import MOMENTUM_FILTERS
+from etf_momo.profiling import profiled
+
+UNFILTERED_SHEET = 'Unfiltered ETF'
+FILTERED_SHEET = 'Filtered ETF'
+XLSX_MIME = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+HEADER_COLOR = '#00008B'  # Dark blue
+FAILED_COLOR = '#D6B4FC'  # cells that do not meet a filter condition
+
+
+def failed_rules(filters=MOMENTUM_FILTERS):
+    """Highlight rules for the unfiltered sheet: column -> Excel condition on
+    that column's cell, written with {col} (and {other} for a second column)."""
+    return {f.column: f.excel_condition() for f in filters}
+
+
+def _col_letter(idx):
+    letters = ''
+    idx += 1
+    while idx:
+        idx, rem = divmod(idx - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+
+def _frame_values(frame):
+    """Header and rows (index first) as plain Python values."""
+    frame = frame.reset_index()
+    header = [str(c) for c in frame.columns]
+    rows = frame.astype(object).where(frame.notna(), None).to_numpy().tolist()
+    return header, rows
+
+
+def _width(header, rows):
+    # content-based width like the old openpyxl formatter: longest value + 2
+    widths = [len(h) for h in header]
+    for row in rows:
+        for j, v in enumerate(row):
+            if v:
+                n = len(str(v))
+                if n > widths[j]:
+                    widths[j] = n
+    return [w + 2 for w in widths]
+
+
+def _write_table(ws, header, rows, fmt_header, fmt_cell):
+    ws.freeze_panes(1, 0)
+    ws.write_row(0, 0, header, fmt_header)
+    for i, row in enumerate(rows, start=1):
+        for j, v in enumerate(row):
+            if v is None or (isinstance(v, float) and not math.isfinite(v)):
+                ws.write_blank(i, j, None, fmt_cell)
+            elif isinstance(v, (bool, np.bool_)):
+                ws.write_boolean(i, j, bool(v), fmt_cell)
+            elif isinstance(v, (int, float, np.integer, np.floating)):
+                ws.write_number(i, j, float(v), fmt_cell)
+            else:
+                ws.write_string(i, j, str(v), fmt_cell)
+
+
+def _round_column(header, rows, name, fn):
+    if name in header:
+        j = header.index(name)
+        for row in rows:
+            if isinstance(row[j], (int, float)) and not isinstance(row[j], bool) and math.isfinite(row[j]):
+                row[j] = fn(row[j])
+
+
+@profiled()
+def build_excel(dfStats, filtered, filters=MOMENTUM_FILTERS):
+    """Return the formatted two-sheet workbook as bytes; cells failing ``filters`` are highlighted."""
+    import xlsxwriter  # only needed once a workbook is built; keeps app startup light
+
+    buf = io.BytesIO()
+    wb = xlsxwriter.Workbook(buf, {'in_memory': True})
+    border = {'border': 1, 'align': 'center', 'valign': 'vcenter'}
+    fmt_header = wb.add_format({**border, 'bold': True, 'font_color': '#FFFFFF', 'bg_color': HEADER_COLOR})
+    fmt_cell = wb.add_format(border)
+    fmt_failed = wb.add_format({'bg_color': FAILED_COLOR})
+    fmt_bold = wb.add_format({'bold': True})
+
+    # Unfiltered sheet: highlight each failed condition and the ticker of any failing row
+    header, rows = _frame_values(dfStats)
+    widths = _width(header, rows)
+    _round_column(header, rows, 'ATH', round)
+    ws = wb.add_worksheet(UNFILTERED_SHEET)
+    _write_table(ws, header, rows, fmt_header, fmt_cell)
+    for j, w in enumerate(widths):
+        ws.set_column(j, j, w)
+    if rows:
+        last = len(rows)
+        failed = []
+        for name, (rule, other) in failed_rules(filters).items():
+            if name not in header or (other and other not in header):
+                continue
+            col = f'{_col_letter(header.index(name))}2'
+            refs = [col] + ([f'{_col_letter(header.index(other))}2'] if other else [])
+            cond = rule.format(col=col, other=refs[-1])
+            formula = f'AND({",".join(f"ISNUMBER({r})" for r in refs)},{cond})'
+            failed.append(formula)
+            ws.conditional_format(1, header.index(name), last, header.index(name),
+                                  {'type': 'formula', 'criteria': '=' + formula, 'format': fmt_failed})
+        if failed and 'Ticker' in header:
+            j = header.index('Ticker')
+            ws.conditional_format(1, j, last, j,
+                                  {'type': 'formula', 'criteria': f'=OR({",".join(failed)})', 'format': fmt_failed})
+
+    # Filtered sheet: rounded ATH, AWAY_ATH as percent text and a summary
+    header, rows = _frame_values(filtered)
+    widths = _width(header, rows)
+    _round_column(header, rows, 'ATH', round)
+    _round_column(header, rows, 'AWAY_ATH', lambda v: f'{v}%')
+    ws = wb.add_worksheet(FILTERED_SHEET)
+    _write_table(ws, header, rows, fmt_header, fmt_cell)
+    for j, w in enumerate(widths):
+        ws.set_column(j, j, w)
+    summary_row = len(rows) + 2
+    ws.write(summary_row, 0, 'Summary', fmt_bold)
+    ws.write(summary_row + 1, 0, f'Total Filtered ETF:  {len(rows)}', fmt_bold)
+
+    wb.close()
+    return buf.getvalue()
+
+
+def excel_file_name(selected_date, universe, ranking_method):
+    return f"{pd.Timestamp(selected_date).strftime('%Y-%m-%d')}_{universe}_{ranking_method}_lookback.xlsx"
@@ -0,0 +1,220 @@
+"""Factor registry: ranking methods and filters declared once.
+
+A ``Factor`` is a weighted sum of dfStats columns, each optionally
+normalised across the universe (z-score or percentile); a ``Filter`` is a
+threshold on one column or a comparison with another. The same declarations
+drive the app's ranking, the filter descriptions, the Excel highlighting and
+the backtest, where scores and ranks are evaluated as 2-D date x symbol
+arrays in one pass.
+
+``stats`` is either a dfStats DataFrame (one row per symbol) or a mapping of
+column name to DataFrame[date x symbol] as returned by ``stats_panel``.
+"""
+import operator
+import warnings
+
+import numpy as np
+import pandas as pd
+
+NORMALIZATIONS = ('raw', 'zscore', 'percentile')
+
+_OPS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+# Excel condition for a failed check, per filter operator
+_NEGATED = {'>': '<=', '>=': '<', '<': '>=', '<=': '>'}
+
+
+class Filter:
+    """``column op threshold`` or, with ``other``, ``column op other``."""
+
+    def __init__(self, column, op, threshold=None, other=None, label=None):
+        if op not in _OPS:
+            raise ValueError(f'unknown operator {op!r}, expected one of {list(_OPS)}')
+        if (threshold is None) == (other is None):
+            raise ValueError('give exactly one of threshold or other')
+        self.column = column
+        self.op = op
+        self.threshold = threshold
+        self.other = other
+        self.label = label or f'{column} {op} {other if other is not None else threshold}'
+
+    def __repr__(self):
+        return f'Filter({self.column} {self.op} {self.other if self.other is not None else self.threshold})'
+
+    def with_threshold(self, threshold):
+        """Same check with another threshold (for sweeps)."""
+        return Filter(self.column, self.op, threshold=threshold)
+
+    def mask(self, stats):
+        """Boolean Series/DataFrame of the rows (symbols) passing the check."""
+        right = stats[self.other] if self.other is not None else self.threshold
+        return _OPS[self.op](stats[self.column], right)
+
+    def excel_condition(self):
+        """(condition on ``{col}``, other column or None) that marks a failed cell."""
+        right = '{other}' if self.other is not None else repr(self.threshold)
+        return '{col}' + _NEGATED[self.op] + right, self.other
+
+
+# The momentum filters of the original script
+MOMENTUM_FILTERS = [
+    Filter('volm_cr', '>', 1, label='Volume greater than 1 crore (volm_cr > 1)'),
+    Filter('Close', '>', other='dma200d', label='Closing price above 200-day moving average (Close > dma200d)'),
+    Filter('roc12M', '>', 6.5, label='12-month Rate of Change (ROC) greater than 6.5% (roc12M > 6.5)'),
+    Filter('AWAY_ATH', '>', -25, label='Away from All-Time High within 25% (AWAY_ATH > -25)'),
+]
+
+
+def passes(stats, filters=MOMENTUM_FILTERS):
+    """Rows passing every filter (all True when ``filters`` is empty)."""
+    out = None
+    for f in filters:
+        m = f.mask(stats)
+        out = m if out is None else out & m
+    if out is None:
+        if isinstance(stats, pd.DataFrame):
+            return pd.Series(True, index=stats.index)
+        like = next(iter(stats.values()))
+        out = pd.DataFrame(True, index=like.index, columns=like.columns)
+    return out
+
+
+def _normalize(a, how):
+    """Normalise 2-D ``a`` across symbols (axis 1), ignoring NaNs."""
+    if how == 'raw':
+        return a
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        if how == 'zscore':
+            sd = np.nanstd(a, axis=1, keepdims=True)
+            return (a - np.nanmean(a, axis=1, keepdims=True)) / np.where(sd > 0, sd, np.nan)
+        # percentile: average rank / number of valid values, like rank(pct=True)
+        return pd.DataFrame(a).rank(axis=1, pct=True).to_numpy()
+
+
+class Factor:
+    """Weighted sum of dfStats columns, each normalised across the universe.
+
+    A symbol with any input missing gets no score (NaN).
+    """
+
+    def __init__(self, name, weights, normalize='raw', label=None):
+        if normalize not in NORMALIZATIONS:
+            raise ValueError(f'unknown normalization {normalize!r}, expected one of {NORMALIZATIONS}')
+        self.name = name
+        self.weights = dict(weights)
+        self.normalize = normalize
+        self.label = label or name
+
+    def __repr__(self):
+        return f'Factor({self.name!r}, {self.weights}, {self.normalize!r})'
+
+    @property
+    def is_column(self):
+        """True for a plain dfStats column used as is."""
+        return self.normalize == 'raw' and list(self.weights.items()) == [(self.name, 1)]
+
+    def score_array(self, stats):
+        """Score as a 2-D array (dates x symbols; one row for a dfStats table)."""
+        total = None
+        for col, w in self.weights.items():
+            a = np.asarray(stats[col], dtype=float)
+            a = _normalize(a.reshape(1, -1) if a.ndim == 1 else a, self.normalize)
+            total = w * a if total is None else total + w * a
+        return total
+
+    def score(self, stats):
+        """Score shaped like the input: a Series or a date x symbol DataFrame."""
+        a = self.score_array(stats)
+        if isinstance(stats, pd.DataFrame):
+            return pd.Series(a[0], index=stats.index, name=self.name)
+        like = stats[next(iter(self.weights))]
+        return pd.DataFrame(a, index=like.index, columns=like.columns)
+
+
+FACTORS = {}
+
+
+def register(factor):
+    """Add a ranking method to the registry (replacing one with the same name)."""
+    FACTORS[factor.name] = factor
+    return factor
+
+
+register(Factor('sharpe3M', {'sharpe3M': 1}, label='Sharpe3M'))
+register(Factor('avgSharpe', {'avgSharpe': 1}, label='AvgSharpe 12M/9M/6M/3M'))
+register(Factor('zSharpe', {'sharpe12M': 1, 'sharpe6M': 1, 'sharpe3M': 1}, normalize='zscore',
+                label='Z-Score Sharpe 12M+6M+3M'))
+register(Factor('pctMomentum', {'roc12M': 0.5, 'roc6M': 0.3, 'roc3M': 0.2}, normalize='percentile',
+                label='Percentile ROC 50/30/20'))
+
+# Display labels and the registered factor each ranking method sorts on
+RANKING_METHODS = {f.label: f.name for f in FACTORS.values()}
+
+
+def get_factor(factor):
+    """A registered ``Factor`` by name (a ``Factor`` is returned as is)."""
+    if isinstance(factor, Factor):
+        return factor
+    try:
+        return FACTORS[factor]
+    except KeyError:
+        raise KeyError(f'unknown ranking method {factor!r}, expected one of {list(FACTORS)}') from None
+
+
+def rank_array(scores, keep_nan=True):
+    """Descending 1-based ranks along axis 1, ties in column order (rank method 'first').
+
+    NaN scores rank last (argsort puts NaN at the end); with ``keep_nan``
+    their rank is NaN.
+    """
+    scores = np.atleast_2d(np.asarray(scores, dtype=float))
+    order = np.argsort(-scores, axis=1, kind='stable')
+    ranks = np.empty(scores.shape)
+    np.put_along_axis(ranks, order, np.arange(1, scores.shape[1] + 1, dtype=float)[None, :], axis=1)
+    if keep_nan:
+        ranks[np.isnan(scores)] = np.nan
+    return ranks
+
+
+def rank(stats, factor, filters=None):
+    """Ranks by ``factor`` among symbols passing ``filters`` (None: no filtering).
+
+    Returns a Series of int ranks for a dfStats table (every symbol ranked,
+    missing scores last) or a date x symbol DataFrame (unranked = NaN).
+    """
+    factor = get_factor(factor)
+    a = factor.score_array(stats)
+    if filters is not None:
+        a = np.where(np.asarray(passes(stats, filters)).reshape(a.shape), a, np.nan)
+    if isinstance(stats, pd.DataFrame):
+        return pd.Series(rank_array(a, keep_nan=False)[0].astype(int), index=stats.index, name='Rank')
+    like = stats[next(iter(factor.weights))]
+    return pd.DataFrame(rank_array(a), index=like.index, columns=like.columns)
+
+
+def filtered_view(ranked, factor):
+    """Rows of a ranked table (``pipeline.rank_stats``) meeting all filter conditions, best score first."""
+    return ranked[ranked['final_momentum']].sort_values(get_factor(factor).name, ascending=False)
+
+
+def sweep(stats, factors, filter_sets):
+    """Ranks for every (factor, filter set) combination in one pass.
+
+    Each factor is scored once and each distinct filter evaluated once;
+    ``filter_sets`` maps a name to a list of filters. Returns
+    {(factor name, filter set name): rank array (dates x symbols)}.
+    """
+    scores = {f.name: f.score_array(stats) for f in map(get_factor, factors)}
+    masks = {}
+    out = {}
+    for set_name, filters in filter_sets.items():
+        ok = None
+        for f in filters:
+            key = (f.column, f.op, f.threshold, f.other)
+            if key not in masks:
+                masks[key] = np.asarray(f.mask(stats))
+            ok = masks[key] if ok is None else ok & masks[key]
+        for name, a in scores.items():
+            s = a if ok is None else np.where(ok.reshape(a.shape), a, np.nan)
+            out[name, set_name] = rank_array(s)
+    return out
@@ -0,0 +1,172 @@
+"""Metric helpers of the original ranking script.
+
+``getStats`` is the reference per-window implementation of dfStats; the app
+uses the vectorized ``etf_momo.metrics.compute_stats`` which reproduces it.
+"""
+import numpy as np
+import pandas as pd
+
+
+def getMedianVolume(data):
+	return(round(data.median(),0))
+
+def getDailyReturns(data):
+	return(data.pct_change(fill_method = 'ffill')) #Modified
+
+# change inf value to max and min value of that column
+def getMaskDailyChange(data) :
+	ret = getDailyReturns(data)
+	m1 = ret.eq(np.inf) # for inf value
+	m2 = ret.eq(-np.inf) #for -inf value
+	return(ret.mask(m1, ret[~m1].max(), axis=1).mask(m2, ret[~m2].min(), axis=1).bfill(axis = 1))
+
+
+def getStdev(data):
+	return(np.std(getMaskDailyChange(data)*100))
+
+def getStdRatio(data, data1):
+	return((getStdev(data)/getStdev(data1)*100)) # to judge volatility 1 month against 1 year
+
+def getAbsReturns(data):
+	x = (data.iloc[-1]/data.iloc[0] - 1)*100
+	return(round(x, 2))
+
+def getVolatility(data):
+	return(round(np.std(data) * np.sqrt(252) * 100, 2))
+
+# Last trading row of every month, for all columns at once
+def getMonthlyPrices(data):
+	return(data[~data.index.to_period('M').duplicated(keep='last')])
+
+def getMonthlyReturns(data):
+	return(data.pct_change())
+
+def getSharpe(data):
+	return(round(np.sqrt(252) * data.mean()/data.std(), 2))
+
+def getSortino(data):
+	return(np.sqrt(252) * data.mean()/data.where(data<0).std())
+
+def getMaxDrawdown(data):
+	cummRet = (data+1).cumprod()
+	peak = cummRet.cummax()
+	drawdown = (cummRet/peak) - 1
+	return drawdown.min()
+
+def getCalmar(data):
+	return(data.mean()*252/abs(getMaxDrawdown(data)))
+
+def getAbsMomentumVolAdjusted(absReturn, volatility):
+	return(absReturn/volatility)
+
+def getNMonthRoC(data, N):
+	ret = round((data.iloc[-1]/data.iloc[-1-N] - 1) * 100, 2)
+	return(ret)
+
+def getNWeekRoC(data, N):
+	ret = round((data.iloc[-1]/data.iloc[-1-N] - 1) * 100, 2)
+	return(ret)
+
+def getFIP(data):
+	retPos = np.sum(data.pct_change()[1:] > 0)
+	retNeg = np.sum(data.pct_change()[1:] < 0)
+	return(retPos - retNeg)
+
+def getSharpeRoC(roc, volatility):
+	return(round(roc/volatility, 2))
+
+# Beta, correlation and annualised tracking error (%) of every column of
+# `returns` against the matching column of `benchReturns` (a Series is used
+# for all columns). Moments are taken over the rows where both are present.
+def getRelativeRisk(returns, benchReturns):
+	r = returns.to_numpy(dtype=float)
+	if isinstance(benchReturns, pd.Series):
+		b = np.repeat(benchReturns.reindex(returns.index).to_numpy(dtype=float)[:, None], r.shape[1], axis=1)
+	else:
+		b = benchReturns.reindex(index=returns.index, columns=returns.columns).to_numpy(dtype=float)
+	both = np.isfinite(r) & np.isfinite(b)
+	r = np.where(both, r, 0.0)
+	b = np.where(both, b, 0.0)
+	n = both.sum(axis=0).astype(float)
+	with np.errstate(divide='ignore', invalid='ignore'):
+		mr = r.sum(axis=0)/n
+		mb = b.sum(axis=0)/n
+		dr = np.where(both, r - mr, 0.0)
+		db = np.where(both, b - mb, 0.0)
+		cov = (dr*db).sum(axis=0)/(n - 1)
+		varR = (dr*dr).sum(axis=0)/(n - 1)
+		varB = (db*db).sum(axis=0)/(n - 1)
+		te = np.sqrt(((dr - db)**2).sum(axis=0)/(n - 1)) * np.sqrt(252) * 100
+		out = pd.DataFrame({'beta': cov/varB, 'corr': cov/np.sqrt(varR*varB), 'trackErr': te}, index=returns.columns)
+	out[n < 2] = np.nan
+	return(out.replace([np.inf, -np.inf], np.nan).round(2))
+
+#Beta against Nifty (a Series or single-column frame) for every column of data12M
+def getBeta(dfNifty, data12M):
+	niftyReturns = getDailyReturns(dfNifty.squeeze(axis=1) if isinstance(dfNifty, pd.DataFrame) else dfNifty)[1:]
+	dailyReturns = getDailyReturns(data12M)[1:]
+	return list(getRelativeRisk(dailyReturns, niftyReturns)['beta'])
+
+def getStats(close, high, volume, dates, symbol):
+    # Reference implementation of dfStats: one copied frame per lookback window
+    data20Y = close.loc[:dates['endDate']].copy()
+    volume20Y = volume.loc[:dates['endDate']].copy()
+    high20Y = high.loc[:dates['endDate']].copy()
+    volume12M = volume20Y.loc[dates['date12M']:].copy()
+
+
+    # At least 12 months of trading is required
+    data12M = data20Y.loc[dates['date12M']:].copy()
+    data9M = data20Y.loc[dates['date9M']:].copy()
+    data6M = data20Y.loc[dates['date6M']:].copy()
+    data3M = data20Y.loc[dates['date3M']:].copy()
+    data1M = data20Y.loc[dates['date1M']:].copy()
+
+    # Calculate metrics for dfStats (e.g., 1 month momentum, 3-month volatility, etc.)
+    dfStats = pd.DataFrame(index=symbol)
+    dfStats['Close'] = round(data12M.iloc[-1], 2)
+    data12M_Temp = data12M.fillna(0)
+    dfStats['dma200d'] = round(data12M_Temp.rolling(window=200).mean().iloc[-1], 2)  # 200-day DMA
+    # Rate of change
+
+    dfStats['roc12M'] = getAbsReturns(data12M)
+    dfStats['roc9M'] = getAbsReturns(data9M)
+    dfStats['roc6M'] = getAbsReturns(data6M)
+    dfStats['roc3M'] = getAbsReturns(data3M)
+
+
+    # Volatility
+
+    dfStats['vol12M'] = getVolatility(getDailyReturns(data12M))
+    dfStats['vol9M'] = getVolatility(getDailyReturns(data9M))
+    dfStats['vol6M'] = getVolatility(getDailyReturns(data6M))
+    dfStats['vol3M'] = getVolatility(getDailyReturns(data3M))
+
+    dfStats['sharpe12M'] = getSharpeRoC(dfStats['roc12M'], dfStats['vol12M'])
+    dfStats['sharpe9M'] = getSharpeRoC(dfStats['roc9M'], dfStats['vol9M'])
+    dfStats['sharpe6M'] = getSharpeRoC(dfStats['roc6M'], dfStats['vol6M'])
+    dfStats['sharpe3M'] = getSharpeRoC(dfStats['roc3M'], dfStats['vol3M'])
+
+    dfStats['avgSharpe'] = (dfStats[["sharpe12M", "sharpe9M", "sharpe6M", "sharpe3M"]].mean(axis=1)).round(2)  # 1st Factor #1st Factor
+
+    dfStats['volm_cr'] = (getMedianVolume(volume12M) / 1e7).round(2)
+
+    #***************************
+
+    # Calculate ATH and Away from ATH% (Additional added condition)
+    dfStats['ATH'] = round(high20Y.max(), 2)
+    dfStats['AWAY_ATH'] = round((dfStats['Close'] / dfStats['ATH'] - 1) * 100, 2)  # Calculate %away from ALL TIME HIGH
+
+
+    # Add 'Ticker' as a reset index column and rename it
+    dfStats = dfStats.reset_index().rename(columns={'index': 'Ticker'})
+
+    #Convert to String and Remove the .NS Suffix
+    dfStats['Ticker'] = dfStats['Ticker'].astype(str)
+    dfStats['Ticker'] = dfStats['Ticker'].str.replace('.NS', '', case=False, regex=False)
+
+    # Handle Nan and inf values to zero(0) for ranking
+    dfStats['avgSharpe'] = dfStats['avgSharpe'].replace([np.inf, -np.inf], np.nan).fillna(0)
+    dfStats['sharpe3M'] = dfStats['sharpe3M'].replace([np.inf, -np.inf], np.nan).fillna(0)
+
+    return dfStats
@@ -0,0 +1,241 @@
+"""Ranking history: every ranked table persisted to a local SQLite database.
+
+    python -m etf_momo.history trajectory --tickers NIFTYBEES GOLDBEES --start 2024-01-01
+    python -m etf_momo.history changes --method avgSharpe --top-n 10
+    python -m etf_momo.history heatmap --top 20
+
+One row per (universe, method, date, ticker) holds the rank, the factor score,
+whether the ETF passed the momentum filters and its close. The primary key
+serves per-date snapshots and date ranges; a covering index on
+(universe, method, ticker, date, rank) serves rank trajectories and a small
+``snapshots`` table lists the stored dates, so queries over years of daily
+snapshots read only the rows they return.
+
+The full ranked table of the most recent date per (universe, method) is also
+kept as a small parquet file next to the database, so the app can show the
+latest ranking on its landing page before downloading or computing anything.
+"""
+import argparse
+import contextlib
+import glob
+import os
+import sqlite3
+import warnings
+
+import pandas as pd
+
+from etf_momo.factors import FACTORS, get_factor
+from etf_momo.universe import DEFAULT_UNIVERSE
+
+DEFAULT_HISTORY_PATH = os.environ.get('ETF_MOMO_HISTORY_DB', os.path.join('data', 'history.sqlite'))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rankings (
+    universe TEXT NOT NULL,
+    method TEXT NOT NULL,
+    date TEXT NOT NULL,
+    ticker TEXT NOT NULL,
+    rank INTEGER NOT NULL,
+    score REAL,
+    passed INTEGER NOT NULL,
+    close REAL,
+    PRIMARY KEY (universe, method, date, ticker)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS rankings_by_ticker ON rankings (universe, method, ticker, date, rank);
+CREATE TABLE IF NOT EXISTS snapshots (
+    universe TEXT NOT NULL,
+    method TEXT NOT NULL,
+    date TEXT NOT NULL,
+    tickers INTEGER NOT NULL,
+    PRIMARY KEY (universe, method, date)
+) WITHOUT ROWID;
+"""
+
+
+def _day(d):
+    return pd.Timestamp(d).strftime('%Y-%m-%d')
+
+
+class RankingHistory:
+    """Ranked snapshots per (universe, method, date) in one SQLite file.
+
+    A connection is opened per call, so one instance can be shared across
+    threads (Streamlit sessions) and processes.
+    """
+
+    def __init__(self, path=DEFAULT_HISTORY_PATH, latest_dir=None):
+        self.path = path
+        self.latest_dir = latest_dir or os.path.join(os.path.dirname(path), 'latest')
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as con:
+            con.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def _connect(self):
+        con = sqlite3.connect(self.path, timeout=30)
+        try:
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def _query(self, sql, params=()):
+        with self._connect() as con:
+            return pd.read_sql_query(sql, con, params=params)
+
+    def record(self, ranked, date, universe, method):
+        """Store a ``rank_stats`` table as the snapshot for ``date``, replacing any earlier one."""
+        score = get_factor(method).name
+        rows = [(universe, method, _day(date), t, int(r), None if pd.isna(s) else float(s), int(bool(p)),
+                 None if pd.isna(c) else float(c))
+                for r, t, s, p, c in zip(ranked.index, ranked['Ticker'], ranked[score], ranked['final_momentum'],
+                                         ranked['Close'])]
+        with self._connect() as con:
+            con.execute('DELETE FROM rankings WHERE universe = ? AND method = ? AND date = ?',
+                        (universe, method, _day(date)))
+            con.executemany('INSERT INTO rankings VALUES (?, ?, ?, ?, ?, ?, ?, ?)', rows)
+            con.execute('INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)',
+                        (universe, method, _day(date), len(rows)))
+        if _day(date) == self._last_date(universe, method):
+            self._save_latest(ranked, date, universe, method)
+        return len(rows)
+
+    def _last_date(self, universe, method):
+        with self._connect() as con:
+            return con.execute('SELECT MAX(date) FROM snapshots WHERE universe = ? AND method = ?',
+                               (universe, method)).fetchone()[0]
+
+    def _latest_path(self, universe, method, date):
+        return os.path.join(self.latest_dir, f'{universe}_{method}_{_day(date)}.parquet')
+
+    def _save_latest(self, ranked, date, universe, method):
+        os.makedirs(self.latest_dir, exist_ok=True)
+        path = self._latest_path(universe, method, date)
+        ranked.to_parquet(path + '.tmp')
+        os.replace(path + '.tmp', path)
+        for old in glob.glob(os.path.join(self.latest_dir, f'{universe}_{method}_*-*-*.parquet')):
+            if old != path:
+                os.remove(old)
+
+    def latest(self, universe=DEFAULT_UNIVERSE, method='sharpe3M'):
+        """(date, full ranked table) of the most recent stored ranking, or None."""
+        last = self._last_date(universe, method)
+        if last is None or not os.path.exists(self._latest_path(universe, method, last)):
+            return None
+        return pd.Timestamp(last), pd.read_parquet(self._latest_path(universe, method, last))
+
+    def dates(self, universe=DEFAULT_UNIVERSE, method='sharpe3M', start=None, end=None):
+        """Snapshot dates in range, oldest first."""
+        sql = 'SELECT date FROM snapshots WHERE universe = ? AND method = ?'
+        sql, params = self._range(sql, [universe, method], start, end)
+        return pd.DatetimeIndex(self._query(sql + ' ORDER BY date', params)['date'])
+
+    def snapshot(self, date, universe=DEFAULT_UNIVERSE, method='sharpe3M'):
+        return self._query('SELECT ticker, rank, score, passed, close FROM rankings '
+                           'WHERE universe = ? AND method = ? AND date = ? ORDER BY rank',
+                           (universe, method, _day(date))).set_index('rank')
+
+    @staticmethod
+    def _range(sql, params, start, end):
+        if start is not None:
+            sql += ' AND date >= ?'
+            params.append(_day(start))
+        if end is not None:
+            sql += ' AND date <= ?'
+            params.append(_day(end))
+        return sql, params
+
+    def trajectory(self, tickers, universe=DEFAULT_UNIVERSE, method='sharpe3M', start=None, end=None,
+                   value='rank'):
+        """Date x ticker table of ``value`` (rank, score, passed or close) for ``tickers``."""
+        if value not in ('rank', 'score', 'passed', 'close'):
+            raise ValueError(f'unknown value column {value!r}')
+        tickers = list(tickers)
+        # without ANALYZE statistics SQLite would scan the primary key range instead
+        sql = (f'SELECT date, ticker, {value} FROM rankings INDEXED BY rankings_by_ticker '
+               f'WHERE universe = ? AND method = ? AND ticker IN ({", ".join("?" * len(tickers))})')
+        sql, params = self._range(sql, [universe, method, *tickers], start, end)
+        rows = self._query(sql, params)
+        table = rows.pivot(index='date', columns='ticker', values=value)
+        table.index = pd.DatetimeIndex(table.index, name='date')
+        return table.reindex(columns=[t for t in tickers if t in table.columns]).sort_index()
+
+    def members(self, universe=DEFAULT_UNIVERSE, method='sharpe3M', start=None, end=None, top_n=None):
+        """(date, ticker, rank) rows of the held set: filter passers, or the top ``top_n`` of those."""
+        sql = 'SELECT date, ticker, rank FROM rankings WHERE universe = ? AND method = ? AND passed = 1'
+        sql, params = self._range(sql, [universe, method], start, end)
+        rows = self._query(sql, params)
+        if top_n is not None:
+            # passers in rank order; the top_n of them form the basket
+            rows = rows.sort_values(['date', 'rank'])
+            rows = rows[rows.groupby('date').cumcount() < top_n]
+        return rows
+
+    def changes(self, universe=DEFAULT_UNIVERSE, method='sharpe3M', start=None, end=None, top_n=None):
+        """Entries and exits of the held set between consecutive snapshot dates."""
+        dates = self.dates(universe, method, start, end)
+        rows = self.members(universe, method, start, end, top_n)
+        held = rows.groupby('date')['ticker'].agg(set).reindex([_day(d) for d in dates])
+        out = []
+        prev = None
+        for day, now in held.items():
+            now = now if isinstance(now, set) else set()
+            if prev is not None:
+                out.append({'date': pd.Timestamp(day), 'held': len(now), 'entered': ', '.join(sorted(now - prev)),
+                            'exited': ', '.join(sorted(prev - now)),
+                            'turnover %': round(len(now ^ prev) / 2 / max(len(now), len(prev), 1) * 100, 1)})
+            prev = now
+        return pd.DataFrame(out, columns=['date', 'held', 'entered', 'exited', 'turnover %'])
+
+    def heatmap(self, universe=DEFAULT_UNIVERSE, method='sharpe3M', start=None, end=None, top=20):
+        """Ticker x date rank change since the previous snapshot (positive = moved up).
+
+        Rows are the ``top`` tickers by best rank on the last date in range.
+        """
+        dates = self.dates(universe, method, start, end)
+        if not len(dates):
+            return pd.DataFrame()
+        leaders = self.snapshot(dates[-1], universe, method)['ticker'].head(top)
+        ranks = self.trajectory(leaders, universe, method, start, end)
+        return (ranks.shift() - ranks).iloc[1:].T
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog='etf_momo.history', description='Query the stored ranking history.')
+    p.add_argument('view', choices=['dates', 'trajectory', 'changes', 'heatmap'])
+    p.add_argument('--db', default=DEFAULT_HISTORY_PATH, help='history database')
+    p.add_argument('--universe', default=DEFAULT_UNIVERSE)
+    p.add_argument('--method', choices=list(FACTORS), default='sharpe3M')
+    p.add_argument('--start', help='first date (YYYY-MM-DD)')
+    p.add_argument('--end', help='last date (YYYY-MM-DD)')
+    p.add_argument('--tickers', nargs='+', help='tickers for trajectory (without .NS)')
+    p.add_argument('--top-n', type=int, help='changes: held set is the top N filter passers')
+    p.add_argument('--top', type=int, default=20, help='heatmap: tickers shown')
+    p.add_argument('--out', help='also write the view to this CSV')
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    warnings.simplefilter('ignore')
+    args = parse_args(argv)
+    history = RankingHistory(args.db)
+    query = {'universe': args.universe, 'method': args.method, 'start': args.start, 'end': args.end}
+    if args.view == 'dates':
+        table = history.dates(**query).to_frame(index=False)
+    elif args.view == 'trajectory':
+        if not args.tickers:
+            raise SystemExit('trajectory needs --tickers')
+        table = history.trajectory(args.tickers, **query)
+    elif args.view == 'changes':
+        table = history.changes(top_n=args.top_n, **query)
+    else:
+        table = history.heatmap(top=args.top, **query)
+    print(table.to_string())
+    if args.out:
+        table.to_csv(args.out)
+        print(f'-> {args.out}')
+
+
+if __name__ == '__main__':
+    main()
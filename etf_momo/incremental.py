@@ -0,0 +1,253 @@
+"""Stateful dfStats engine that moves the lookback date forward bar by bar.
+
+Instead of recomputing every window, the engine keeps per-symbol running
+state: return sums and sums of squares per horizon, the 200-day Close sum,
+the running ATH and a sorted window of traded values for the median. A new
+bar is folded in with O(1) work per symbol (O(log n) search for the median
+window) and rows leaving a window are subtracted as its start moves.
+"""
+import bisect
+import threading
+
+import numpy as np
+import pandas as pd
+
+from etf_momo.metrics import DMA_WINDOW, HORIZONS, TRADING_DAYS, VOLUME_HORIZON, assemble_stats, horizon_dates
+from etf_momo.profiling import profiled
+
+# Moving further than this many rows ahead rebuilds the state from the panel
+MAX_STEPS = 63
+
+
+class IncrementalStats:
+
+    def __init__(self, symbols, horizons=HORIZONS, missing=None):
+        self.symbols = pd.Index(symbols)
+        self.horizons = dict(horizons)
+        self.longest = VOLUME_HORIZON if VOLUME_HORIZON in horizons else max(horizons, key=horizons.get)
+        n = len(self.symbols)
+        self.missing = np.zeros(n, dtype=bool) if missing is None else np.asarray(missing)
+        # buffered rows, absolute row number = self.base + position
+        self.base = 0
+        self.origin = 0
+        self.dates = []
+        self.close = []
+        self.rets = []
+        self.volume = []
+        self.end = None
+        self.last_price = np.full(n, np.nan)
+        self.ath = np.full(n, np.nan)
+        self.dma_sum = np.zeros(n)
+        self.start = {h: 0 for h in horizons}
+        # first valid Close row at or after each window start (-1 = none yet)
+        self.first = {h: np.full(n, -1) for h in horizons}
+        self.sum = {h: np.zeros(n) for h in horizons}
+        self.sum2 = {h: np.zeros(n) for h in horizons}
+        self.count = {h: np.zeros(n) for h in horizons}
+        self.bad = {h: np.zeros(n) for h in horizons}
+        self.vol_window = [[] for _ in range(n)]
+        self.vol_start = 0
+        self._lock = threading.Lock()
+        self._panel = None
+
+    @classmethod
+    @profiled('IncrementalStats.from_panel')
+    def from_panel(cls, panel, end, symbols=None, horizons=HORIZONS):
+        """Engine positioned at lookback date ``end`` of a ``PricePanel``.
+
+        Only rows from the start of the longest window (or the 200-day DMA
+        span) are replayed; earlier history only seeds the ATH and the last
+        traded price.
+        """
+        symbols = panel.symbols if symbols is None else pd.Index(symbols)
+        pos = panel.symbols.get_indexer(symbols)
+        eng = cls(symbols, horizons, missing=pos < 0)
+        eng._panel = (panel, pos)
+        end = pd.Timestamp(end)
+        end_row = panel.dates.searchsorted(end, side='right') - 1
+        starts = [panel.dates.searchsorted(d, side='left') for d in horizon_dates(end, horizons).values()]
+        lo = max(min(min(starts), end_row - DMA_WINDOW + 1), 0)
+        if lo > 0:
+            with np.errstate(invalid='ignore'):
+                hist_high = eng._row(panel['High'][:lo])
+                eng.ath = np.fmax.reduce(hist_high, axis=0)
+                hist = eng._row(panel['Close'][:lo])
+                valid = ~np.isnan(hist)
+                has = valid.any(axis=0)
+                last_valid = lo - 1 - np.argmax(valid[::-1], axis=0)
+                eng.last_price = np.where(has, hist[last_valid, np.arange(hist.shape[1])], np.nan)
+        eng.base = eng.origin = lo
+        eng.start = {h: lo for h in horizons}
+        eng.vol_start = lo
+        for row in range(lo, end_row + 1):
+            eng._push_row(panel, row)
+        eng._set_end(end)
+        return eng
+
+    def _row(self, a):
+        """Panel rows reordered to this engine's symbols (missing -> NaN)."""
+        pos = self._panel[1]
+        out = np.asarray(a, dtype=float)[..., np.maximum(pos, 0)]
+        out[..., pos < 0] = np.nan
+        return out
+
+    def _push_row(self, panel, row):
+        self.push(panel.dates[row], self._row(panel['Close'][row]), self._row(panel['High'][row]),
+                  self._row(panel['Volume'][row]))
+
+    @property
+    def rows(self):
+        return self.base + len(self.dates)
+
+    def _at(self, buf, row):
+        return buf[row - self.base]
+
+    def push(self, date, close, high, volume):
+        """Append one bar (arrays over ``symbols``); the window ends move to it."""
+        t = self.rows
+        close = np.asarray(close, dtype=float)
+        valid = ~np.isnan(close)
+        filled = np.where(valid, close, self.last_price)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ret = filled / self.last_price - 1
+        self.last_price = filled
+
+        self.dates.append(pd.Timestamp(date))
+        self.close.append(close)
+        self.rets.append(ret)
+        self.volume.append(np.asarray(volume, dtype=float))
+        self.ath = np.fmax(self.ath, np.asarray(high, dtype=float))
+
+        self.dma_sum += np.nan_to_num(close)
+        if t - DMA_WINDOW >= self.origin:
+            self.dma_sum -= np.nan_to_num(self._at(self.close, t - DMA_WINDOW))
+
+        finite = np.isfinite(ret)
+        for h in self.horizons:
+            first = self.first[h]
+            inside = first >= 0
+            take = inside & finite
+            self.sum[h][take] += ret[take]
+            self.sum2[h][take] += ret[take] ** 2
+            self.count[h][inside] += 1
+            self.bad[h][inside & ~finite & ~np.isnan(ret)] += 1
+            first[~inside & valid] = t
+
+        for j in np.flatnonzero(np.isfinite(self.volume[-1])):
+            bisect.insort(self.vol_window[j], self.volume[-1][j])
+
+    def _move_start(self, h, new):
+        """Move window ``h`` to start at row ``new``, subtracting the returns
+        that fall out of it.
+
+        Returns count from the row after each symbol's first valid price in
+        the window, so the first valid row moves to the first valid row at or
+        after ``new`` and every return up to and including it is dropped.
+        """
+        first = self.first[h]
+        moved = (first >= 0) & (first < new)
+        if not moved.any():
+            return
+        new_first = np.full(len(first), -1)
+        pending = moved.copy()
+        for r in range(new, self.rows):
+            hit = pending & ~np.isnan(self._at(self.close, r))
+            new_first[hit] = r
+            pending &= ~hit
+            if not pending.any():
+                break
+        # symbols with no price left in the window start over
+        gone = moved & (new_first < 0)
+        for acc in (self.sum[h], self.sum2[h], self.count[h], self.bad[h]):
+            acc[gone] = 0
+        moved &= ~gone
+        if moved.any():
+            for r in range(first[moved].min() + 1, new_first[moved].max() + 1):
+                out = moved & (first < r) & (r <= new_first)
+                ret = self._at(self.rets, r)
+                fin = out & np.isfinite(ret)
+                self.sum[h][fin] -= ret[fin]
+                self.sum2[h][fin] -= ret[fin] ** 2
+                self.bad[h][out & ~np.isfinite(ret) & ~np.isnan(ret)] -= 1
+                self.count[h][out] -= 1
+        first[moved | gone] = new_first[moved | gone]
+
+    def _set_end(self, end):
+        end = pd.Timestamp(end)
+        if self.end is not None and end < self.end:
+            raise ValueError('the lookback date can only move forward')
+        self.end = end
+        for h, d in horizon_dates(end, self.horizons).items():
+            new = self.base + bisect.bisect_left(self.dates, d)
+            if new > self.start[h]:
+                self._move_start(h, new)
+                self.start[h] = new
+        new = self.start[self.longest]
+        for row in range(self.vol_start, new):
+            vals = self._at(self.volume, row)
+            for j in np.flatnonzero(np.isfinite(vals)):
+                lst = self.vol_window[j]
+                del lst[bisect.bisect_left(lst, vals[j])]
+        self.vol_start = max(self.vol_start, new)
+        # keep only the rows a window start, the DMA or a pending drop can reach
+        keep = min(min(self.start.values()), self.rows - DMA_WINDOW)
+        if keep > self.base:
+            cut = keep - self.base
+            for buf in (self.dates, self.close, self.rets, self.volume):
+                del buf[:cut]
+            self.base = keep
+
+    def advance(self, date, close, high, volume):
+        """Fold in a new bar and move the lookback date to it."""
+        with self._lock:
+            self.push(date, close, high, volume)
+            self._set_end(date)
+
+    def stats_at(self, end):
+        """dfStats for ``end`` using the backing panel; cheap if ``end`` is a few bars ahead."""
+        panel = self._panel[0]
+        end = pd.Timestamp(end)
+        end_row = panel.dates.searchsorted(end, side='right') - 1
+        with self._lock:
+            if end < self.end or end_row - (self.rows - 1) > MAX_STEPS:
+                fresh = IncrementalStats.from_panel(panel, end, self.symbols, self.horizons)
+                self.__dict__.update({k: v for k, v in fresh.__dict__.items() if k != '_lock'})
+            else:
+                for row in range(self.rows, end_row + 1):
+                    self._push_row(panel, row)
+                self._set_end(end)
+            return self.stats()
+
+    def stats(self):
+        n = len(self.symbols)
+        nan = np.full(n, np.nan)
+        t = self.rows - 1
+        if t < self.base:
+            return assemble_stats(self.symbols, self.horizons, nan, nan, {h: nan for h in self.horizons},
+                                  {h: nan for h in self.horizons}, nan, self.ath)
+        last = self._at(self.close, t)
+        if t - self.start[self.longest] + 1 >= DMA_WINDOW:
+            dma = self.dma_sum / DMA_WINDOW
+            dma[self.missing] = np.nan
+        else:
+            dma = nan
+        roc, vol = {}, {}
+        for h in self.horizons:
+            s = self.start[h]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                roc[h] = (last / self._at(self.close, s) - 1) * 100 if s <= t else nan
+                cnt = self.count[h]
+                mean = self.sum[h] / cnt
+                v = np.sqrt(np.maximum(self.sum2[h] / cnt - mean * mean, 0.0)) * np.sqrt(TRADING_DAYS) * 100
+            v[(cnt <= 0) | (self.bad[h] > 0)] = np.nan
+            vol[h] = v if s <= t else nan
+        med = np.array([_median(lst) for lst in self.vol_window])
+        return assemble_stats(self.symbols, self.horizons, last, dma, roc, vol, med, self.ath)
+
+
+def _median(values):
+    n = len(values)
+    if not n:
+        return np.nan
+    mid = n // 2
+    return values[mid] if n % 2 else (values[mid - 1] + values[mid]) / 2
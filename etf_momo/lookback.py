@@ -0,0 +1,20 @@
+"""Lookback dates of a ranking run.
+
+Kept out of ``pipeline`` and its download and metric imports so the app's
+landing page can use it.
+"""
+from datetime import datetime
+
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+# first date downloaded into the price store
+DEFAULT_START = datetime(2000, 1, 1)
+
+
+def lookback_dates(end, start=DEFAULT_START):
+    end = pd.Timestamp(end).normalize().to_pydatetime()
+    dates = {'startDate': start, 'endDate': end}
+    for months in (12, 9, 6, 3, 1):
+        dates[f'date{months}M'] = end - relativedelta(months=months)
+    return dates
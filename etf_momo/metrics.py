@@ -0,0 +1,280 @@
+"""Vectorized multi-horizon metrics engine for dfStats.
+
+Daily returns are computed once on the forward-filled Close array; ROC,
+volatility and Sharpe for every horizon come from cumulative sums and index
+offsets into that array, so no window is ever copied.
+"""
+import warnings
+
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+
+from etf_momo.factors import MOMENTUM_FILTERS, passes
+
+# Lookback horizons in months, in dfStats column order
+HORIZONS = {'12M': 12, '9M': 9, '6M': 6, '3M': 3}
+
+DMA_WINDOW = 200
+VOLUME_HORIZON = '12M'
+TRADING_DAYS = 252
+
+# Ranking columns whose NaN/inf values are set to 0 so every symbol gets a rank
+RANK_COLUMNS = ['avgSharpe', 'sharpe3M']
+
+
+def horizon_dates(end, horizons=HORIZONS):
+    end = pd.Timestamp(end)
+    return {h: end - relativedelta(months=m) for h, m in horizons.items()}
+
+
+def _ffill(a):
+    """Forward fill NaNs down the rows of a 2-D array."""
+    valid = ~np.isnan(a)
+    idx = np.where(valid, np.arange(a.shape[0])[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    out = a[idx, np.arange(a.shape[1])]
+    return out, valid
+
+
+def _first_valid_from(valid, start):
+    """Row index of the first valid value at or after ``start`` per column (n if none)."""
+    n = valid.shape[0]
+    nxt = np.where(valid, np.arange(n)[:, None], n)
+    nxt = np.minimum.accumulate(nxt[::-1], axis=0)[::-1]
+    return nxt[start] if start < n else np.full(valid.shape[1], n)
+
+
+def window_stats(close, start_rows, end_row):
+    """ROC and annualised volatility (both in %) for windows ``[start, end_row]``.
+
+    ``close`` is a 2-D float array (dates x symbols). Matches
+    ``getAbsReturns(window)`` and ``getVolatility(getDailyReturns(window))``
+    where the window is ``close[start:end_row + 1]``.
+    """
+    lo = min(start_rows)
+    # only the rows the longest window can see are needed; a NaN row at the
+    # front keeps the first return of each window NaN like pct_change does
+    block = close[lo:end_row + 1]
+    filled, valid = _ffill(block)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rets = np.empty_like(filled)
+        rets[0] = np.nan
+        rets[1:] = filled[1:] / filled[:-1] - 1
+    finite = np.isfinite(rets)
+    r = np.where(finite, rets, 0.0)
+    cs = np.vstack([np.zeros((1, r.shape[1])), np.cumsum(r, axis=0)])
+    cs2 = np.vstack([np.zeros((1, r.shape[1])), np.cumsum(r * r, axis=0)])
+    bad = np.vstack([np.zeros((1, r.shape[1]), dtype=np.int64),
+                     np.cumsum(~finite & ~np.isnan(rets), axis=0)])
+    last = block.shape[0] - 1
+    cols = np.arange(block.shape[1])
+    out = {}
+    for start in start_rows:
+        s = start - lo
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roc = (block[last] / block[s] - 1) * 100 if s <= last else np.full(block.shape[1], np.nan)
+            # returns inside the window start one row after its first valid price
+            f = _first_valid_from(valid, s) + 1
+            f = np.minimum(f, last + 1)
+            count = (last + 1 - f).astype(float)
+            total = cs[last + 1] - cs[f, cols]
+            total2 = cs2[last + 1] - cs2[f, cols]
+            mean = total / count
+            var = np.maximum(total2 / count - mean * mean, 0.0)
+            vol = np.sqrt(var) * np.sqrt(TRADING_DAYS) * 100
+            vol[count == 0] = np.nan
+            # an inf return makes np.std NaN in the reference implementation
+            vol[(bad[last + 1] - bad[f, cols]) > 0] = np.nan
+        out[start] = (roc, vol)
+    return out
+
+
+def _take(a, columns, symbols, rows, dtype=float):
+    """``a[rows]`` (a 2-D array laid out like ``columns``) ordered like ``symbols``.
+
+    Only the requested rows are converted, so float32 panels are upcast one
+    window at a time; symbols missing from ``columns`` come back as NaN.
+    """
+    block = a[rows]
+    if len(columns) != len(symbols) or not (columns == symbols).all():
+        pos = columns.get_indexer(symbols)
+        block = block[:, pos]
+        block[:, pos < 0] = np.nan
+    return block.astype(dtype, copy=False) if dtype is not None else block
+
+
+def assemble_stats(symbols, horizons, close, dma, roc, vol, median_volume, ath):
+    """dfStats from per-symbol metric arrays (unrounded; ``roc``/``vol`` keyed by horizon)."""
+    stats = {'Close': np.round(close, 2), 'dma200d': np.round(dma, 2)}
+    for h in horizons:
+        stats[f'roc{h}'] = np.round(roc[h], 2)
+    for h in horizons:
+        stats[f'vol{h}'] = np.round(vol[h], 2)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = [np.round(stats[f'roc{h}'] / stats[f'vol{h}'], 2) for h in horizons]
+    for h, col in zip(horizons, sharpe):
+        stats[f'sharpe{h}'] = col
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        stats['avgSharpe'] = np.round(np.nanmean(np.where(np.isinf(sharpe), np.nan, sharpe), axis=0), 2)
+        stats['avgSharpe'][np.isinf(sharpe).any(axis=0)] = np.nan
+    stats['volm_cr'] = np.round(np.round(median_volume, 0) / 1e7, 2)
+    stats['ATH'] = np.round(ath, 2)
+    stats['AWAY_ATH'] = np.round((stats['Close'] / stats['ATH'] - 1) * 100, 2)
+
+    tickers = pd.Index(symbols).astype(str).str.replace('.NS', '', case=False, regex=False)
+    dfStats = pd.DataFrame({'Ticker': tickers, **stats})
+    for col in RANK_COLUMNS:
+        if col in dfStats:
+            dfStats[col] = dfStats[col].replace([np.inf, -np.inf], np.nan).fillna(0)
+    return dfStats
+
+
+def _stats(index, columns, close, high, volume, end, symbols, horizons):
+    index = pd.DatetimeIndex(index)
+    columns = pd.Index(columns)
+    symbols = pd.Index(symbols)
+    end_row = index.searchsorted(pd.Timestamp(end), side='right') - 1
+    starts = {h: index.searchsorted(d, side='left') for h, d in horizon_dates(end, horizons).items()}
+    longest = VOLUME_HORIZON if VOLUME_HORIZON in starts else max(horizons, key=horizons.get)
+    s12 = starts[longest]
+    nan = np.full(len(symbols), np.nan)
+
+    # Close rows needed by the longest window and the 200 DMA
+    lo = max(min(min(starts.values()), end_row - DMA_WINDOW + 1), 0)
+    c = _take(close, columns, symbols, slice(lo, end_row + 1))
+    last = c[-1] if end_row >= 0 else nan
+
+    if end_row >= 0 and end_row - s12 + 1 >= DMA_WINDOW:
+        dma = np.nan_to_num(c[-DMA_WINDOW:]).mean(axis=0)
+        # symbols absent from the panel stay NaN; listed ones count gaps as 0
+        dma[~symbols.isin(columns)] = np.nan
+    else:
+        dma = nan
+
+    valid_starts = [s - lo for s in starts.values() if s <= end_row]
+    ws = window_stats(c, valid_starts, end_row - lo) if valid_starts else {}
+    roc = {h: ws[s - lo][0] if s - lo in ws else nan for h, s in starts.items()}
+    vol = {h: ws[s - lo][1] if s - lo in ws else nan for h, s in starts.items()}
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        v = _take(volume, columns, symbols, slice(s12, end_row + 1))
+        med = np.nanmedian(v, axis=0) if len(v) else nan
+        h = _take(high, columns, symbols, slice(0, end_row + 1), dtype=None)
+        ath = np.nanmax(h, axis=0).astype(float) if len(h) else nan
+    return assemble_stats(symbols, horizons, last, dma, roc, vol, med, ath)
+
+
+def compute_stats(close, high, volume, end, symbols=None, horizons=HORIZONS):
+    """Build dfStats for lookback date ``end`` from full price panels.
+
+    ``close``, ``high`` and ``volume`` (traded value) are date x symbol
+    DataFrames; returns the same columns as the reference ``getStats``.
+    """
+    if symbols is None:
+        symbols = list(close.columns)
+    cols = close.columns
+    high, volume = [f if f.columns.equals(cols) else f.reindex(columns=cols) for f in (high, volume)]
+    return _stats(close.index, cols, close.to_numpy(), high.to_numpy(), volume.to_numpy(), end, symbols, horizons)
+
+
+def panel_stats(panel, end, symbols=None, horizons=HORIZONS):
+    """``compute_stats`` reading straight from a ``PricePanel`` (no DataFrames)."""
+    if symbols is None:
+        symbols = panel.symbols
+    return _stats(panel.dates, panel.symbols, panel['Close'], panel['High'], panel['Volume'], end, symbols,
+                  horizons)
+
+
+def momentum_filter(stats):
+    """The four momentum filters; ``stats`` maps column name to Series/DataFrame."""
+    return passes(stats, MOMENTUM_FILTERS)
+
+
+def stats_panel(close, high, volume, ends, horizons=HORIZONS):
+    """dfStats metrics for many lookback dates at once.
+
+    Returns {column: DataFrame[end date x symbol]} with the same values
+    ``compute_stats`` gives for each date (ROC/vol windows come from
+    full-history cumulative sums, so the last rounding digit can differ in
+    rare ties). Used for backtests, where every rebalance date needs a row.
+    """
+    index = close.index
+    symbols = close.columns
+    ends = pd.DatetimeIndex(ends)
+    e = index.searchsorted(ends, side='right') - 1
+    keep = e >= 0
+    ends, e = ends[keep], e[keep]
+    c = close.to_numpy(dtype=float)
+    n, m = c.shape
+    cols = np.arange(m)
+    filled, valid = _ffill(c)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rets = np.full_like(filled, np.nan)
+        rets[1:] = filled[1:] / filled[:-1] - 1
+    finite = np.isfinite(rets)
+    r = np.where(finite, rets, 0.0)
+    zero = np.zeros((1, m))
+    cs = np.vstack([zero, np.cumsum(r, axis=0)])
+    cs2 = np.vstack([zero, np.cumsum(r * r, axis=0)])
+    bad = np.vstack([zero, np.cumsum(~finite & ~np.isnan(rets), axis=0)])
+    # first valid row at or after each row, per symbol
+    nxt = np.where(valid, np.arange(n)[:, None], n)
+    nxt = np.vstack([np.minimum.accumulate(nxt[::-1], axis=0)[::-1], np.full((1, m), n)])
+
+    out = {'Close': np.round(c[e], 2)}
+    starts = {}
+    for h, months in horizons.items():
+        starts[h] = index.searchsorted(ends - pd.DateOffset(months=months), side='left')
+    longest = VOLUME_HORIZON if VOLUME_HORIZON in starts else max(horizons, key=horizons.get)
+    s12 = starts[longest]
+
+    cz = np.vstack([zero, np.cumsum(np.nan_to_num(c), axis=0)])
+    lo = np.maximum(e + 1 - DMA_WINDOW, 0)
+    dma = (cz[e + 1] - cz[lo]) / DMA_WINDOW
+    dma[(e - s12 + 1) < DMA_WINDOW] = np.nan
+    out['dma200d'] = np.round(dma, 2)
+
+    roc, vol = {}, {}
+    for h, s in starts.items():
+        sc = np.minimum(s, n - 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = (c[e] / c[sc] - 1) * 100
+            x[s > e] = np.nan
+            f = np.minimum(nxt[sc] + 1, (e + 1)[:, None])
+            count = (e + 1)[:, None] - f
+            total = cs[e + 1] - cs[f, cols]
+            total2 = cs2[e + 1] - cs2[f, cols]
+            mean = total / count
+            v = np.sqrt(np.maximum(total2 / count - mean * mean, 0.0)) * np.sqrt(TRADING_DAYS) * 100
+            v[count <= 0] = np.nan
+            v[(bad[e + 1] - bad[f, cols]) > 0] = np.nan
+            v[s > e] = np.nan
+        roc[h], vol[h] = np.round(x, 2), np.round(v, 2)
+    for h in horizons:
+        out[f'roc{h}'] = roc[h]
+    for h in horizons:
+        out[f'vol{h}'] = vol[h]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sharpe = np.stack([np.round(roc[h] / vol[h], 2) for h in horizons])
+    for h, x in zip(horizons, sharpe):
+        out[f'sharpe{h}'] = x
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        avg = np.round(np.nanmean(np.where(np.isinf(sharpe), np.nan, sharpe), axis=0), 2)
+        avg[np.isinf(sharpe).any(axis=0)] = np.nan
+        out['avgSharpe'] = avg
+        vol_panel = volume.reindex(columns=symbols).to_numpy(dtype=float)
+        med = np.stack([np.nanmedian(vol_panel[s:i + 1], axis=0) for s, i in zip(s12, e)]) if len(e) else np.empty((0, m))
+        out['volm_cr'] = np.round(np.round(med, 0) / 1e7, 2)
+        ath = np.fmax.accumulate(high.reindex(columns=symbols).to_numpy(dtype=float), axis=0)
+        out['ATH'] = np.round(ath[e], 2)
+        out['AWAY_ATH'] = np.round((out['Close'] / out['ATH'] - 1) * 100, 2)
+
+    panel = {k: pd.DataFrame(v, index=ends, columns=symbols) for k, v in out.items()}
+    for col in RANK_COLUMNS:
+        if col in panel:
+            panel[col] = panel[col].replace([np.inf, -np.inf], np.nan).fillna(0)
+    return panel
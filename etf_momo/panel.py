@@ -0,0 +1,95 @@
+"""Compact price panels: contiguous float32 arrays on a shared date/symbol index.
+
+A ``PricePanel`` replaces the float64 Close/High/Volume DataFrames and their
+per-window copies. Windows are row slices (views), ``frame()`` wraps an array
+in a DataFrame without copying, and a saved panel can be memory-mapped
+read-only so several sessions or processes share one copy of the data.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+# Close, High and traded value (Close * Volume), the panels the metrics use
+FIELDS = ['Close', 'High', 'Volume']
+DTYPE = np.float32
+
+
+class PricePanel:
+
+    def __init__(self, dates, symbols, arrays):
+        self.dates = pd.DatetimeIndex(dates)
+        self.symbols = pd.Index(symbols)
+        self.arrays = arrays
+        for name, a in arrays.items():
+            if a.shape != (len(self.dates), len(self.symbols)):
+                raise ValueError(f'{name} has shape {a.shape}, expected {(len(self.dates), len(self.symbols))}')
+
+    @classmethod
+    def from_frames(cls, frames, dtype=DTYPE):
+        """Build from {field: DataFrame[date x symbol]} aligned on a common index."""
+        close = frames['Close']
+        dates, symbols = close.index, close.columns
+        arrays = {}
+        for name, frame in frames.items():
+            frame = frame.reindex(index=dates, columns=symbols)
+            arrays[name] = np.ascontiguousarray(frame.to_numpy(dtype=dtype))
+        return cls(dates, symbols, arrays)
+
+    def __getitem__(self, field):
+        return self.arrays[field]
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in self.arrays.values())
+
+    @property
+    def is_mapped(self):
+        return any(isinstance(a, np.memmap) for a in self.arrays.values())
+
+    def rows(self, start=None, end=None):
+        """Row slice covering dates in [start, end]."""
+        lo = 0 if start is None else self.dates.searchsorted(pd.Timestamp(start), side='left')
+        hi = len(self.dates) if end is None else self.dates.searchsorted(pd.Timestamp(end), side='right')
+        return slice(lo, hi)
+
+    def window(self, start=None, end=None):
+        """A panel over [start, end] sharing memory with this one."""
+        sl = self.rows(start, end)
+        return PricePanel(self.dates[sl], self.symbols, {k: a[sl] for k, a in self.arrays.items()})
+
+    def frame(self, field):
+        """DataFrame view of one field (no copy)."""
+        return pd.DataFrame(self.arrays[field], index=self.dates, columns=self.symbols, copy=False)
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name, a in self.arrays.items():
+            np.save(os.path.join(path, f'{name}.npy'), a)
+        meta = {'dates': [d.strftime('%Y-%m-%d') for d in self.dates], 'symbols': [str(s) for s in self.symbols],
+                'fields': list(self.arrays)}
+        tmp = os.path.join(path, 'meta.json.tmp')
+        with open(tmp, 'w') as fh:
+            json.dump(meta, fh)
+        os.replace(tmp, os.path.join(path, 'meta.json'))
+
+    @classmethod
+    def open(cls, path, mmap=True):
+        """Load a saved panel; with ``mmap`` the arrays are read-only file mappings."""
+        with open(os.path.join(path, 'meta.json')) as fh:
+            meta = json.load(fh)
+        arrays = {name: np.load(os.path.join(path, f'{name}.npy'), mmap_mode='r' if mmap else None)
+                  for name in meta['fields']}
+        return cls(pd.DatetimeIndex(meta['dates']), meta['symbols'], arrays)
+
+
+def process_memory_mb():
+    """Peak resident memory of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 1024 / 1024 if os.uname().sysname == 'Darwin' else peak / 1024
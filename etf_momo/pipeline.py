@@ -0,0 +1,311 @@
+"""The ranking pipeline without any UI: universe -> prices -> dfStats -> ranking -> reports.
+
+Both the Streamlit app and the command line entry point (``etf_momo.cli``)
+are thin layers over these functions.
+"""
+import json
+import os
+import re
+import shutil
+import tempfile
+
+import pandas as pd
+
+from etf_momo.export import build_excel, excel_file_name
+from etf_momo.factors import MOMENTUM_FILTERS, RANKING_METHODS, filtered_view, get_factor, passes, rank
+from etf_momo.incremental import IncrementalStats
+from etf_momo.lookback import lookback_dates
+from etf_momo.metrics import panel_stats
+from etf_momo.panel import PricePanel
+from etf_momo.price_store import DEFAULT_START, PriceStore
+from etf_momo.profiling import profiled, record, span
+from etf_momo.risk import benchmark_map, benchmark_risk, benchmark_symbols
+from etf_momo.universe import DEFAULT_UNIVERSE, load_universe
+
+OUTPUT_FORMATS = ['xlsx', 'csv', 'parquet']
+
+# Saved daily panels, memory-mapped read-only by every session and process
+PANEL_DIR = os.environ.get('ETF_MOMO_PANEL_DIR', os.path.join('data', 'panels'))
+
+# saved panels kept per universe (most recent data dates); older ones are deleted
+PANEL_KEEP = 2
+
+
+def panel_path(universe_name, data_date):
+    return os.path.join(PANEL_DIR, f"{universe_name}_{pd.Timestamp(data_date):%Y-%m-%d}")
+
+
+def has_panel(path):
+    """Whether ``Prices.save`` has completed a panel at ``path``."""
+    return os.path.exists(os.path.join(path, 'failed.json'))
+
+
+def snapshot_date(dates, end):
+    """Last trading date in ``dates`` on or before ``end``, the date a ranking for lookback date ``end`` is
+    recorded under (``end`` itself if there is none)."""
+    dates = pd.DatetimeIndex(dates)
+    dates = dates[dates <= pd.Timestamp(end)]
+    return dates[-1] if len(dates) else pd.Timestamp(end)
+
+
+def publish_panel(prices, panel_dir, replace=False):
+    """Save ``prices`` to ``panel_dir`` and return them opened from there.
+
+    Sessions may have a completed panel memory-mapped, so its files are never
+    written over: the panel is written to a temp directory next to it and
+    renamed into place. If another session published it first, that panel is
+    opened instead; with ``replace`` the old directory is moved aside and
+    deleted after the swap (open mappings keep their data).
+    """
+    parent = os.path.dirname(panel_dir) or '.'
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=os.path.basename(panel_dir) + '.', suffix='.tmp', dir=parent)
+    old = None
+    try:
+        prices.save(tmp)
+        if replace and has_panel(panel_dir):
+            old = tmp[:-len('.tmp')] + '.old'
+            os.rename(panel_dir, old)
+        elif os.path.isdir(panel_dir) and not has_panel(panel_dir):
+            # left by an interrupted write; never completed, so nobody has it open
+            shutil.rmtree(panel_dir, ignore_errors=True)
+        try:
+            os.rename(tmp, panel_dir)
+        except OSError:
+            if not has_panel(panel_dir):
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+    prune_panels(panel_dir)
+    return Prices.open(panel_dir)
+
+
+def prune_panels(panel_dir, keep=PANEL_KEEP):
+    """Delete saved panels (and leftover temp directories) of the universe of ``panel_dir``
+    older than its ``keep`` most recent data dates."""
+    parent, name = os.path.split(panel_dir)
+    universe_name = name.rsplit('_', 1)[0]
+    pattern = re.compile(re.escape(universe_name) + r'_(\d{4}-\d{2}-\d{2})(\..*)?$')
+    found = {}
+    for entry in os.listdir(parent or '.'):
+        m = pattern.match(entry)
+        if m:
+            found.setdefault(m.group(1), []).append(entry)
+    for day in sorted(found)[:-keep]:
+        for entry in found[day]:
+            shutil.rmtree(os.path.join(parent, entry), ignore_errors=True)
+
+
+class Prices:
+    """Compact price panel for a universe, its benchmark closes and failed downloads.
+
+    ``close``, ``high`` and ``volume`` (traded value, Close * Volume) are
+    zero-copy float32 DataFrame views of the panel.
+    """
+
+    def __init__(self, panel, failed=None, bench_close=None):
+        self.panel = panel
+        self.failed = failed or []
+        self.bench_close = bench_close if bench_close is not None else pd.DataFrame(index=panel.dates)
+
+    @property
+    def close(self):
+        return self.panel.frame('Close')
+
+    @property
+    def high(self):
+        return self.panel.frame('High')
+
+    @property
+    def volume(self):
+        return self.panel.frame('Volume')
+
+    def save(self, path):
+        self.panel.save(path)
+        self.bench_close.to_parquet(os.path.join(path, 'bench_close.parquet'))
+        with open(os.path.join(path, 'failed.json'), 'w') as fh:
+            json.dump(self.failed, fh)
+
+    @classmethod
+    def open(cls, path, mmap=True):
+        """Open saved prices; with ``mmap`` the panel is a shared read-only mapping."""
+        with open(os.path.join(path, 'failed.json')) as fh:
+            failed = json.load(fh)
+        bench_close = pd.read_parquet(os.path.join(path, 'bench_close.parquet'))
+        return cls(PricePanel.open(path, mmap=mmap), failed, bench_close)
+
+
+@profiled()
+def update_prices(universe, store=None, start=DEFAULT_START, chunk=50, max_workers=4, on_chunk=None):
+    """Bring the price store up to date for the universe and its benchmarks.
+
+    Returns the universe symbols that could not be downloaded.
+    """
+    store = store or PriceStore()
+    symbols = list(universe.index) + benchmark_symbols(universe)
+
+    def chunk_done(result, done, total):
+        # chunks are timed on the download threads; record them as finished spans
+        record('download chunk', result.elapsed, symbols=len(result.symbols), ok=result.ok,
+               attempts=result.attempts)
+        if on_chunk:
+            on_chunk(result, done, total)
+
+    with span('update store', symbols=len(symbols)):
+        failed = store.update(symbols, start=start, chunk=chunk, on_chunk=chunk_done, max_workers=max_workers)
+    return [s for s in failed if s in universe.index]
+
+
+@profiled()
+def fetch_prices(universe, store=None, update=True, start=DEFAULT_START, chunk=50, max_workers=4, on_chunk=None,
+                 panel_dir=None, failed=None):
+    """Bring the price store up to date for the universe and its benchmarks and load the panels.
+
+    With ``panel_dir`` the loaded panel is published there (see
+    ``publish_panel``) and returned as a read-only memory mapping. A panel
+    already saved there is mapped directly unless the store (after the
+    update) holds a later bar than it does; then it is rebuilt and replaced.
+    ``failed`` carries the failures of an earlier update when ``update`` is
+    off.
+    """
+    store = store or PriceStore()
+    symbols = list(universe.index)
+    bench_symbols = benchmark_symbols(universe)
+    failed = list(failed or [])
+    if update:
+        failed = update_prices(universe, store, start=start, chunk=chunk, max_workers=max_workers,
+                               on_chunk=on_chunk)
+    replace = False
+    if panel_dir is not None and has_panel(panel_dir):
+        with span('open panel'):
+            saved = Prices.open(panel_dir)
+        last_bar = store.last_bar(symbols)
+        if last_bar is None or (len(saved.panel.dates) and last_bar <= saved.panel.dates[-1]):
+            return Prices(saved.panel, failed, saved.bench_close) if update else saved
+        replace = True
+    with span('load store'):
+        panels = store.load(symbols)
+        bench_close = store.load(bench_symbols)['Close']
+    with span('build panel'):
+        panel = PricePanel.from_frames({'Close': panels['Close'], 'High': panels['High'],
+                                        'Volume': panels['Close'] * panels['Volume']})
+    prices = Prices(panel, failed, bench_close)
+    if panel_dir is None:
+        return prices
+    with span('save panel'):
+        return publish_panel(prices, panel_dir, replace=replace)
+
+
+@profiled()
+def build_stats(prices, universe, end, benchmark_mode='nifty50', engine=None):
+    """dfStats for lookback date ``end`` including the benchmark-relative risk columns.
+
+    With an ``IncrementalStats`` engine over the same panel and symbols, the
+    price metrics are rolled forward from the engine's last date instead of
+    being recomputed.
+    """
+    dates = lookback_dates(end)
+    symbols = list(universe.index)
+    with span('price metrics', incremental=engine is not None):
+        if engine is not None:
+            stats = engine.stats_at(dates['endDate'])
+        else:
+            stats = panel_stats(prices.panel, dates['endDate'], symbols)
+    # Beta, correlation and tracking error over 12 months against the chosen benchmark
+    with span('benchmark risk'):
+        risk = benchmark_risk(prices.close, prices.bench_close, benchmark_map(universe, benchmark_mode),
+                              dates['date12M'], dates['endDate'], symbols)
+    for col in risk.columns:
+        stats[col] = risk[col].to_numpy()
+    return stats
+
+
+@profiled()
+def rank_stats(dfStats, ranking_method, filters=MOMENTUM_FILTERS):
+    """Rank dfStats by a registered factor (or ``Factor``); returns (ranked, filtered).
+
+    Composite factors add their score as a column named after the factor.
+    """
+    factor = get_factor(ranking_method)
+    dfStats = dfStats.copy()
+    if not factor.is_column:
+        dfStats[factor.name] = factor.score(dfStats).round(4)
+
+    # Add Rank column based on the ranking method and sort by Rank
+    dfStats['Rank'] = rank(dfStats, factor)
+    dfStats = dfStats.sort_values('Rank').set_index('Rank')  # Set 'Rank' as index
+
+    # Create final momentum filter column (volume, 200 DMA, ROC12M and ATH conditions)
+    dfStats['final_momentum'] = passes(dfStats, filters)
+
+    # Filter stocks meeting all conditions
+    return dfStats, filtered_view(dfStats, factor)
+
+
+@profiled()
+def write_reports(ranked, filtered, out_dir, end, universe_name, ranking_method, formats=('xlsx',)):
+    """Write the ranking in each requested format; returns the written paths."""
+    os.makedirs(out_dir, exist_ok=True)
+    stem = excel_file_name(end, universe_name, ranking_method)[:-len('.xlsx')]
+    paths = []
+    for fmt in formats:
+        if fmt == 'xlsx':
+            path = os.path.join(out_dir, f'{stem}.xlsx')
+            with open(path, 'wb') as fh:
+                fh.write(build_excel(ranked, filtered))
+            paths.append(path)
+        elif fmt in ('csv', 'parquet'):
+            for name, table in (('unfiltered', ranked), ('filtered', filtered)):
+                path = os.path.join(out_dir, f'{stem}_{name}.{fmt}')
+                if fmt == 'csv':
+                    table.to_csv(path)
+                else:
+                    table.to_parquet(path)
+                paths.append(path)
+        else:
+            raise ValueError(f'unknown output format {fmt!r}, expected one of {OUTPUT_FORMATS}')
+    return paths
+
+
+@profiled()
+def run_batch(end_dates, ranking_methods, universe_df=None, universe_name=DEFAULT_UNIVERSE, prices=None,
+              out_dir='reports', formats=('xlsx',), benchmark_mode='nifty50', update=True, store=None, log=print,
+              stats=None, history=None):
+    """Rank many lookback dates and methods with prices loaded once.
+
+    Each date's dfStats is computed once and ranked for every method; dates
+    are visited oldest first so each one only rolls the metrics forward from
+    the previous one. ``stats`` may hold every date's dfStats already (e.g.
+    from ``sharded.sharded_stats``), in which case no prices are loaded.
+    Every ranking is also recorded in ``history`` (a ``RankingHistory``)
+    when given, under the last trading date on or before its lookback date
+    (with ``stats``, from the calendar of ``store``). Returns the list of
+    written paths.
+    """
+    universe_df = load_universe(universe_name) if universe_df is None else universe_df
+    if prices is None and stats is None:
+        prices = fetch_prices(universe_df, store=store, update=update)
+        if prices.failed:
+            log(f"Failed to download data for: {', '.join(prices.failed)}")
+    paths = []
+    engine = None
+    if history is not None:
+        calendar = prices.panel.dates if prices is not None else (store or PriceStore()).calendar(universe_df.index)
+    for end in sorted(end_dates, key=pd.Timestamp):
+        if stats is not None:
+            day = stats[pd.Timestamp(end)]
+        else:
+            if engine is None:
+                engine = IncrementalStats.from_panel(prices.panel, lookback_dates(end)['endDate'], universe_df.index)
+            day = build_stats(prices, universe_df, end, benchmark_mode, engine=engine)
+        for method in ranking_methods:
+            ranked, filtered = rank_stats(day, method)
+            if history is not None:
+                history.record(ranked, snapshot_date(calendar, end), universe_name, method)
+            written = write_reports(ranked, filtered, out_dir, end, universe_name, method, formats)
+            log(f"{pd.Timestamp(end):%Y-%m-%d} {method}: {len(filtered)} of {len(ranked)} pass filters -> "
+                f"{', '.join(written)}")
+            paths.extend(written)
+    return paths
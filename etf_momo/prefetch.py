@@ -0,0 +1,159 @@
+"""Background refresh so the first session of the day finds everything cached.
+
+A ``Prefetcher`` runs on a daemon thread next to the app. At each refresh
+time (before the open, for the previous close, and after the 15:30 IST
+close) it brings the price store up to date, rebuilds the day's shared
+panel and fills the app's cache with dfStats, every ranking and its Excel
+bytes for the latest lookback date, under the same keys a session would
+compute them. A slot that brings no new trading bar (weekends, holidays,
+the morning after the close was picked up) still fills the cache for the new
+data date but records nothing, so the history gets one snapshot per bar.
+The clock is injectable, so a ``synthetic.FakeClock`` and a
+``StubFetcher`` store drive it deterministically (``tick`` runs whatever is
+due without the thread).
+"""
+import threading
+import time
+from datetime import datetime, time as dtime
+
+from etf_momo.cache import prices_cache_key, ranking_cache_key, stats_cache_key
+from etf_momo.export import build_excel, excel_file_name
+from etf_momo.incremental import IncrementalStats
+from etf_momo.pipeline import (RANKING_METHODS, build_stats, fetch_prices, load_universe, lookback_dates, panel_path,
+                               publish_panel, rank_stats, snapshot_date, update_prices)
+from etf_momo.price_store import PriceStore
+from etf_momo.universe import DEFAULT_UNIVERSE
+
+# local wall-clock times; the second one follows the NSE close at 15:30
+REFRESH_TIMES = (dtime(6, 0), dtime(16, 0))
+
+# entries are keyed by data date, so they may live until the day is over
+PREFETCH_TTL = 24 * 3600
+
+
+def precompute(cache, universe_name, data_date, methods=None, benchmark_mode='nifty50', store=None, history=None,
+               ttl=PREFETCH_TTL, since=None):
+    """Refresh prices and cache dfStats, rankings and Excel bytes of ``universe_name`` for ``data_date``.
+
+    An already saved panel for the date is rebuilt from the updated store;
+    sessions still mapping the old files keep reading them. With ``since``
+    (the last bar of an earlier run) the rankings are recorded in ``history``
+    only if the update brought a later bar (``new_bar`` in the summary).
+    """
+    methods = list(RANKING_METHODS.values()) if methods is None else methods
+    universe = load_universe(universe_name)
+    store = store or PriceStore()
+    failed = update_prices(universe, store)
+    last_bar = store.last_bar(universe.index)
+    new_bar = since is None or (last_bar is not None and last_bar > since)
+    summary = {'universe': universe_name, 'data_date': data_date, 'symbols': len(universe), 'failed': len(failed),
+               'last_bar': last_bar, 'new_bar': new_bar}
+    prices = publish_panel(fetch_prices(universe, store, update=False, failed=failed),
+                           panel_path(universe_name, data_date), replace=True)
+    end = lookback_dates(data_date)['endDate']
+    key = prices_cache_key(universe_name, data_date)
+    engine = IncrementalStats.from_panel(prices.panel, end, universe.index)
+    dfStats = build_stats(prices, universe, end, benchmark_mode, engine=engine)
+    cache.prices.set(key, prices, ttl=ttl)
+    cache.engines.set(key, engine, ttl=ttl)
+    cache.stats.set(stats_cache_key(universe_name, data_date, data_date, benchmark_mode), dfStats, ttl=ttl)
+    for method in methods:
+        ranked, filtered = rank_stats(dfStats, method)
+        entry = (ranked, filtered, excel_file_name(data_date, universe_name, method), build_excel(ranked, filtered))
+        cache.rankings.set(ranking_cache_key(universe_name, data_date, data_date, benchmark_mode, method), entry,
+                           ttl=ttl)
+        if history is not None and new_bar:
+            history.record(ranked, snapshot_date(prices.panel.dates, end), universe_name, method)
+    summary['methods'] = len(methods)
+    return summary
+
+
+class Prefetcher:
+    """Runs ``precompute`` for ``universes`` once per refresh time and day."""
+
+    def __init__(self, cache, universes=(DEFAULT_UNIVERSE,), methods=None, benchmark_mode='nifty50',
+                 refresh_times=REFRESH_TIMES, store=None, history=None, now=datetime.now, poll=60, log=None):
+        self.cache = cache
+        self.universes = list(universes)
+        self.methods = methods
+        self.benchmark_mode = benchmark_mode
+        self.refresh_times = sorted(refresh_times)
+        self.store = store
+        self.history = history
+        self.now = now
+        self.poll = poll
+        self.log = log
+        self.runs = []
+        # universe -> last bar of its latest completed precompute
+        self.last_bars = {}
+        self._done = set()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def due(self):
+        """(date, refresh time) of the latest slot passed today that has not run, else None.
+
+        Slots missed while the app was down collapse into one run.
+        """
+        now = self.now()
+        passed = [t for t in self.refresh_times if now.time() >= t]
+        if not passed:
+            return None
+        slot = (now.date(), passed[-1])
+        return None if slot in self._done else slot
+
+    def tick(self):
+        """Run the due slot, if any; returns whether it ran."""
+        slot = self.due()
+        if slot is None:
+            return False
+        data_date = slot[0].strftime('%Y-%m-%d')
+        self._idle.clear()
+        try:
+            for name in self.universes:
+                started, t0 = self.now(), time.perf_counter()
+                try:
+                    summary = precompute(self.cache, name, data_date, self.methods, self.benchmark_mode,
+                                         store=self.store, history=self.history, since=self.last_bars.get(name))
+                    if summary['new_bar'] and summary['last_bar'] is not None:
+                        self.last_bars[name] = summary['last_bar']
+                except Exception as e:
+                    summary = {'universe': name, 'data_date': data_date, 'error': f'{type(e).__name__}: {e}'}
+                summary.update(started=started, seconds=round(time.perf_counter() - t0, 2))
+                self.runs.append(summary)
+                if self.log:
+                    self.log(summary)
+        finally:
+            # a failed slot is not retried until the next one; sessions compute on demand meanwhile
+            for t in self.refresh_times:
+                if t <= slot[1]:
+                    self._done.add((slot[0], t))
+            self._idle.set()
+        return True
+
+    @property
+    def busy(self):
+        return not self._idle.is_set()
+
+    def wait_idle(self, timeout=None):
+        """Block while a refresh is running; returns False on timeout."""
+        return self._idle.wait(timeout)
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.tick()
+            self._stop.wait(self.poll)
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name='etf_momo-prefetch', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
@@ -0,0 +1,223 @@
+"""On-disk OHLCV store so a refresh only downloads the bars we don't have yet.
+
+Prices are kept one Parquet file per symbol (Close, High, Volume columns on a
+Date index) plus a small JSON manifest with the last stored date per symbol.
+"""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from etf_momo.downloader import ChunkDownloader, MissingSymbols
+from etf_momo.lookback import DEFAULT_START
+
+FIELDS = ['Close', 'High', 'Volume']
+DEFAULT_STORE_DIR = os.environ.get('ETF_MOMO_DATA_DIR', os.path.join('data', 'prices'))
+
+# Relative tolerance when comparing the overlapping bar of a refresh against
+# the stored one; auto-adjusted history shifts after dividends and splits.
+ADJUSTMENT_TOLERANCE = 1e-4
+
+
+def yahoo_fetcher(symbols, start):
+    """Default fetcher: returns a frame with (field, symbol) MultiIndex columns.
+
+    Symbols are fetched one ``yf.Ticker`` at a time: ``yf.download`` keeps
+    its results and errors in module-level state (yfinance.shared), so
+    concurrent calls can mix up or drop each other's symbols, while a
+    ``Ticker`` only touches its own. Parallelism comes from the downloader's
+    workers. Symbols without any price are raised as ``MissingSymbols`` so
+    they are retried and reported as failed.
+    """
+    import yfinance as yf
+    frames = {}
+    missing = []
+    for sym in symbols:
+        hist = yf.Ticker(sym).history(start=start, auto_adjust=True)
+        if hist is None or hist.empty or 'Close' not in hist or hist['Close'].isna().all():
+            missing.append(sym)
+            continue
+        hist.index = pd.to_datetime(hist.index).tz_localize(None).normalize()
+        frames[sym] = hist[FIELDS]
+    if not frames:
+        raise ValueError(f'no data for {", ".join(missing)}')
+    frame = pd.concat(frames, axis=1).swaplevel(axis=1)
+    if missing:
+        raise MissingSymbols(frame, missing)
+    return frame
+
+
+def split_fields(frame, symbols=None):
+    """Turn a fetcher result into {field: DataFrame[date x symbol]}."""
+    if frame is None or frame.empty:
+        return {f: pd.DataFrame() for f in FIELDS}
+    if not isinstance(frame.columns, pd.MultiIndex):
+        # single symbol without a ticker level
+        frame = pd.concat({symbols[0]: frame}, axis=1).swaplevel(axis=1)
+    out = {}
+    for f in FIELDS:
+        panel = frame[f]
+        if isinstance(panel, pd.Series):
+            panel = panel.to_frame(symbols[0] if symbols else f)
+        panel.index = pd.to_datetime(panel.index)
+        out[f] = panel
+    return out
+
+
+class PriceStore:
+
+    def __init__(self, root=DEFAULT_STORE_DIR, fetcher=yahoo_fetcher):
+        self.root = root
+        self.fetcher = fetcher
+        os.makedirs(self.root, exist_ok=True)
+        self._manifest_path = os.path.join(self.root, 'manifest.json')
+        self._manifest = self._read_manifest()
+
+    def _read_manifest(self):
+        if not os.path.exists(self._manifest_path):
+            return {}
+        with open(self._manifest_path) as fh:
+            return json.load(fh)
+
+    def _write_manifest(self):
+        tmp = self._manifest_path + '.tmp'
+        with open(tmp, 'w') as fh:
+            json.dump(self._manifest, fh, indent=0, sort_keys=True)
+        os.replace(tmp, self._manifest_path)
+
+    def _path(self, sym):
+        return os.path.join(self.root, f'{sym}.parquet')
+
+    def last_date(self, sym):
+        d = self._manifest.get(sym)
+        return pd.Timestamp(d) if d else None
+
+    def last_bar(self, symbols):
+        """Latest stored date over ``symbols``, None if none is stored."""
+        return max(filter(None, map(self.last_date, symbols)), default=None)
+
+    def plan(self, symbols, start=DEFAULT_START):
+        """Group symbols by the date their missing tail starts from.
+
+        The last stored bar is fetched again so a partial intraday bar gets
+        overwritten and adjusted-price drift can be detected.
+        """
+        groups = {}
+        for sym in symbols:
+            last = self.last_date(sym)
+            since = pd.Timestamp(start) if last is None else last
+            groups.setdefault(since, []).append(sym)
+        return groups
+
+    def read(self, sym):
+        path = self._path(sym)
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path)
+
+    def write(self, fields, symbols, replace=False):
+        """Merge freshly fetched panels into the store.
+
+        Returns the symbols whose stored history no longer matches the new
+        data (re-adjusted by the provider) and needs a full re-download.
+        With ``replace`` the fetched data is a full history and supersedes
+        the stored file. Files are swapped in whole, so a failed write or
+        download leaves the previous history in place.
+        """
+        stale = []
+        for sym in symbols:
+            if sym not in fields['Close'].columns:
+                continue
+            new = pd.DataFrame({f: fields[f][sym] for f in FIELDS}).dropna(how='all')
+            if new.empty:
+                continue
+            old = None if replace else self.read(sym)
+            if old is not None and not old.empty:
+                overlap = old.index.intersection(new.index)
+                if len(overlap):
+                    a = old.loc[overlap[0], 'Close']
+                    b = new.loc[overlap[0], 'Close']
+                    if pd.notna(a) and pd.notna(b) and abs(a / b - 1) > ADJUSTMENT_TOLERANCE:
+                        stale.append(sym)
+                        continue
+                new = pd.concat([old[old.index < new.index[0]], new])
+            new.index.name = 'Date'
+            path = self._path(sym)
+            new.to_parquet(path + '.tmp')
+            os.replace(path + '.tmp', path)
+            self._manifest[sym] = new.index[-1].strftime('%Y-%m-%d')
+        self._write_manifest()
+        return stale
+
+    def drop(self, sym):
+        path = self._path(sym)
+        if os.path.exists(path):
+            os.remove(path)
+        self._manifest.pop(sym, None)
+        self._write_manifest()
+
+    def update(self, symbols, start=DEFAULT_START, chunk=50, on_chunk=None, max_workers=4, retries=2, backoff=0.5,
+               min_interval=0.0):
+        """Fetch only the missing tail for every symbol.
+
+        Chunks are downloaded concurrently by a ``ChunkDownloader``;
+        ``on_chunk(result, done, total)`` is called on this thread after each
+        chunk. Returns the list of symbols that could not be downloaded.
+        """
+        downloader = ChunkDownloader(self.fetcher, max_workers=max_workers, retries=retries, backoff=backoff,
+                                     min_interval=min_interval)
+        jobs = [(since, syms[k:k + chunk])
+                for since, syms in self.plan(symbols, start).items()
+                for k in range(0, len(syms), chunk)]
+        failed = []
+        stale = []
+        replace = False
+
+        def on_result(res, done, total):
+            if res.ok:
+                try:
+                    stale.extend(self.write(split_fields(res.frame, res.symbols), res.symbols, replace=replace))
+                except Exception as e:
+                    res.error = e
+                    failed.extend(res.symbols)
+            if on_chunk is not None:
+                on_chunk(res, done, total)
+
+        _, missing = downloader.run(jobs, on_result)
+        failed.extend(missing)
+        if stale:
+            # provider re-adjusted these; replace their whole history once the
+            # full download is in (a failed one keeps the old file and manifest
+            # date, so the next run detects the drift again)
+            replace = True
+            jobs = [(pd.Timestamp(start), stale[k:k + chunk]) for k in range(0, len(stale), chunk)]
+            _, missing = downloader.run(jobs, on_result)
+            failed.extend(missing)
+        return failed
+
+    def load(self, symbols, start=None, end=None):
+        """Return {field: DataFrame[date x symbol]} for the stored symbols."""
+        cols = {f: {} for f in FIELDS}
+        for sym in symbols:
+            frame = self.read(sym)
+            if frame is None:
+                continue
+            frame = frame.loc[start:end]
+            for f in FIELDS:
+                cols[f][sym] = frame[f]
+        return {f: pd.DataFrame(cols[f]).sort_index() for f in FIELDS}
+
+    def calendar(self, symbols):
+        """Union of the stored dates of ``symbols`` (the index ``load`` would return).
+
+        Only the date column of each file is read.
+        """
+        import pyarrow.parquet as pq
+
+        dates = np.array([], dtype='datetime64[ns]')
+        for sym in symbols:
+            path = self._path(sym)
+            if os.path.exists(path):
+                dates = np.union1d(dates, pq.read_table(path, columns=['Date']).column(0).to_numpy())
+        return pd.DatetimeIndex(dates, name='Date').as_unit('ns')
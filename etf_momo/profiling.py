@@ -0,0 +1,190 @@
+"""Lightweight timing spans around pipeline stages.
+
+    with span('build_stats'):
+        ...
+
+    @profiled()
+    def rank_stats(...):
+        ...
+
+Spans are recorded by the profiler active in the current context
+(``activate``); with none active, ``span`` returns a shared no-op context
+and ``profiled`` calls straight through, so instrumented code costs one
+context-variable lookup. Each span records wall time, CPU time of the
+calling thread and, when the profiler tracks memory, the peak traced
+allocation above the span's starting point (tracemalloc, which slows
+allocation-heavy code, so it is opt-in).
+"""
+import contextlib
+import contextvars
+import functools
+import json
+import threading
+import time
+import tracemalloc
+
+import pandas as pd
+
+_current = contextvars.ContextVar('etf_momo_profiler', default=None)
+_NULL = contextlib.nullcontext()
+
+
+class Span:
+
+    def __init__(self, name, depth, start, meta):
+        self.name = name
+        self.depth = depth
+        self.start = start
+        self.meta = meta
+        self.wall = None
+        self.cpu = None
+        self.peak = None
+        self.tid = threading.get_ident()
+        self._cpu0 = time.thread_time()
+        self._mem0 = 0
+        self._peak_seen = 0
+
+    def as_dict(self):
+        return {'name': self.name, 'depth': self.depth, 'start': self.start, 'wall': self.wall, 'cpu': self.cpu,
+                'peak_bytes': self.peak, 'thread': self.tid, **self.meta}
+
+
+class Profiler:
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.spans = []
+        self._stack = []
+        self._t0 = time.perf_counter()
+        self._lock = threading.Lock()
+        self._started_tracing = False
+
+    def _enter(self, name, meta):
+        s = Span(name, len(self._stack), time.perf_counter() - self._t0, meta)
+        if self.memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            cur, peak = tracemalloc.get_traced_memory()
+            if self._stack:
+                self._stack[-1]._peak_seen = max(self._stack[-1]._peak_seen, peak)
+            tracemalloc.reset_peak()
+            s._mem0 = s._peak_seen = cur
+        with self._lock:
+            self.spans.append(s)
+        self._stack.append(s)
+        return s
+
+    def _exit(self, s):
+        s.wall = time.perf_counter() - self._t0 - s.start
+        s.cpu = time.thread_time() - s._cpu0
+        self._stack.pop()
+        if self.memory and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], s._peak_seen)
+            s.peak = peak - s._mem0
+            tracemalloc.reset_peak()
+            if self._stack:
+                self._stack[-1]._peak_seen = max(self._stack[-1]._peak_seen, peak)
+
+    @contextlib.contextmanager
+    def span(self, name, **meta):
+        s = self._enter(name, meta)
+        try:
+            yield s
+        finally:
+            self._exit(s)
+
+    def record(self, name, wall, **meta):
+        """Add a finished span measured elsewhere (e.g. a download in a worker thread)."""
+        s = Span(name, len(self._stack), time.perf_counter() - self._t0 - wall, meta)
+        s.wall = wall
+        with self._lock:
+            self.spans.append(s)
+
+    def stop(self):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def table(self):
+        """One row per span in start order; stage names indented by nesting depth."""
+        rows = [{'Stage': ' ' * s.depth + s.name,
+                 'Wall ms': round(s.wall * 1e3, 1) if s.wall is not None else None,
+                 'CPU ms': round(s.cpu * 1e3, 1) if s.cpu is not None else None,
+                 'Peak MB': round(s.peak / 2**20, 2) if s.peak is not None else None}
+                for s in sorted(self.spans, key=lambda s: s.start)]
+        return pd.DataFrame(rows, columns=['Stage', 'Wall ms', 'CPU ms', 'Peak MB'])
+
+    def summary(self):
+        """Total wall/CPU time and call count per stage name."""
+        frame = pd.DataFrame([s.as_dict() for s in self.spans])
+        if frame.empty:
+            return pd.DataFrame(columns=['calls', 'wall ms', 'cpu ms'])
+        out = frame.groupby('name', sort=False).agg(calls=('wall', 'size'), wall=('wall', 'sum'),
+                                                      cpu=('cpu', 'sum'))
+        out[['wall', 'cpu']] = (out[['wall', 'cpu']] * 1e3).round(1)
+        return out.rename(columns={'wall': 'wall ms', 'cpu': 'cpu ms'}).sort_values('wall ms', ascending=False)
+
+    def to_json(self):
+        return json.dumps([s.as_dict() for s in self.spans], default=str, indent=1)
+
+    def to_chrome_trace(self):
+        """Trace Event Format JSON, viewable in chrome://tracing or Perfetto."""
+        events = []
+        for s in self.spans:
+            args = dict(s.meta)
+            if s.cpu is not None:
+                args['cpu_ms'] = round(s.cpu * 1e3, 3)
+            if s.peak is not None:
+                args['peak_mb'] = round(s.peak / 2**20, 3)
+            events.append({'name': s.name, 'ph': 'X', 'ts': round(s.start * 1e6), 'dur': round((s.wall or 0) * 1e6),
+                           'pid': 1, 'tid': s.tid, 'args': args})
+        return json.dumps({'traceEvents': events, 'displayTimeUnit': 'ms'}, default=str)
+
+
+def current():
+    return _current.get()
+
+
+def set_current(profiler):
+    """Make ``profiler`` (or None) the active one for this context; returns a reset token."""
+    return _current.set(profiler)
+
+
+@contextlib.contextmanager
+def activate(profiler):
+    """Record spans of the enclosed block into ``profiler`` (None disables)."""
+    token = set_current(profiler)
+    try:
+        yield profiler
+    finally:
+        _current.reset(token)
+        if profiler is not None:
+            profiler.stop()
+
+
+def span(name, **meta):
+    p = _current.get()
+    return _NULL if p is None else p.span(name, **meta)
+
+
+def record(name, wall, **meta):
+    p = _current.get()
+    if p is not None:
+        p.record(name, wall, **meta)
+
+
+def profiled(name=None):
+    """Decorator wrapping every call of a function in a span."""
+    def wrap(fn):
+        label = name or fn.__name__
+
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            p = _current.get()
+            if p is None:
+                return fn(*args, **kwargs)
+            with p.span(label):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
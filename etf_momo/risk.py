@@ -0,0 +1,110 @@
+"""Benchmark-relative risk: beta, correlation and tracking error per ETF.
+
+The benchmark is either Nifty 50 for every ETF or the index each ETF tracks,
+resolved from the ``UNDERLYING ASSET`` column of the universe file. Index
+prices come from the same price store as the ETFs.
+"""
+import re
+
+import numpy as np
+import pandas as pd
+
+from etf_momo.helpers import getDailyReturns, getRelativeRisk
+from etf_momo.profiling import profiled
+
+NIFTY50 = '^NSEI'
+
+BENCHMARK_MODES = {
+    'Nifty 50': 'nifty50',
+    'Underlying Index': 'underlying',
+}
+
+# First matching pattern (case-insensitive) on the underlying asset name wins;
+# anything unmatched (gold, silver, G-Secs, foreign indices) falls back to Nifty 50
+UNDERLYING_INDEX_RULES = [
+    (r'nifty ?next ?50', '^NSMIDCP'),
+    (r'psu bank', '^CNXPSUBANK'),
+    # not "Financial Services Ex-Bank"
+    (r'(?<!ex-)(?<!ex )\bbank', '^NSEBANK'),
+    (r'\bit\b', '^CNXIT'),
+    (r'pharma', '^CNXPHARMA'),
+    (r'fmcg', '^CNXFMCG'),
+    (r'auto', '^CNXAUTO'),
+    (r'realty', '^CNXREALTY'),
+    (r'infra', '^CNXINFRA'),
+    (r'consumption', '^CNXCONSUM'),
+    (r'\bmnc\b', '^CNXMNC'),
+    (r'\bpse\b', '^CNXPSE'),
+    (r'sensex', '^BSESN'),
+    (r'nifty ?500', '^CRSLDX'),
+    (r'nifty ?100\b', '^CNX100'),
+    (r'nifty ?50\b', NIFTY50),
+]
+
+UNDERLYING_COLUMN = 'UNDERLYING ASSET'
+
+
+def underlying_index(name):
+    if isinstance(name, str):
+        for pattern, ticker in UNDERLYING_INDEX_RULES:
+            if re.search(pattern, name, flags=re.IGNORECASE):
+                return ticker
+    return NIFTY50
+
+
+def benchmark_map(universe, mode='nifty50'):
+    """{yahoo symbol: benchmark ticker} for a universe frame indexed by symbol."""
+    if mode == 'underlying':
+        col = next((c for c in universe.columns if c.strip() == UNDERLYING_COLUMN), None)
+        if col is not None:
+            return {sym: underlying_index(name) for sym, name in universe[col].items()}
+    return {sym: NIFTY50 for sym in universe.index}
+
+
+def benchmark_symbols(universe):
+    """Every benchmark ticker either mode may need."""
+    return sorted(set(benchmark_map(universe, 'underlying').values()) | {NIFTY50})
+
+
+def benchmark_risk(close, bench_close, mapping, start=None, end=None, symbols=None):
+    """Beta/corr/trackErr of each ETF against its mapped benchmark.
+
+    The benchmark return panel is laid out column-for-column with the ETF
+    panel so everything is computed in one pass by ``getRelativeRisk``.
+    """
+    if symbols is None:
+        symbols = list(close.columns)
+    etf = getDailyReturns(close.reindex(columns=symbols).loc[start:end]).iloc[1:]
+    bench = getDailyReturns(bench_close.reindex(index=close.index).loc[start:end]).iloc[1:]
+    cols = [mapping.get(s, NIFTY50) for s in symbols]
+    bench = bench.reindex(columns=cols)
+    bench.columns = etf.columns
+    return getRelativeRisk(etf, bench)
+
+
+@profiled()
+def correlation_clusters(close, start=None, end=None, threshold=0.98, min_periods=60):
+    """Correlation matrix in hierarchical-cluster order plus duplicate groups.
+
+    ETFs whose average-linkage correlation exceeds ``threshold`` are grouped;
+    each group very likely tracks the same index.
+    """
+    from scipy.cluster.hierarchy import fcluster, leaves_list, linkage
+    from scipy.spatial.distance import squareform
+
+    returns = getDailyReturns(close.loc[start:end]).iloc[1:]
+    corr = returns.corr(min_periods=min_periods)
+    corr = corr.dropna(how='all').dropna(how='all', axis=1)
+    if len(corr) < 2:
+        return corr, pd.DataFrame(columns=['Group', 'Members'])
+    dist = (1 - corr.fillna(0).to_numpy()).clip(0, 2)
+    np.fill_diagonal(dist, 0)
+    link = linkage(squareform(dist, checks=False), method='average')
+    labels = pd.Series(fcluster(link, t=1 - threshold, criterion='distance'), index=corr.index)
+    order = leaves_list(link)
+    corr = corr.iloc[order, order]
+    groups = [list(g.index) for _, g in labels.groupby(labels) if len(g) > 1]
+    groups.sort(key=len, reverse=True)
+    dupes = pd.DataFrame({'Group': range(1, len(groups) + 1),
+                          'Members': [', '.join(s.replace('.NS', '') for s in g) for g in groups]})
+    return corr, dupes
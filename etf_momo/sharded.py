@@ -0,0 +1,67 @@
+"""Out-of-core dfStats for universes too large for one in-memory panel.
+
+The universe is processed in symbol shards read straight from the price
+store: each shard is laid out on the universe's trading calendar, its dfStats
+rows are computed for every lookback date and only those rows are kept, so
+peak memory is set by the shard size rather than the universe size. Shards
+run in-process or across a process pool; the rows are concatenated in
+universe order and ranked and filtered globally as usual. The result equals
+``build_stats`` on the full panel of the same store.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from etf_momo.pipeline import lookback_dates
+from etf_momo.price_store import PriceStore
+from etf_momo.profiling import profiled, span
+from etf_momo.risk import benchmark_map, benchmark_symbols
+from etf_momo.streaming import chunk_stats
+
+DEFAULT_SHARD_SIZE = 250
+
+
+def shards(symbols, size=DEFAULT_SHARD_SIZE):
+    return [symbols[k:k + size] for k in range(0, len(symbols), size)]
+
+
+def _shard_stats(root, symbols, calendar, ends, bench_close, mapping):
+    """{end: dfStats rows} of one shard; runs in pool workers, so it takes only picklable arguments."""
+    frames = PriceStore(root).load(symbols)
+    frames = {f: p.reindex(index=calendar) for f, p in frames.items()}
+    return {end: chunk_stats(frames, symbols, lookback_dates(end), bench_close, mapping) for end in ends}
+
+
+@profiled()
+def sharded_stats(universe, store, end_dates, benchmark_mode='nifty50', shard_size=DEFAULT_SHARD_SIZE,
+                  max_workers=1, log=None):
+    """dfStats for every lookback date in ``end_dates``, one symbol shard at a time.
+
+    Returns {Timestamp: dfStats}. With ``max_workers`` > 1 shards are spread
+    over a process pool, each worker reading its shard from the store.
+    """
+    symbols = list(universe.index)
+    ends = [pd.Timestamp(e) for e in end_dates]
+    mapping = benchmark_map(universe, benchmark_mode)
+    with span('calendar', symbols=len(symbols)):
+        calendar = store.calendar(symbols)
+    bench_close = store.load(benchmark_symbols(universe))['Close']
+    jobs = [(store.root, shard, calendar, ends, bench_close, {s: mapping[s] for s in shard})
+            for shard in shards(symbols, shard_size)]
+    parts = []
+
+    def collect(rows):
+        parts.append(rows)
+        if log is not None:
+            log(f'shard {len(parts)}/{len(jobs)} done')
+
+    if max_workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(max_workers, len(jobs))) as pool:
+            for rows in pool.map(_shard_stats, *zip(*jobs)):
+                collect(rows)
+    else:
+        for job in jobs:
+            with span('shard', symbols=len(job[1])):
+                collect(_shard_stats(*job))
+    with span('combine shards'):
+        return {end: pd.concat([rows[end] for rows in parts]).reset_index(drop=True) for end in ends}
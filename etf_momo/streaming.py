@@ -0,0 +1,149 @@
+"""Streaming dfStats: rank what has arrived while the rest is still downloading.
+
+Every metric in dfStats is per symbol, so each finished download chunk is
+read back from the store for just its symbols and run through
+``compute_stats`` and ``benchmark_risk`` on its own. The per-chunk rows are
+merged into a provisional table after every chunk and into the final
+dfStats at the end; no full panel is assembled for the ranking.
+
+Rows depend on the trading calendar of the window (window start rows and the
+zero-filled 200 DMA), so at the end any chunk whose calendar differs from
+the universe's over the lookback span is recomputed on the full calendar.
+The final table then equals ``pipeline.build_stats`` on the same store.
+"""
+import pandas as pd
+
+from etf_momo.metrics import DMA_WINDOW, compute_stats
+from etf_momo.panel import DTYPE
+from etf_momo.pipeline import lookback_dates
+from etf_momo.price_store import DEFAULT_START
+from etf_momo.profiling import profiled, span
+from etf_momo.risk import benchmark_map, benchmark_risk, benchmark_symbols
+
+
+def chunk_stats(frames, symbols, dates, bench_close, mapping, index=None):
+    """dfStats rows (indexed by symbol) of ``symbols`` from their {field: DataFrame} history.
+
+    ``dates`` is ``lookback_dates(end)``. With ``index`` the history is
+    first laid out on that calendar; symbols absent from ``frames`` get the
+    NaN rows the panel path gives them.
+    """
+    if index is not None:
+        frames = {f: p.reindex(index=index) for f, p in frames.items()}
+    listed = len(frames['Close'].columns) > 0
+    if not listed:
+        # compute_stats needs at least one column; all-NaN ones stand in
+        nan = pd.DataFrame(index=frames['Close'].index, columns=symbols, dtype=float)
+        frames = {'Close': nan, 'High': nan, 'Volume': nan}
+    close = frames['Close']
+    # float32 like the shared PricePanel, so rows match the panel path exactly
+    high = frames['High'].astype(DTYPE)
+    volume = (close * frames['Volume']).astype(DTYPE)
+    close = close.astype(DTYPE)
+    end = dates['endDate']
+    stats = compute_stats(close, high, volume, end, symbols)
+    risk = benchmark_risk(close, bench_close, mapping, dates['date12M'], end, symbols)
+    for col in risk.columns:
+        stats[col] = risk[col].to_numpy()
+    if not listed:
+        stats['dma200d'] = float('nan')
+    return stats.set_axis(pd.Index(symbols), axis=0)
+
+
+class StreamingStats:
+    """Per-chunk dfStats rows for ``universe`` at lookback date ``end``."""
+
+    def __init__(self, universe, end, bench_close, benchmark_mode='nifty50'):
+        self.symbols = list(universe.index)
+        self.dates = lookback_dates(end)
+        self.bench_close = bench_close
+        self.mapping = benchmark_map(universe, benchmark_mode)
+        self.parts = {}
+
+    def _compute(self, frames, symbols, index=None):
+        return chunk_stats(frames, symbols, self.dates, self.bench_close, self.mapping, index=index)
+
+    def add(self, frames, symbols):
+        """Compute the rows of one chunk from its {field: DataFrame} history."""
+        symbols = [s for s in symbols if s in frames['Close'].columns]
+        if symbols:
+            frames = {f: p.reindex(columns=symbols) for f, p in frames.items()}
+            self.parts[tuple(symbols)] = (frames['Close'].index, self._compute(frames, symbols))
+
+    def table(self):
+        """Rows of every symbol computed so far, in universe order (empty before the first chunk)."""
+        if not self.parts:
+            return pd.DataFrame()
+        rows = pd.concat([part for _, part in self.parts.values()])
+        # a stale symbol re-downloaded in a later chunk keeps its latest rows
+        rows = rows[~rows.index.duplicated(keep='last')]
+        return rows.reindex([s for s in self.symbols if s in rows.index]).reset_index(drop=True)
+
+    def finish(self, store):
+        """Final dfStats over the whole universe.
+
+        Chunks whose dates over the lookback span differ from the union
+        calendar are reloaded and recomputed on it; symbols without data get
+        the NaN rows the panel path gives them.
+        """
+        done = {s for _, part in self.parts.values() for s in part.index}
+        missing = [s for s in self.symbols if s not in done]
+        if missing:
+            # symbols whose download failed may still have stored history
+            self.add(store.load(missing), missing)
+        calendar = pd.DatetimeIndex([], name='Date')
+        for index, _ in self.parts.values():
+            calendar = calendar.union(index)
+        end = pd.Timestamp(self.dates['endDate'])
+        upto = calendar[calendar <= end]
+        if len(upto):
+            cut = min(pd.Timestamp(self.dates['date12M']), upto[max(len(upto) - DMA_WINDOW, 0)])
+            lookback = upto[upto >= cut]
+            for key, (index, _) in list(self.parts.items()):
+                if not index[(index >= cut) & (index <= end)].equals(lookback):
+                    self.parts[key] = (calendar, self._compute(store.load(list(key)), list(key), index=calendar))
+        done = {s for _, part in self.parts.values() for s in part.index}
+        missing = [s for s in self.symbols if s not in done]
+        if missing:
+            empty = {f: pd.DataFrame(index=calendar, dtype=float) for f in ('Close', 'High', 'Volume')}
+            self.parts[tuple(missing)] = (calendar, self._compute(empty, missing))
+        return self.table()
+
+
+@profiled()
+def stream_stats(universe, store, end, benchmark_mode='nifty50', update=True, start=DEFAULT_START, chunk=50,
+                 max_workers=4, on_partial=None):
+    """dfStats computed chunk by chunk as the store is brought up to date.
+
+    Benchmarks are refreshed first; then after every universe chunk
+    ``on_partial(provisional, result, done, total)`` is called on this
+    thread with the merged rows so far (``result`` is the ``ChunkResult``,
+    or None when ``update`` is off and stored chunks are replayed).
+    Returns ``(dfStats, failed symbols)``.
+    """
+    symbols = list(universe.index)
+    bench = benchmark_symbols(universe)
+    if update:
+        with span('update benchmarks'):
+            store.update(bench, start=start, chunk=chunk, max_workers=max_workers)
+    stream = StreamingStats(universe, end, store.load(bench)['Close'], benchmark_mode)
+
+    def on_chunk(result, done, total):
+        if result.ok:
+            with span('chunk stats', symbols=len(result.symbols)):
+                stream.add(store.load(result.symbols), result.symbols)
+        if on_partial is not None:
+            on_partial(stream.table(), result, done, total)
+
+    failed = []
+    if update:
+        failed = store.update(symbols, start=start, chunk=chunk, on_chunk=on_chunk, max_workers=max_workers)
+    else:
+        chunks = [symbols[k:k + chunk] for k in range(0, len(symbols), chunk)]
+        for i, syms in enumerate(chunks, start=1):
+            with span('chunk stats', symbols=len(syms)):
+                stream.add(store.load(syms), syms)
+            if on_partial is not None:
+                on_partial(stream.table(), None, i, len(chunks))
+    with span('merge chunks'):
+        return stream.finish(store), [s for s in failed if s in universe.index]
@@ -0,0 +1,158 @@
+"""Parameter sweeps: backtest every combination of a grid across a process pool.
+
+    python -m etf_momo.sweep --start 2015-01-01 --end 2024-12-31 --methods sharpe3M avgSharpe \
+        --top-n 5 10 20 --roc12M 0 6.5 10 --AWAY_ATH -30 -25 -20 --horizons 12,9,6,3 12,6,3
+
+The price panel is saved once as float32 ``.npy`` files and every worker
+memory-maps it read-only, so nothing is re-downloaded or pickled per worker;
+tasks only carry their parameters. Combinations sharing a rebalance
+frequency and horizon set are scheduled together and reuse the worker's
+metrics for those dates.
+"""
+import argparse
+import itertools
+import os
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+import pandas as pd
+
+from etf_momo.backtest import FREQUENCIES, rebalance_dates, run_backtest
+from etf_momo.factors import FACTORS, MOMENTUM_FILTERS
+from etf_momo.metrics import stats_panel
+from etf_momo.panel import PricePanel
+from etf_momo.pipeline import fetch_prices, load_universe, panel_path
+from etf_momo.price_store import DEFAULT_STORE_DIR, PriceStore
+from etf_momo.universe import DEFAULT_UNIVERSE, available
+
+DEFAULTS = {'ranking_method': 'avgSharpe', 'top_n': 10, 'freq': 'monthly', 'horizons': '12,9,6,3'}
+THRESHOLDS = {f.column: f for f in MOMENTUM_FILTERS if f.threshold is not None}
+
+# per-worker state: the mapped panel and the metrics of the last dates/freq/horizons
+_panel = None
+_last_stats = (None, None)
+
+
+def param_grid(**values):
+    """Every combination of the given parameter lists, as dicts."""
+    names = list(values)
+    return [dict(zip(names, combo)) for combo in itertools.product(*(values[n] for n in names))]
+
+
+def parse_horizons(spec):
+    """'12,9,6,3' -> {'12M': 12, '9M': 9, '6M': 6, '3M': 3}."""
+    return {f'{int(m)}M': int(m) for m in str(spec).split(',')}
+
+
+def _init_worker(path):
+    global _panel, _last_stats
+    _panel = PricePanel.open(path, mmap=True)
+    _last_stats = (None, None)
+
+
+def _run_one(params, start, end):
+    global _last_stats
+    t0 = time.perf_counter()
+    p = {**DEFAULTS, **params}
+    close, high, volume = (_panel.frame(f) for f in ('Close', 'High', 'Volume'))
+    try:
+        key = (start, end, p['freq'], p['horizons'])
+        if _last_stats[0] != key:
+            dates = rebalance_dates(close.index, start, end, p['freq'])
+            _last_stats = (key, stats_panel(close, high, volume, dates, parse_horizons(p['horizons'])))
+        filters = [f.with_threshold(p[f.column]) if f.column in p else f for f in MOMENTUM_FILTERS]
+        res = run_backtest(close, high, volume, start, end, freq=p['freq'], top_n=int(p['top_n']),
+                           ranking_method=p['ranking_method'], filters=filters, stats=_last_stats[1])
+        out = {**params, **res.summary()}
+    except Exception as e:
+        out = {**params, 'error': f'{type(e).__name__}: {e}'}
+    out['seconds'] = round(time.perf_counter() - t0, 3)
+    return out
+
+
+def run_sweep(panel_dir, grid, start, end, max_workers=None, log=None):
+    """Backtest every parameter dict in ``grid`` on the panel saved in ``panel_dir``.
+
+    Parameters not given in a dict take ``DEFAULTS``; a key named like a
+    filter column (``roc12M``, ``AWAY_ATH``, ``volm_cr``) replaces that
+    filter's threshold. Returns one row per combination with the backtest
+    summary (or an ``error``), in grid order. ``max_workers=1`` runs in
+    this process.
+    """
+    max_workers = max_workers or os.cpu_count() or 1
+    order = sorted(range(len(grid)), key=lambda i: (str(grid[i].get('freq', DEFAULTS['freq'])),
+                                                    str(grid[i].get('horizons', DEFAULTS['horizons']))))
+    tasks = [grid[i] for i in order]
+    n = len(tasks)
+    rows = []
+    if max_workers == 1:
+        _init_worker(panel_dir)
+        results = (_run_one(t, start, end) for t in tasks)
+    else:
+        pool = ProcessPoolExecutor(max_workers, initializer=_init_worker, initargs=(panel_dir,))
+        # large chunks keep combinations with the same metrics on one worker
+        chunksize = max(1, n // (max_workers * 4))
+        results = pool.map(_run_one, tasks, [start] * n, [end] * n, chunksize=chunksize)
+    try:
+        for done, row in enumerate(results, start=1):
+            rows.append(row)
+            if log:
+                log(done, n, row)
+    finally:
+        if max_workers != 1:
+            pool.shutdown()
+    table = pd.DataFrame(rows, index=order).sort_index()
+    return table.reset_index(drop=True)
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(prog='etf_momo.sweep', description='Backtest a grid of strategy parameters.')
+    p.add_argument('--start', required=True, help='first rebalance date (YYYY-MM-DD)')
+    p.add_argument('--end', default=date.today().isoformat(), help='last date (YYYY-MM-DD)')
+    p.add_argument('--methods', nargs='+', choices=list(FACTORS), default=[DEFAULTS['ranking_method']])
+    p.add_argument('--top-n', nargs='+', type=int, default=[DEFAULTS['top_n']])
+    p.add_argument('--freq', nargs='+', choices=list(FREQUENCIES), default=[DEFAULTS['freq']])
+    p.add_argument('--horizons', nargs='+', default=[DEFAULTS['horizons']],
+                   help='comma separated lookback months per horizon set, e.g. 12,9,6,3')
+    for column, f in THRESHOLDS.items():
+        p.add_argument(f'--{column}', nargs='+', type=float, default=[f.threshold],
+                       help=f'thresholds for the {f.label!r} filter')
+    p.add_argument('--workers', type=int, default=os.cpu_count(), help='worker processes')
+    p.add_argument('--universe', default=DEFAULT_UNIVERSE,
+                   help=f'registered universe ({", ".join(available())}) or path to a CSV with a Symbol column')
+    p.add_argument('--store', default=DEFAULT_STORE_DIR, help='price store directory')
+    p.add_argument('--no-update', action='store_true', help='use stored prices without downloading')
+    p.add_argument('--out', default=os.path.join('reports', 'sweep.csv'), help='results table (.csv or .parquet)')
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    warnings.simplefilter('ignore')
+    args = parse_args(argv)
+    universe = load_universe(args.universe)
+    universe_name = os.path.splitext(os.path.basename(args.universe))[0]
+    panel_dir = panel_path(universe_name, date.today())
+    fetch_prices(universe, store=PriceStore(args.store), update=not args.no_update, panel_dir=panel_dir)
+
+    grid = param_grid(ranking_method=args.methods, top_n=args.top_n, freq=args.freq, horizons=args.horizons,
+                      **{column: getattr(args, column) for column in THRESHOLDS})
+    t0 = time.perf_counter()
+    table = run_sweep(panel_dir, grid, args.start, args.end, max_workers=args.workers,
+                      log=lambda done, n, row: print(f'\r{done}/{n} combinations', end='', flush=True))
+    wall = time.perf_counter() - t0
+    print(f'\n{len(table)} combinations in {wall:.1f}s on {args.workers} workers')
+
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    if args.out.endswith('.parquet'):
+        table.to_parquet(args.out)
+    else:
+        table.to_csv(args.out, index=False)
+    if 'Sharpe' in table:
+        print(table.sort_values('Sharpe', ascending=False).head(10).to_string(index=False))
+    print(f'-> {args.out}')
+
+
+if __name__ == '__main__':
+    main()
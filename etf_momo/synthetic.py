@@ -0,0 +1,107 @@
+"""Deterministic synthetic price data and an offline stand-in for Yahoo."""
+import contextlib
+import random
+import sys
+import threading
+import time
+import types
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+
+def synthetic_panel(n_symbols=200, n_days=6000, seed=0, start='2000-01-03'):
+    """Return {'Close', 'High', 'Volume'} DataFrames of a geometric random walk."""
+    rng = np.random.default_rng(seed)
+    index = pd.bdate_range(start, periods=n_days, name='Date')
+    cols = [f'SYM{i:04d}.NS' for i in range(n_symbols)]
+    drift = rng.normal(0.0003, 0.0002, n_symbols)
+    vol = rng.uniform(0.005, 0.03, n_symbols)
+    rets = rng.normal(drift, vol, (n_days, n_symbols))
+    close = 100 * np.exp(np.cumsum(rets, axis=0))
+    high = close * (1 + np.abs(rng.normal(0, 0.005, (n_days, n_symbols))))
+    volume = rng.lognormal(12, 1, (n_days, n_symbols)).round()
+    # late listings: leading NaNs like a real ETF universe
+    listed = rng.integers(0, n_days // 2, n_symbols)
+    listed[: n_symbols // 2] = 0
+    mask = np.arange(n_days)[:, None] < listed[None, :]
+    close[mask] = high[mask] = volume[mask] = np.nan
+    return {
+        'Close': pd.DataFrame(close, index=index, columns=cols),
+        'High': pd.DataFrame(high, index=index, columns=cols),
+        'Volume': pd.DataFrame(volume, index=index, columns=cols),
+    }
+
+
+class StubFetcher:
+    """Offline fetcher serving a synthetic panel with the yfinance frame layout.
+
+    ``latency`` seconds are slept per call and ``fail_rate`` of calls raise,
+    so download scheduling can be exercised without the network.
+    """
+
+    def __init__(self, panel=None, latency=0.0, fail_rate=0.0, seed=0):
+        self.panel = panel if panel is not None else synthetic_panel()
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def __call__(self, symbols, start):
+        with self._lock:
+            self.calls += 1
+            fail = self._rng.random() < self.fail_rate
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ConnectionError(f'stub failure for {len(symbols)} symbols')
+        fields = {f: p.loc[pd.Timestamp(start):, [s for s in symbols if s in p.columns]]
+                  for f, p in self.panel.items()}
+        return pd.concat(fields, axis=1)
+
+
+class FakeClock:
+    """Wall clock that only moves when told to, for driving schedulers in tests.
+
+    ``now()`` stands in for ``datetime.now``; ``sleep`` advances the clock
+    instead of blocking.
+    """
+
+    def __init__(self, start):
+        self.current = pd.Timestamp(start).to_pydatetime()
+
+    def now(self):
+        return self.current
+
+    def advance(self, seconds):
+        self.current += timedelta(seconds=seconds)
+
+    sleep = advance
+
+
+@contextlib.contextmanager
+def stub_yfinance(fetcher=None):
+    """Install an offline ``yfinance`` module whose ``download`` serves ``fetcher``.
+
+    ``price_store.yahoo_fetcher`` then runs unchanged against synthetic data;
+    the real module (if any) is restored on exit.
+    """
+    fetcher = fetcher if fetcher is not None else StubFetcher()
+
+    def download(tickers, start=None, **kwargs):
+        symbols = [tickers] if isinstance(tickers, str) else list(tickers)
+        return fetcher(symbols, start if start is not None else '1900-01-01')
+
+    module = types.ModuleType('yfinance')
+    module.download = download
+    saved = sys.modules.get('yfinance')
+    sys.modules['yfinance'] = module
+    try:
+        yield fetcher
+    finally:
+        if saved is None:
+            sys.modules.pop('yfinance', None)
+        else:
+            sys.modules['yfinance'] = saved
@@ -0,0 +1,105 @@
+"""Registry of symbol universes loaded from local files.
+
+The bundled ``NSE_ETF.csv`` is registered as ``NSEETF``; any ``*.csv`` in the
+user universe directory is registered under its file stem, so a user file
+named after a bundled universe (such as the copy ``refresh`` downloads)
+takes its place. Parsed tables are cached per file and re-read only when the
+file's mtime changes. The network is used only by an explicit ``refresh``.
+"""
+import os
+import tempfile
+import threading
+
+import pandas as pd
+
+from etf_momo.profiling import profiled
+
+PACKAGE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USER_UNIVERSE_DIR = os.environ.get('ETF_MOMO_UNIVERSE_DIR', os.path.join('data', 'universes'))
+DEFAULT_UNIVERSE = 'NSEETF'
+
+# Bundled universes: name -> (file, remote source used by refresh(), Yahoo suffix)
+BUNDLED = {
+    'NSEETF': (os.path.join(PACKAGE_ROOT, 'NSE_ETF.csv'),
+               'https://raw.githubusercontent.com/prayan2702/ETF-Momo-app/refs/heads/main/NSE_ETF.csv', '.NS'),
+}
+
+_cache = {}
+_lock = threading.Lock()
+
+
+def available(user_dir=USER_UNIVERSE_DIR):
+    """{name: local path} of bundled and user-supplied universes."""
+    found = {name: path for name, (path, _, _) in BUNDLED.items()}
+    if os.path.isdir(user_dir):
+        for fname in sorted(os.listdir(user_dir)):
+            stem, ext = os.path.splitext(fname)
+            if ext.lower() == '.csv':
+                found[stem] = os.path.join(user_dir, fname)
+    return found
+
+
+def read_universe(path, suffix='.NS'):
+    """Parsed universe table indexed by Yahoo symbol, cached by (path, mtime).
+
+    The returned frame is shared between callers and must not be modified.
+    """
+    path = os.path.abspath(path)
+    mtime = os.path.getmtime(path)
+    with _lock:
+        hit = _cache.get(path)
+        if hit is not None and hit[0] == mtime and hit[1] == suffix:
+            return hit[2]
+    df = pd.read_csv(path)
+    df['Yahoo_Symbol'] = df.Symbol.astype(str).str.strip() + suffix
+    df = df.set_index('Yahoo_Symbol')
+    with _lock:
+        _cache[path] = (mtime, suffix, df)
+    return df
+
+
+def load(name=DEFAULT_UNIVERSE, user_dir=USER_UNIVERSE_DIR):
+    paths = available(user_dir)
+    if name not in paths:
+        raise KeyError(f'unknown universe {name!r}, available: {", ".join(paths)}')
+    suffix = BUNDLED[name][2] if name in BUNDLED else '.NS'
+    return read_universe(paths[name], suffix)
+
+
+@profiled()
+def load_universe(name=DEFAULT_UNIVERSE):
+    """Universe table indexed by Yahoo symbol, by registry name or CSV path."""
+    if os.path.isfile(name):
+        return read_universe(name)
+    return load(name)
+
+
+def refresh(name=DEFAULT_UNIVERSE, timeout=30, user_dir=USER_UNIVERSE_DIR):
+    """Download the remote copy of a bundled universe into the user directory.
+
+    The copy is saved as ``<name>.csv`` and is loaded instead of the bundled
+    file from then on; the bundled file itself is never modified.
+    """
+    import urllib.request  # only used here; keeps app startup light
+
+    _, url, _ = BUNDLED[name]
+    with urllib.request.urlopen(url, timeout=timeout) as resp:
+        data = resp.read()
+    os.makedirs(user_dir, exist_ok=True)
+    path = os.path.join(user_dir, f'{name}.csv')
+    # same directory as the target, so the replace below is atomic; not a
+    # .csv, so available() never lists it
+    fd, tmp = tempfile.mkstemp(dir=user_dir, suffix='.csv.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        # validate before replacing the working copy
+        read_universe(tmp)
+    except Exception:
+        os.unlink(tmp)
+        raise
+    finally:
+        with _lock:
+            _cache.pop(os.path.abspath(tmp), None)
+    os.replace(tmp, path)
+    return path
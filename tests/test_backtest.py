@@ -0,0 +1,15 @@
+import pandas as pd
+
+from etf_momo.backtest import rebalance_dates
+
+
+def test_weekly_rebalance_on_the_last_trading_day_to_friday():
+    index = pd.bdate_range('2024-06-03', '2024-06-28').drop(pd.Timestamp('2024-06-14'))
+    dates = rebalance_dates(index, index[0], index[-1], 'weekly')
+    assert list(dates.strftime('%Y-%m-%d')) == ['2024-06-07', '2024-06-13', '2024-06-21', '2024-06-28']
+
+
+def test_monthly_rebalance_on_the_last_trading_day_of_the_month():
+    index = pd.bdate_range('2024-04-01', '2024-06-30')
+    dates = rebalance_dates(index, index[0], index[-1], 'monthly')
+    assert list(dates.strftime('%Y-%m-%d')) == ['2024-04-30', '2024-05-31', '2024-06-28']
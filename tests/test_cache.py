@@ -0,0 +1,10 @@
+from etf_momo.cache import LayeredCache, prices_cache_key
+
+
+def test_two_universes_keep_their_panels_and_engines():
+    cache = LayeredCache()
+    keys = [prices_cache_key(u, '2024-06-28') for u in ('NSEETF', 'OTHER')]
+    for key in keys:
+        cache.prices.set(key, 'panel')
+        cache.engines.set(key, 'engine')
+    assert all(cache.prices.get(k) == 'panel' and cache.engines.get(k) == 'engine' for k in keys)
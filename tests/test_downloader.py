@@ -0,0 +1,28 @@
+import pandas as pd
+
+from etf_momo.downloader import ChunkDownloader, MissingSymbols
+
+
+def fetcher(calls, bad):
+    def fetch(symbols, start):
+        calls.append(list(symbols))
+        good = [s for s in symbols if s not in bad]
+        if not good:
+            raise ValueError(f'no data for {symbols}')
+        frame = pd.concat({'Close': pd.DataFrame(1.0, index=pd.bdate_range(start, periods=3), columns=good)}, axis=1)
+        if len(good) < len(symbols):
+            raise MissingSymbols(frame, [s for s in symbols if s in bad])
+        return frame
+    return fetch
+
+
+def test_missing_symbols_are_retried_alone_and_reported():
+    calls = []
+    downloader = ChunkDownloader(fetcher(calls, {'BAD'}), max_workers=2, retries=1, sleep=lambda s: None)
+    results, failed = downloader.run([('2024-01-01', ['A', 'BAD', 'B'])])
+
+    assert failed == ['BAD']
+    assert [r.symbols for r in results] == [['A', 'B']]
+    assert results[0].missing == ['BAD']
+    # the good symbols are fetched once, only the missing one is retried
+    assert calls == [['A', 'BAD', 'B'], ['BAD'], ['BAD']]
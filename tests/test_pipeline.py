@@ -0,0 +1,29 @@
+import pandas as pd
+
+from etf_momo.pipeline import fetch_prices, has_panel
+from etf_momo.price_store import PriceStore
+from etf_momo.risk import NIFTY50
+from etf_momo.synthetic import StubFetcher, synthetic_panel
+
+
+def test_saved_panel_is_replaced_when_the_store_has_a_later_bar(tmp_path):
+    day = pd.Timestamp('2024-06-28')
+    raw = synthetic_panel(4, 300, start=pd.bdate_range(end=day, periods=300)[0])
+    symbols = ['SYM0', 'SYM1', 'SYM2']
+    for f in raw:
+        raw[f].columns = [s + '.NS' for s in symbols] + [NIFTY50]
+    universe = pd.DataFrame(index=[s + '.NS' for s in symbols])
+    # the first click of the day sees the previous close only
+    fetcher = StubFetcher({f: p.iloc[:-1] for f, p in raw.items()})
+    store = PriceStore(str(tmp_path / 'store'), fetcher=fetcher)
+    panel_dir = str(tmp_path / 'panels' / f'TEST_{day:%Y-%m-%d}')
+
+    first = fetch_prices(universe, store, panel_dir=panel_dir)
+    assert has_panel(panel_dir)
+    assert first.panel.dates[-1] == day - pd.offsets.BDay()
+
+    fetcher.panel = raw
+    later = fetch_prices(universe, store, panel_dir=panel_dir)
+    assert later.panel.dates[-1] == day
+    # a click without a new bar maps the saved panel
+    assert fetch_prices(universe, store, panel_dir=panel_dir).panel.dates[-1] == day
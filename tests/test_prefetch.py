@@ -0,0 +1,60 @@
+import os
+
+import pandas as pd
+
+from etf_momo.cache import LayeredCache, prices_cache_key, ranking_cache_key
+from etf_momo.history import RankingHistory
+from etf_momo.prefetch import Prefetcher
+from etf_momo.price_store import PriceStore
+from etf_momo.risk import NIFTY50
+from etf_momo.synthetic import FakeClock, StubFetcher, synthetic_panel
+
+UNIVERSE = 'PREFETCHTEST'
+
+
+def setup_day(tmp_path, monkeypatch, day, n_symbols=5, n_days=400):
+    monkeypatch.chdir(tmp_path)
+    raw = synthetic_panel(n_symbols + 1, n_days, start=pd.bdate_range(end=day, periods=n_days)[0])
+    symbols = [f'SYM{i}' for i in range(n_symbols)]
+    for f in raw:
+        raw[f].columns = [s + '.NS' for s in symbols] + [NIFTY50]
+    os.makedirs(os.path.join('data', 'universes'))
+    pd.DataFrame({'Symbol': symbols}).to_csv(os.path.join('data', 'universes', f'{UNIVERSE}.csv'), index=False)
+    return raw
+
+
+def test_morning_after_close_fills_cache_without_recording(tmp_path, monkeypatch):
+    day = pd.Timestamp('2024-06-28')
+    raw = setup_day(tmp_path, monkeypatch, day)
+    # the provider has the previous close until 16:00
+    fetcher = StubFetcher({f: p.iloc[:-1] for f, p in raw.items()})
+    clock = FakeClock(day + pd.Timedelta(hours=6))
+    cache = LayeredCache()
+    history = RankingHistory(str(tmp_path / 'history.sqlite'))
+    prefetcher = Prefetcher(cache, universes=[UNIVERSE], methods=['sharpe3M'], now=clock.now, history=history,
+                            store=PriceStore(str(tmp_path / 'store'), fetcher=fetcher))
+
+    assert prefetcher.tick()
+    fetcher.panel = raw
+    clock.advance(10 * 3600)
+    assert prefetcher.tick()
+    clock.advance(14 * 3600)
+    assert prefetcher.tick()
+
+    assert [r['new_bar'] for r in prefetcher.runs] == [True, True, False]
+    next_date = f'{clock.now():%Y-%m-%d}'
+    assert cache.prices.get(prices_cache_key(UNIVERSE, next_date)) is not None
+    assert cache.engines.get(prices_cache_key(UNIVERSE, next_date)) is not None
+    assert cache.rankings.get(ranking_cache_key(UNIVERSE, next_date, next_date, 'nifty50', 'sharpe3M')) is not None
+    assert list(history.dates(UNIVERSE, 'sharpe3M')) == [day - pd.offsets.BDay(), day]
+
+
+def test_no_slot_before_first_refresh_time(tmp_path, monkeypatch):
+    day = pd.Timestamp('2024-06-28')
+    setup_day(tmp_path, monkeypatch, day)
+    clock = FakeClock(day + pd.Timedelta(hours=5, minutes=59))
+    prefetcher = Prefetcher(LayeredCache(), universes=[UNIVERSE], now=clock.now)
+    assert prefetcher.due() is None
+    assert not prefetcher.tick()
+    clock.advance(60)
+    assert prefetcher.due() is not None
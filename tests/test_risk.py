@@ -0,0 +1,20 @@
+import pytest
+
+from etf_momo.risk import NIFTY50, underlying_index
+
+
+@pytest.mark.parametrize('name, ticker', [
+    ('Nifty Bank', '^NSEBANK'),
+    ('DSP Nifty Private Bank ETF', '^NSEBANK'),
+    ('Nifty PSU Bank', '^CNXPSUBANK'),
+    ('ICICI Prudential Nifty Financial Services Ex-Bank ETF', NIFTY50),
+    ('Nifty Financial Services Ex Bank', NIFTY50),
+    ('HDFC NIFTY NEXT 50 ETF', '^NSMIDCP'),
+    ('Nifty Next50', '^NSMIDCP'),
+    ('BSE Sensex Next 50', '^BSESN'),
+    ('SENSEX', '^BSESN'),
+    ('Nifty 50', NIFTY50),
+    (None, NIFTY50),
+])
+def test_underlying_index(name, ticker):
+    assert underlying_index(name) == ticker
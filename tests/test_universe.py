@@ -0,0 +1,32 @@
+import io
+import urllib.request
+
+import pytest
+
+from etf_momo import universe
+
+
+def serve(monkeypatch, body):
+    monkeypatch.setattr(urllib.request, 'urlopen', lambda url, timeout=None: io.BytesIO(body))
+
+
+def test_refresh_writes_a_user_copy_that_replaces_the_bundled_one(tmp_path, monkeypatch):
+    bundled = universe.BUNDLED['NSEETF'][0]
+    with open(bundled, 'rb') as fh:
+        before = fh.read()
+    serve(monkeypatch, b'Symbol,Name\nNEWETF,New ETF\n')
+
+    path = universe.refresh('NSEETF', user_dir=str(tmp_path))
+
+    assert path == str(tmp_path / 'NSEETF.csv')
+    assert universe.available(str(tmp_path))['NSEETF'] == path
+    assert list(universe.load('NSEETF', str(tmp_path)).index) == ['NEWETF.NS']
+    with open(bundled, 'rb') as fh:
+        assert fh.read() == before
+
+
+def test_failed_refresh_leaves_no_files(tmp_path, monkeypatch):
+    serve(monkeypatch, b'not,a,universe\n1,2,3\n')
+    with pytest.raises(AttributeError):
+        universe.refresh('NSEETF', user_dir=str(tmp_path))
+    assert list(tmp_path.iterdir()) == []